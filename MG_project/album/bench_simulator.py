@@ -0,0 +1,89 @@
+import os
+import random
+import sys
+import time
+
+from simulator import AlbumSimulator, load_album_config, play_sequence, parse_probability_string
+
+# 与 simulator.py 中【模式 2】相同的开包序列
+PACK_SEQUENCE = ([1] * 12 + [2] * 9 + [3] * 5 + [4]*3 + [5]*1) * 30
+
+def bench_pack_sampling(config, pack_sequence, repeat=5):
+    """
+    只对比开包时「张数 + 分类」的抽取：每包重新解析配置字符串并逐项相减（旧做法） vs 预编译采样器。
+    输出:
+        tuple: (旧做法每包微秒, 采样器每包微秒)
+    """
+    def legacy_choose(weights):
+        total = sum(weights.values())
+        r = random.uniform(0, total)
+        for cat, w in weights.items():
+            r -= w
+            if r <= 0: return cat
+        return list(weights.keys())[-1]
+
+    def legacy():
+        for case_id in pack_sequence:
+            case_info = config.cases_map[case_id]
+            cnt = int(legacy_choose(parse_probability_string(case_info['card_count'])))
+            cat_weights = parse_probability_string(case_info['card_type'])
+            guarantee_weights = parse_probability_string(case_info.get('min_guarantee_prob', ''))
+            for i in range(cnt):
+                if i == 0 and sum(guarantee_weights.values()) > 0:
+                    legacy_choose(guarantee_weights)
+                else:
+                    legacy_choose(cat_weights)
+
+    def compiled():
+        for case_id in pack_sequence:
+            pack = config.pack_tables[case_id]
+            for i in range(pack.count_sampler.sample()):
+                if i == 0 and pack.guarantee_sampler is not None:
+                    pack.guarantee_sampler.sample()
+                else:
+                    pack.category_sampler.sample()
+
+    results = []
+    for func in (legacy, compiled):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        results.append(best / len(pack_sequence) * 1e6)
+    return tuple(results)
+
+def bench_full_runs(config, pack_sequence, runs=20, enable_dynamic_unlock=True, enable_weight_control=True):
+    """
+    复用同一个模拟器（每轮 reset）完整跑 runs 轮开包序列。
+    输出:
+        tuple: (每轮毫秒, 每秒开包数, 每秒抽卡数)
+    """
+    sim = AlbumSimulator(config, enable_dynamic_unlock=enable_dynamic_unlock, enable_weight_control=enable_weight_control)
+    cards = 0
+    start = time.perf_counter()
+    for _ in range(runs):
+        sim.reset()
+        play_sequence(sim, pack_sequence)
+        cards += sim.stats_cards_drawn
+    elapsed = time.perf_counter() - start
+    return elapsed / runs * 1000, runs * len(pack_sequence) / elapsed, cards / elapsed
+
+if __name__ == '__main__':
+    # 默认读取本脚本所在目录下的 album_config，可在命令行传入其他数据目录
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.path.abspath(__file__))
+    runs = 20
+    random.seed(12345)
+
+    start = time.perf_counter()
+    config = load_album_config(data_dir)
+    print(f"加载并编译配置: {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"开包序列: {len(PACK_SEQUENCE)} 包 / 轮，共 {runs} 轮\n")
+
+    legacy_us, compiled_us = bench_pack_sampling(config, PACK_SEQUENCE)
+    print(f"[开包抽取] 每包解析字符串: {legacy_us:.2f} us/包 | 预编译采样器: {compiled_us:.2f} us/包 | 提升 {legacy_us / compiled_us:.1f}x\n")
+
+    print("[完整模拟] 动态解锁 | 权重调控 | 每轮 ms | 开包/秒 | 抽卡/秒")
+    for unlock, weight in [(True, True), (True, False), (False, True), (False, False)]:
+        ms, packs, cards = bench_full_runs(config, PACK_SEQUENCE, runs, unlock, weight)
+        print(f"            {'开' if unlock else '关'}     |    {'开' if weight else '关'}    | {ms:7.1f} | {packs:8.0f} | {cards:8.0f}")
@@ -0,0 +1,348 @@
+"""
+卡册掉落的批量（同步推进）模拟：N 个玩家沿同一开包序列一起前进，用 NumPy 按数组一次处理所有玩家。
+与 simulator.AlbumSimulator 逐个玩家模拟的规则一致（保底卡、动态解锁、权重调控、各 Set 分值节点），
+只是随机数来自 numpy Generator，单个玩家的轨迹不同，统计分布相同。
+-注：同一序列下所有玩家每一步的开包分值相同，期待收集张数对每个 Set 只需算一次；
+    Set 的偏差值只取决于该 Set 已收集张数（0~9），因此每开一包先算出「张数 -> 权重」的小表，
+    抽卡时按每张卡的状态码查表即可，不必逐个玩家计算倍率。
+"""
+
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from simulator import load_album_config, print_summary
+
+# 与 simulator.py 中 set_progress_score 的范围一致：Set 1~12、每个 Set 收集 1~9 张
+SET_IDS = tuple(range(1, 13))
+MAX_SET_CARDS = 9
+
+
+class PopulationResult:
+    """
+    批量模拟结果。
+    milestones[p, s, k-1] 为玩家 p 在 SET_IDS[s] 收集到第 k 张时的开包累计分值，未达到为 NaN。
+    """
+    def __init__(self, milestones, collected_counts, packs_opened, cards_drawn, duplicates):
+        self.milestones = milestones
+        self.collected_counts = collected_counts
+        self.packs_opened = packs_opened
+        self.cards_drawn = cards_drawn
+        self.duplicates = duplicates
+
+    @property
+    def num_players(self):
+        return len(self.collected_counts)
+
+    def milestone_means(self):
+        """set_id -> {张数: 达到该张数的玩家的分值均值}，与 run_multiple_simulations 的均值表同口径。"""
+        reached = ~np.isnan(self.milestones)
+        counts = reached.sum(axis=0)
+        sums = np.where(reached, self.milestones, 0.0).sum(axis=0)
+        means = {}
+        for s, sid in enumerate(SET_IDS):
+            means[sid] = {k + 1: sums[s, k] / counts[s, k] for k in range(MAX_SET_CARDS) if counts[s, k]}
+        return means
+
+    def collected_distribution(self):
+        values, times = np.unique(self.collected_counts, return_counts=True)
+        return Counter({int(v): int(t) for v, t in zip(values, times)})
+
+
+class PopulationSimulator:
+    """
+    玩家状态存为 uint8 矩阵 state[卡牌行, 玩家]，每张卡一个状态码：
+        0..K        未收集，所属 Set 已收集该张数（K 为单个 Set 的最大卡数）
+        OWNED       已收集
+        + LOCKED    所属 Set 对该玩家尚未解锁
+    卡牌行按分类连续排列，抽某一分类时取 state[分类起止行][:, 玩家] 即可；
+    每包开始时为每个分类算出 table[状态码, 卡牌列]，抽卡权重 = 查表。
+    另记 open_cards[分类, 玩家]：该分类已解锁且未收集的卡数，为 0 时本次必定抽到重复卡，直接计数跳过。
+    """
+    def __init__(self, config, num_players, enable_dynamic_unlock=True, enable_weight_control=True, seed=None):
+        """
+        输入:
+            config (AlbumConfig | str): 编译好的配置，或配置文件的根目录路径。
+            num_players (int): 同时模拟的玩家数。
+            enable_dynamic_unlock (bool): 是否开启根据收集进度动态解锁 Set 的卡池控制。
+            enable_weight_control (bool): 是否开启根据差异值干预概率的动态权重倍率控制。
+            seed (int | np.random.SeedSequence | None): 随机种子。
+        """
+        if isinstance(config, str):
+            config = load_album_config(config)
+        self.config = config
+        self.num_players = num_players
+        self.enable_dynamic_unlock = enable_dynamic_unlock
+        self.enable_weight_control = enable_weight_control
+        self.rng = np.random.default_rng(seed)
+
+        self.set_ids = tuple(sorted(set(SET_IDS) | set(config.cards_by_set) | set(config.unlock_map)))
+        set_column = {sid: i for i, sid in enumerate(self.set_ids)}
+        self.set_column = set_column
+        self.progress_cols = np.array([set_column[sid] for sid in SET_IDS], dtype=np.intp)
+
+        # 卡牌行：按分类连续排列，最后多一行占位（Set 卡数不足时填充用）
+        self.category_names = tuple(config.cards_by_category)
+        cards = [c for cat in self.category_names for c in config.cards_by_category[cat]]
+        self.num_cards = len(cards)
+        self.category_ranges = []
+        start = 0
+        for cat in self.category_names:
+            end = start + len(config.cards_by_category[cat])
+            self.category_ranges.append((start, end))
+            start = end
+        self.card_category = np.repeat(np.arange(len(self.category_names)), [b - a for a, b in self.category_ranges])
+        self.card_set_col = np.array([set_column[c.cardset_from] for c in cards] + [0], dtype=np.intp)
+        self.card_probs = np.array([c.card_prob for c in cards], dtype=np.float64)
+
+        max_set_cards = max((len(v) for v in config.cards_by_set.values()), default=0)
+        self.OWNED = max_set_cards + 1
+        self.LOCKED = max_set_cards + 2
+        if 2 * self.LOCKED > 256:
+            raise ValueError(f"单个 Set 卡牌数 {max_set_cards} 过多，状态码超出 uint8 范围")
+        self.NO_ELIGIBLE = 255
+        # 分类查找表中第 i 张卡的起始位置（见 _category_tables）
+        self.code_offsets = [(np.arange(end - start, dtype=np.int16) * 2 * self.LOCKED)[:, None]
+                             for start, end in self.category_ranges]
+        # set_card_cols[Set 列]：该 Set 的卡牌行，不足 K 张的以占位行补齐
+        by_set = [[i for i, c in enumerate(cards) if set_column[c.cardset_from] == s] for s in range(len(self.set_ids))]
+        self.set_card_cols = np.full((len(self.set_ids), max(max_set_cards, 1)), self.num_cards, dtype=np.intp)
+        for s, cols in enumerate(by_set):
+            self.set_card_cols[s, :len(cols)] = cols
+
+        self.unlock_req = np.array([config.unlock_map.get(sid, np.iinfo(np.int32).max) for sid in self.set_ids], dtype=np.int64)
+        # 不重复卡张数达到这些值时解锁范围可能变化（含「一个都没解锁时兜底 Set 1」的结束）
+        self.unlock_trigger = np.zeros(self.num_cards + 2, dtype=bool)
+        for req in config.unlock_map.values():
+            if 0 < req <= self.num_cards:
+                self.unlock_trigger[req] = True
+
+        # bisect_right 位置 -> 倍率表行号（0 为倍率 1.0），与 AlbumConfig.rate_interval 一致
+        self.rate_bounds = np.array(config.rate_bounds, dtype=np.float64)
+        self.pos_to_row = np.array([config.rate_interval(b) + 1 for b in [-np.inf] + list(config.rate_bounds)], dtype=np.intp)
+        # mult[row, 列]：倍率表第 row 行下各卡的倍率，row 0 表示区间外（倍率 1.0）
+        rows = [[1.0] * self.num_cards]
+        for interval in range(len(config.rate_table)):
+            rows.append([config.interval_multiplier(interval, c.star, c.is_gold) for c in cards])
+        self.mult = np.array(rows, dtype=np.float64)
+
+    def _eligible(self, unique):
+        """各玩家每张卡所属 Set 是否已解锁（布尔矩阵 [玩家, 卡牌列]），与 AlbumSimulator.get_unlocked_sets 一致。"""
+        if not self.enable_dynamic_unlock:
+            in_map = np.array([sid in self.config.unlock_map for sid in self.set_ids])
+            unlocked = np.broadcast_to(in_map, (len(unique), len(self.set_ids)))
+        else:
+            unlocked = unique[:, None] >= self.unlock_req[None, :]
+            # 兜底逻辑：至少默认解锁基础的 Set 1
+            none = ~unlocked.any(axis=1)
+            if none.any() and 1 in self.set_column:
+                unlocked[none, self.set_column[1]] = True
+        return unlocked[:, self.card_set_col[:self.num_cards]]
+
+    def _open_cards(self, block):
+        """
+        输入:
+            block (np.ndarray): 部分玩家的状态码 state[:num_cards, 玩家]。
+        输出:
+            np.ndarray: [分类, 玩家] 已解锁且未收集的卡数；分类里没有已解锁的卡时为 NO_ELIGIBLE（需走兼容逻辑）。
+        """
+        eligible = block < self.LOCKED
+        starts = [start for start, _ in self.category_ranges]
+        num_eligible = np.add.reduceat(eligible.astype(np.int16), starts, axis=0)
+        num_open = np.add.reduceat((eligible & (block != self.OWNED)).astype(np.int16), starts, axis=0)
+        return np.where(num_eligible > 0, num_open, self.NO_ELIGIBLE).astype(np.uint8)
+
+    def _split(self, players, probs):
+        """
+        把 players 随机分给各个选项：各选项人数服从多项分布，再随机打乱分配，
+        与每个玩家各自按概率抽一次等价，但不必逐个二分查找。
+        输出:
+            tuple: (打乱后的 players, 各选项在其中的起止位置)
+        """
+        counts = self.rng.multinomial(len(players), probs)
+        return self.rng.permutation(players), np.concatenate(([0], np.cumsum(counts)))
+
+    def _compile_pack(self, pack):
+        """PackTable 转为 (选项数组, 概率数组)；分类以 category_names 中的下标表示（未知分类为 -1）。"""
+        to_index = {cat: i for i, cat in enumerate(self.category_names)}
+        def arrays(sampler, categorical=True):
+            if sampler is None:
+                return None
+            items = [to_index.get(c, -1) for c in sampler.items] if categorical else sampler.items
+            probs = np.diff(sampler.cumulative, prepend=0.0) / sampler.total
+            return np.array(items), probs
+        return arrays(pack.count_sampler, False), arrays(pack.category_sampler), arrays(pack.guarantee_sampler)
+
+    def _weight_table(self, score):
+        """
+        当前分值下的权重表 table[状态码, 卡牌列]。
+        未收集卡的倍率取决于所属 Set 的偏差值 = 期待张数 - 已收集张数，已收集张数只有 0..K 几种取值。
+        """
+        k = np.arange(self.OWNED)
+        table = np.zeros((2 * self.LOCKED, self.num_cards), dtype=np.float64)
+        if self.enable_weight_control:
+            expected = np.array([self.config.expected_cards(sid, score) for sid in self.set_ids])
+            pos = np.searchsorted(self.rate_bounds, expected[:, None] - k[None, :], side='right')
+            rows = self.pos_to_row[pos]                           # [Set 列, 张数]
+            card_rows = rows[self.card_set_col[:self.num_cards]].T  # [张数, 卡牌列]
+            table[:self.OWNED] = self.card_probs * self.mult[card_rows, np.arange(self.num_cards)]
+        else:
+            table[:self.OWNED] = self.card_probs
+        table[self.OWNED] = self.card_probs
+        # LOCKED 及以上（未解锁）保持 0
+        return table
+
+    def _category_tables(self, table):
+        """
+        把权重表按分类拆成一维查找表：第 c 个分类的 flat[列 * 状态码数 + 状态码]，
+        抽卡时 flat.take(状态码 + offsets[c]) 即得每个玩家每张卡的权重。
+        """
+        return [table[:, start:end].T.ravel() for start, end in self.category_ranges]
+
+    def _draw(self, players, c, state, flat):
+        """为 players 中的每个玩家从第 c 个分类里按当前权重抽一张卡，返回卡牌行号。"""
+        start, end = self.category_ranges[c]
+        codes = state[start:end][:, players]
+        weights = flat.take(codes + self.code_offsets[c])
+        # 按卡牌逐行累加（比 np.cumsum 沿短轴累加快得多）
+        for i in range(1, end - start):
+            np.add(weights[i - 1], weights[i], out=weights[i])
+        total = weights[-1]
+        choice = np.count_nonzero(weights < self.rng.random(len(players)) * total, axis=0)
+
+        zero = np.flatnonzero(total <= 0)
+        if len(zero):
+            choice[zero] = self._draw_fallback(codes[:, zero], flat, c)
+        return start + np.minimum(choice, end - start - 1)
+
+    def _draw_fallback(self, codes, flat, c):
+        """已解锁权重全为 0 的玩家，规则同 AlbumSimulator.draw_card_by_category。"""
+        eligible = codes < self.LOCKED
+        has_eligible = eligible.any(axis=0)
+        # 兼容逻辑：已解锁的 Set 里没有这一分类的卡时退回全局卡池，无视解锁逻辑
+        weights = flat.take(codes % self.LOCKED + self.code_offsets[c])
+        # 有已解锁卡但权重全为 0（或全局卡池权重也全为 0）时均匀抽取
+        uniform = has_eligible | (weights.sum(axis=0) <= 0)
+        weights = np.where(uniform, np.where(has_eligible, eligible, True), weights)
+        cumulative = np.cumsum(weights, axis=0)
+        r = self.rng.random(codes.shape[1]) * cumulative[-1]
+        return np.count_nonzero(cumulative < r, axis=0)
+
+    def run(self, pack_sequence):
+        """
+        所有玩家一起按 pack_sequence 开包。
+        输入:
+            pack_sequence (list[int]): 开包序列（卡包 ID）。
+        输出:
+            PopulationResult: 各玩家的分值节点、最终不重复卡张数与统计。
+        """
+        n = self.num_players
+        state = np.zeros((self.num_cards + 1, n), dtype=np.uint8)
+        state[:self.num_cards] = np.where(self._eligible(np.zeros(n, dtype=np.int64)), 0, self.LOCKED).T
+        set_counts = np.zeros((len(self.set_ids), n), dtype=np.uint8)
+        open_cards = self._open_cards(state[:self.num_cards])
+        unique = np.zeros(n, dtype=np.int64)
+        milestones = np.full((n, len(self.set_ids), MAX_SET_CARDS), np.nan)
+        cards_drawn = 0
+        duplicates = 0
+        score = 0.0
+        compiled = {}
+        flats = self._category_tables(self._weight_table(score))
+
+        for case_id in pack_sequence:
+            pack = self.config.pack_tables[case_id]
+            if case_id not in compiled:
+                compiled[case_id] = self._compile_pack(pack)
+            counts, category, guarantee = compiled[case_id]
+            if pack.score is not None:
+                score += pack.score
+                flats = self._category_tables(self._weight_table(score))
+
+            draw_counts = self.rng.permutation(np.repeat(counts[0], self.rng.multinomial(n, counts[1])))
+            for i in range(int(draw_counts.max(initial=0))):
+                active = np.flatnonzero(draw_counts > i)
+                # 第1张卡必定从保底卡池里抽，其余的卡从普通库里抽
+                items, probs = guarantee if (i == 0 and guarantee is not None) else category
+                active, splits = self._split(active, probs)
+                players_parts, cols_parts = [], []
+                for c, lo, hi in zip(items, splits[:-1], splits[1:]):
+                    if c < 0 or lo == hi:
+                        continue
+                    players = active[lo:hi]
+                    # 所选分类里已解锁的卡都已收集：无论抽到哪张都是重复卡
+                    sure = open_cards[c, players] == 0
+                    num_sure = int(np.count_nonzero(sure))
+                    if num_sure:
+                        cards_drawn += num_sure
+                        duplicates += num_sure
+                        players = players[~sure]
+                        if not len(players):
+                            continue
+                    players_parts.append(players)
+                    cols_parts.append(self._draw(players, c, state, flats[c]))
+                if not players_parts:
+                    continue
+                players = np.concatenate(players_parts)
+                cols = np.concatenate(cols_parts)
+                cards_drawn += len(players)
+
+                # 本步每个玩家只抽一张，玩家互不重复，可整体更新
+                codes = state[cols, players]
+                is_new = codes % self.LOCKED != self.OWNED
+                duplicates += int(len(players) - np.count_nonzero(is_new))
+                players, cols, codes = players[is_new], cols[is_new], codes[is_new]
+                if not len(players):
+                    continue
+                s = self.card_set_col[cols]
+                set_counts[s, players] += 1
+                was_open = codes < self.LOCKED
+                open_cards[self.card_category[cols[was_open]], players[was_open]] -= 1
+                reached = set_counts[s, players].astype(np.intp)
+                # 记录跨越的分值节点：本包分值在抽卡前已计入
+                ok = reached <= MAX_SET_CARDS
+                milestones[players[ok], s[ok], reached[ok] - 1] = score
+                # 同 Set 其余未收集卡的状态码改为新的张数，抽到的卡标记为已收集
+                set_cols = self.set_card_cols[s]
+                sub = state[set_cols, players[:, None]]
+                base = sub % self.LOCKED
+                state[set_cols, players[:, None]] = np.where(base == self.OWNED, sub, sub - base + reached[:, None].astype(np.uint8))
+                state[cols, players] = codes - codes % self.LOCKED + self.OWNED
+
+                unique[players] += 1
+                if self.enable_dynamic_unlock:
+                    hit = players[self.unlock_trigger[unique[players]]]
+                    if len(hit):
+                        block = state[:self.num_cards, hit] % self.LOCKED
+                        state[:self.num_cards, hit] = block + np.where(self._eligible(unique[hit]), 0, self.LOCKED).T
+                        open_cards[:, hit] = self._open_cards(state[:self.num_cards, hit])
+
+        return PopulationResult(milestones[:, self.progress_cols, :], unique, len(pack_sequence), cards_drawn, duplicates)
+
+
+def run_population(data_dir, pack_sequence, num_players=100000, enable_dynamic_unlock=True, enable_weight_control=True, seed=None):
+    """
+    单进程批量模拟 num_players 个玩家并打印与 run_multiple_simulations 相同格式的汇总报表。
+    输出:
+        PopulationResult: 模拟结果。
+    """
+    print(f"\n[批量模拟] {num_players} 个玩家同步开 {len(pack_sequence)} 包...")
+    start = time.perf_counter()
+    sim = PopulationSimulator(data_dir, num_players, enable_dynamic_unlock, enable_weight_control, seed)
+    result = sim.run(pack_sequence)
+    elapsed = time.perf_counter() - start
+    print(f"[批量模拟] 完成，用时 {elapsed:.1f} 秒（{num_players * len(pack_sequence) / elapsed:,.0f} 包/秒）")
+    print_summary(num_players, result.collected_distribution(), result.milestone_means())
+    return result
+
+
+if __name__ == '__main__':
+    # 默认读取本脚本所在目录下的 album_config，可在命令行传入玩家数
+    data_dir = os.path.dirname(os.path.abspath(__file__))
+    num_players = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    pack_sequence = ([1] * 12 + [2] * 9 + [3] * 5 + [4]*3 + [5]*1) * 30
+    run_population(data_dir, pack_sequence, num_players=num_players,
+                   enable_dynamic_unlock=True, enable_weight_control=True)
@@ -2,7 +2,12 @@ import csv
 import random
 import os
 import bisect
+import functools
+import hashlib
+import math
 import multiprocessing
+from statistics import NormalDist
+from types import MappingProxyType
 
 def parse_csv(filepath):
     """
@@ -33,48 +38,367 @@ def parse_csv(filepath):
             data.append(doc)
     return data
 
+def _get_card_category(star, card_type):
+    if card_type == 1:
+        return {1: "OneStarCard", 2: "TwoStarCard", 3: "ThreeStarCard", 4: "FourStarCard", 5: "FiveStarCard", 6: "SixStarCard"}.get(star, "Unknown")
+    elif card_type == 2:
+        return {4: "FourStarGold", 5: "FiveStarGold", 6: "SixStarGold"}.get(star, "Unknown")
+    return "Unknown"
+
+def parse_probability_string(prob_str):
+    # 将 "OneStarCard,5789|TwoStarCard,2995" 这样的字符串解析为 { 分类名称: 权重数值 } 字典
+    weights = {}
+    for item in prob_str.split('|'):
+        if ',' in item:
+            k, v = item.split(',')
+            weights[k.strip()] = float(v.strip())
+    return weights
+
+class WeightedSampler:
+    """
+    预先累加好权重的带权随机选择器：一次 uniform 加一次 bisect。
+    与 choose_category 的逐项相减等价（同一随机数选中同一项），多次抽取时无需重复求和与遍历字典。
+    """
+    __slots__ = ('items', 'cumulative', 'total')
+
+    def __init__(self, weights):
+        """
+        输入:
+            weights (dict): { 选项: 权重 }，按字典顺序累加。
+        """
+        self.items = tuple(weights.keys())
+        cumulative = []
+        total = 0.0
+        for w in weights.values():
+            total += w
+            cumulative.append(total)
+        self.cumulative = tuple(cumulative)
+        self.total = total
+
+    def sample(self, rng=random):
+        """rng 为随机源（random.Random 实例或 random 模块本身）。"""
+        r = rng.uniform(0, self.total)
+        # 第一个累计权重 >= r 的项；浮点误差导致越界时取最后一项（与 choose_category 的兜底一致）
+        idx = bisect.bisect_left(self.cumulative, r)
+        return self.items[idx if idx < len(self.items) else -1]
+
+class FenwickSampler:
+    """
+    树状数组（Fenwick tree）带权采样器：改单项权重 O(log n)，按权重抽取 O(log n)。
+    抽取结果与「按顺序累加权重，取第一个累计值 >= r 的项」一致，权重为 0 的项不会被抽中。
+    """
+    __slots__ = ('weights', 'tree', 'size', 'top', 'total')
+
+    def __init__(self, weights):
+        """
+        输入:
+            weights (list[float]): 各项初始权重（非负）。
+        """
+        self.size = len(weights)
+        self.weights = list(weights)
+        # O(n) 建树：每个节点把自己的部分和累加到父节点
+        self.tree = [0.0] * (self.size + 1)
+        for i, w in enumerate(self.weights, 1):
+            self.tree[i] += w
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+        self.top = 1 << (self.size.bit_length() - 1) if self.size else 0
+        # 权重总和随 set() 增量维护，抽取时无需再求前缀和
+        self.total = sum(self.weights)
+
+    def set(self, index, weight):
+        """把第 index 项（从 0 开始）的权重改为 weight。"""
+        delta = weight - self.weights[index]
+        if delta == 0:
+            return
+        self.weights[index] = weight
+        self.total += delta
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def find(self, r):
+        """
+        返回第一个前缀和 >= r 的项的下标；全部权重为 0 时返回 -1。
+        增量更新带来的浮点误差可能让结果落在权重为 0 的项或越界，此时就近取后面（否则前面）第一个正权重项。
+        """
+        pos = 0
+        step = self.top
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] < r:
+                pos = nxt
+                r -= self.tree[nxt]
+            step >>= 1
+        weights = self.weights
+        for idx in range(min(pos, self.size - 1), self.size):
+            if weights[idx] > 0:
+                return idx
+        for idx in range(min(pos, self.size) - 1, -1, -1):
+            if weights[idx] > 0:
+                return idx
+        return -1
+
+class PackTable:
+    """
+    一种卡包（cardcase.csv 一行）编译后的抽取表：张数、分类、保底分类的采样器与开包得分。
+    """
+    __slots__ = ('case_id', 'count_sampler', 'category_sampler', 'guarantee_sampler', 'score')
+
+    def __init__(self, case_id, case_info, score=None):
+        """
+        输入:
+            case_id (int): 卡包 ID。
+            case_info (dict): parse_csv 解析出的 cardcase.csv 一行。
+            score (float | None): drop_score 中该卡包的开包得分，未配置为 None。
+        """
+        self.case_id = case_id
+        self.score = score
+        # 例如："1,100" (抽1张，100%权重) 或 "4,25|5,50|6,25" (概率抽多张)
+        cnt_opts = parse_probability_string(case_info['card_count'])
+        self.count_sampler = WeightedSampler({int(k): w for k, w in cnt_opts.items()})
+        # 各类颜色卡的比例
+        cat_weights = parse_probability_string(case_info['card_type'])
+        self.category_sampler = WeightedSampler(cat_weights)
+        # 根据更新的机制：保底卡池的权重直接由 min_guarantee_prob 读取
+        guarantee_weights = parse_probability_string(case_info.get('min_guarantee_prob', ''))
+        # 兼容兜底：如果没配，退回老规则
+        if not guarantee_weights and 'min_guarantee' in case_info:
+            guarantees = [x.strip() for x in case_info['min_guarantee'].split(',')]
+            guarantee_weights = {g: cat_weights.get(g, 0) for g in guarantees if g in cat_weights}
+        # 保底权重合计为 0 时第 1 张卡也从普通卡池抽
+        self.guarantee_sampler = WeightedSampler(guarantee_weights) if sum(guarantee_weights.values()) > 0 else None
+
+class Card:
+    """
+    卡牌记录：card.csv 的一行在加载时一次性转换为整数 / 浮点字段，抽卡热路径上不再做 int()/float() 与字典查找。
+    """
+    __slots__ = ('card_id', 'card_name', 'star', 'card_prob', 'card_type', 'cardset_from', 'is_gold', 'cat', 'slot')
+
+    def __init__(self, row):
+        """
+        输入:
+            row (dict): parse_csv 解析出的 card.csv 一行。
+        """
+        self.card_id = int(row['card_id'])
+        self.card_name = row.get('card_name', 'Unknown')
+        self.star = int(row['star'])
+        self.card_prob = float(row.get('card_prob', 10))
+        self.card_type = int(row.get('card_type', 1))
+        self.cardset_from = int(row['cardset_from'])
+        self.is_gold = (self.card_type == 2)
+        self.cat = _get_card_category(self.star, self.card_type)
+        # 在 cards_by_category[cat] 中的下标，由 AlbumConfig 填写
+        self.slot = None
+
+    def __repr__(self):
+        return f"Card({self.card_id}, ★{self.star}, set={self.cardset_from}, {self.cat})"
+
+def _compile_rate_change(rows):
+    """
+    把 drop_rate_change 表编译为有序区间边界与稠密倍率表，get_multiplier 一次 bisect 加下标即可查到倍率。
+    所有行的上下限切分出互不重叠的基本区间 [bounds[i], bounds[i+1])，每个基本区间取表中第一条覆盖它的行
+    （与原先逐行线性查找、命中即返回的语义一致）；没有行覆盖的区间记为 None，倍率为 1.0。
+    输入:
+        rows (list[dict]): parse_csv 解析出的 drop_rate_change.csv 各行。
+    输出:
+        tuple: (bounds, table)。bounds 为升序边界元组；table[i][星级下标][是否金卡] 为倍率（星级下标 0 表示 1 星）。
+    """
+    ranges = []
+    for row in rows:
+        if 'delta_range_min' not in row: continue
+        min_val = float(row['delta_range_min']) if row['delta_range_min'] else -9999
+        max_val = float(row['delta_range_max']) if row['delta_range_max'] else 9999
+        normal = [float(x) for x in row['final_change_list'].split(',')]
+        # 如果没有金卡列退回普通卡列
+        gold = [float(x) for x in row['final_change_list_gold'].split(',')] if row.get('final_change_list_gold') else normal
+        if len(normal) < 6 or len(gold) < 6:
+            raise ValueError(f"drop_rate_change 区间 [{min_val}, {max_val}) 的倍率列表不足 6 个星级")
+        ranges.append((min_val, max_val, tuple((normal[i], gold[i]) for i in range(6))))
+
+    bounds = tuple(sorted({v for min_val, max_val, _ in ranges for v in (min_val, max_val)}))
+    table = []
+    for lo, hi in zip(bounds, bounds[1:]):
+        table.append(next((rates for min_val, max_val, rates in ranges if min_val <= lo and hi <= max_val), None))
+    return bounds, tuple(table)
+
+class AlbumConfig:
+    """
+    编译后的卡册配置（只读）。一次性解析 album_config 下的全部 CSV 并建立查找表，
+    可被任意多个 AlbumSimulator 共享；多进程模拟时每个子进程只加载一次。
+    列表字段为 tuple，映射字段为只读 MappingProxyType，构建完成后禁止再赋值属性。
+    """
+    def __init__(self, data_dir):
+        """
+        输入:
+            data_dir (str): 配置文件的根目录路径（其下包含 album_config 文件夹）。
+        """
+        config_dir = os.path.join(data_dir, 'album_config')
+        cards = parse_csv(os.path.join(config_dir, 'card.csv'))
+        cardcases = parse_csv(os.path.join(config_dir, 'cardcase.csv'))
+        cardsets = parse_csv(os.path.join(config_dir, 'cardset.csv'))
+        drop_expect = parse_csv(os.path.join(config_dir, 'drop_expect.csv'))
+        drop_rate_change = parse_csv(os.path.join(config_dir, 'drop_rate_change.csv'))
+        drop_score = parse_csv(os.path.join(config_dir, 'drop_score.csv'))
+        drop_unlock = parse_csv(os.path.join(config_dir, 'drop_unlock.csv'))
+
+        # 卡牌转换为 Card 记录（无 card_id 的空行丢弃）
+        cards = [Card(row) for row in cards if row.get('card_id')]
+        cards_by_category = {}
+        cards_by_set = {}
+        for c in cards:
+            c.slot = len(cards_by_category.setdefault(c.cat, []))
+            cards_by_category[c.cat].append(c)
+            cards_by_set.setdefault(c.cardset_from, []).append(c)
+
+        # 期望收集张数曲线：set_id -> 期望分值列表 (对应1~9张的期待分值)
+        expect_curves = {}
+        for row in drop_expect:
+            if 'final_expect_list' not in row or not row['final_expect_list']: continue
+            expect_curves[int(row['id'])] = tuple(float(x) for x in row['final_expect_list'].split(','))
+
+        self.data_dir = data_dir
+        self.cards = tuple(cards)
+        self.cardcases = tuple(cardcases)
+        self.cardsets = tuple(cardsets)
+        self.drop_expect = tuple(drop_expect)
+        self.drop_rate_change = tuple(drop_rate_change)
+        self.drop_score = tuple(drop_score)
+        self.drop_unlock = tuple(drop_unlock)
+        self.cards_by_category = MappingProxyType({cat: tuple(lst) for cat, lst in cards_by_category.items()})
+        self.cards_by_set = MappingProxyType({sid: tuple(lst) for sid, lst in cards_by_set.items()})
+        self.cases_map = MappingProxyType({int(c['cardcase_id']): c for c in cardcases if 'cardcase_id' in c})
+        self.score_map = MappingProxyType({int(c['cardcase_id']): float(c['score']) for c in drop_score if 'cardcase_id' in c})
+        self.unlock_map = MappingProxyType({int(c['id']): int(c['unlock_num']) for c in drop_unlock if 'id' in c})
+        self.expect_curves = MappingProxyType(expect_curves)
+        # 各 Set 按解锁所需不重复卡张数升序排列：[(unlock_num, set_id)]，供模拟器用指针逐级解锁
+        self.unlock_order = tuple(sorted((req, sid) for sid, req in self.unlock_map.items()))
+        # 偏差值区间边界与 [区间][星级][金卡] 倍率表
+        self.rate_bounds, self.rate_table = _compile_rate_change(drop_rate_change)
+        # 各卡包的张数 / 分类 / 保底采样器
+        self.pack_tables = MappingProxyType({cid: PackTable(cid, case, self.score_map.get(cid)) for cid, case in self.cases_map.items()})
+        self._frozen = True
+
+    def expected_cards(self, set_id, score):
+        """
+        根据游戏分值计算对应 Set 的期待收集张数（带小数）。
+        输入:
+            set_id (int): 目标卡册 Set 的 ID (1-12)。
+            score (float): 玩家游戏分值。
+        输出:
+            float: 该分值区间下线性插值计算得出的预期收集卡牌张数量。
+        """
+        if set_id not in self.expect_curves: return 0.0
+        scores = self.expect_curves[set_id]
+        if score <= 0: return 0.0
+        if score >= scores[-1]: return 9.0
+        
+        # 使用二分法寻找当前分值落在哪一个张数区间
+        idx = bisect.bisect_left(scores, score)
+        if idx == 0:
+            # 处在 0 张 (score 0) 到 1 张 (score [0]) 之间
+            p0, c0 = 0, 0
+            p1, c1 = scores[0], 1
+        else:
+            p0, c0 = scores[idx-1], idx
+            p1, c1 = scores[idx], idx + 1
+            
+        # 根据当前分值做线性插值，算出一个带小数的期望张数
+        ratio = (score - p0) / (p1 - p0)
+        return c0 + ratio
+
+    def score_for_expected(self, set_id, target):
+        """
+        expected_cards 的反函数：期待收集张数首次达到 target 时的分值（近似值，调用方需留余量并用 expected_cards 复核）。
+        永远达不到时返回 inf。
+        """
+        if target <= 0:
+            return float('-inf')
+        if set_id not in self.expect_curves or target > 9:
+            return float('inf')
+        scores = self.expect_curves[set_id]
+        k = min(math.ceil(target) - 1, len(scores) - 1)  # target 落在 (k, k+1] 张之间
+        p0 = scores[k-1] if k > 0 else 0
+        return p0 + (target - k) * (scores[k] - p0)
+
+    def rate_position(self, c_delta):
+        """偏差值在 rate_bounds 中的插入位置（bisect_right），位置变化即倍率区间变化。"""
+        return bisect.bisect_right(self.rate_bounds, c_delta)
+
+    def rate_interval(self, c_delta):
+        """偏差值所在的倍率区间下标；落在表外或没有行覆盖时返回 -1（倍率 1.0）。"""
+        i = self.rate_position(c_delta) - 1
+        if i < 0 or i >= len(self.rate_table) or self.rate_table[i] is None:
+            return -1
+        return i
+
+    def interval_multiplier(self, interval, star, is_gold):
+        """rate_interval 得到的区间下 star 星（普通 / 金卡）的倍率。"""
+        if interval < 0:
+            return 1.0
+        # 注意星级下标 0 表示 1 星，下标 1 表示 2 星...
+        idx = star - 1 if 1 <= star <= 6 else 0
+        return self.rate_table[interval][idx][1 if is_gold else 0]
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"AlbumConfig 为只读配置，不能修改属性 {name}")
+        object.__setattr__(self, name, value)
+
+@functools.lru_cache(maxsize=None)
+def load_album_config(data_dir):
+    """
+    按目录加载并缓存 AlbumConfig：同一进程内对同一 data_dir 只解析一次 CSV。
+    输入:
+        data_dir (str): 配置文件的根目录路径。
+    输出:
+        AlbumConfig: 编译好的只读配置。
+    """
+    return AlbumConfig(data_dir)
+
 class AlbumSimulator:
-    def __init__(self, data_dir, enable_dynamic_unlock=True, enable_weight_control=True):
+    def __init__(self, config, enable_dynamic_unlock=True, enable_weight_control=True, seed=None):
         """
-        初始化模拟器类并加载所有配置表。
+        初始化模拟器。配置只读共享，玩家状态由 reset() 初始化，复用同一实例跑多轮时只需再次 reset()。
         输入:
-            data_dir (str): 配置文件的根目录路径。
+            config (AlbumConfig | str): 编译好的配置，或配置文件的根目录路径（经 load_album_config 缓存加载）。
             enable_dynamic_unlock (bool): 是否开启根据收集进度动态解锁 Set 的卡池控制。
             enable_weight_control (bool): 是否开启根据差异值干预概率的动态权重倍率控制。
+            seed (int | None): 随机种子；None 时使用全局 random 模块（不可复现）。
         """
+        if not isinstance(config, AlbumConfig):
+            config = load_album_config(config)
+        self.config = config
         self.enable_dynamic_unlock = enable_dynamic_unlock
         self.enable_weight_control = enable_weight_control
         
-        # 加载各项配置表
-        self.cards = parse_csv(os.path.join(data_dir, 'album_config', 'card.csv'))
-        self.cardcases = parse_csv(os.path.join(data_dir, 'album_config', 'cardcase.csv'))
-        self.cardsets = parse_csv(os.path.join(data_dir, 'album_config', 'cardset.csv'))
-        self.drop_expect = parse_csv(os.path.join(data_dir, 'album_config', 'drop_expect.csv'))
-        self.drop_rate_change = parse_csv(os.path.join(data_dir, 'album_config', 'drop_rate_change.csv'))
-        self.drop_score = parse_csv(os.path.join(data_dir, 'album_config', 'drop_score.csv'))
-        self.drop_unlock = parse_csv(os.path.join(data_dir, 'album_config', 'drop_unlock.csv'))
+        # 只读配置表与查找表直接引用共享配置
+        self.cards = config.cards
+        self.cardcases = config.cardcases
+        self.cardsets = config.cardsets
+        self.drop_expect = config.drop_expect
+        self.drop_rate_change = config.drop_rate_change
+        self.drop_score = config.drop_score
+        self.drop_unlock = config.drop_unlock
+        self.cards_by_category = config.cards_by_category
+        self.cases_map = config.cases_map
+        self.score_map = config.score_map
+        self.unlock_map = config.unlock_map
+        self.expect_curves = config.expect_curves
         
-        # 预处理数据
-        self.cards_by_category = {}
-        for c in self.cards:
-            if 'card_id' not in c or not c['card_id']: continue
-            cat = self._get_card_category(int(c['star']), int(c['card_type']))
-            c['cat'] = cat
-            self.cards_by_category.setdefault(cat, []).append(c)
-
-        self.cases_map = {int(c['cardcase_id']): c for c in self.cardcases if 'cardcase_id' in c}
-        self.score_map = {int(c['cardcase_id']): float(c['score']) for c in self.drop_score if 'cardcase_id' in c}
-        self.unlock_map = {int(c['id']): int(c['unlock_num']) for c in self.drop_unlock if 'id' in c}
+        self.rng = random
+        self.reset(seed)
         
-        # 期望收集张数曲线：set_id -> 期望分值列表 (对应1~9张的期待分值)
-        self.expect_curves = {}
-        for row in self.drop_expect:
-            if 'final_expect_list' not in row or not row['final_expect_list']: continue
-            set_id = int(row['id'])
-            scores = [float(x) for x in row['final_expect_list'].split(',')]
-            # scores 里面存的是收集 1..9 张卡所对应的目标期望分数
-            self.expect_curves[set_id] = scores
-            
+    def reset(self, seed=None):
+        """
+        清空玩家状态与统计数据，回到开第一个卡包之前（配置不变）。
+        输入:
+            seed (int | None): 本轮的随机种子，给定时换用以它初始化的独立随机源；None 时沿用当前随机源。
+        """
+        if seed is not None:
+            self.rng = random.Random(seed)
         # 玩家状态信息
         self.player_score = 0.0
         self.collected_cards = set() # 存放已收集的 card_id
@@ -86,28 +410,136 @@ class AlbumSimulator:
         
         # 记录每个 Set 收集到 1~9 张时的游戏分值状态
         # 结构: {set_id: {card_count: score_when_reached}}
+        # 每次 reset 新建字典，之前 run 返回出去的结果不受影响
         self.set_progress_score = {sid: {} for sid in range(1, 13)}
         
+        # 增量维护的查询状态：各 Set 已收集张数、已解锁 Set（unlock_order 上的指针）
+        self.set_counts = {}
+        self._unlock_pos = 0
+        self._unlocked_sets = set()
+        self._advance_unlock()
+        
+        # 抽卡权重状态：卡牌权重只取决于是否已收集、所属 Set 偏差值落在哪个倍率区间、所属 Set 是否解锁，
+        # 三者变化时才更新相关卡牌在各分类 FenwickSampler 中的权重（未解锁 Set 的卡权重为 0）
+        self._eligible_sets = self.get_unlocked_sets()
+        self._set_rate = {}
+        self._rate_change_score = {} # 各 Set 分值达到多少时偏差值可能跨入下一倍率区间
+        for sid in self.config.cards_by_set:
+            self._set_rate[sid] = self._current_rate_interval(sid)
+        self._next_rate_change = min(self._rate_change_score.values(), default=float('inf'))
+        self._samplers = {}
+        self._eligible_counts = {}
+        for cat, cards in self.cards_by_category.items():
+            self._samplers[cat] = FenwickSampler([self._eligible_weight(c) for c in cards])
+            self._eligible_counts[cat] = sum(1 for c in cards if c.cardset_from in self._eligible_sets)
+        
+    def _advance_unlock(self):
+        """不重复卡张数增加后，沿 unlock_order 推进解锁指针。"""
+        order = self.config.unlock_order
+        unique_len = len(self.collected_cards)
+        changed = False
+        while self._unlock_pos < len(order) and order[self._unlock_pos][0] <= unique_len:
+            self._unlocked_sets.add(order[self._unlock_pos][1])
+            self._unlock_pos += 1
+            changed = True
+        return changed
+        
+    def _current_rate_interval(self, set_id):
+        """
+        计算 Set 当前的倍率区间，并记录分值涨到多少时偏差值会碰到下一个区间边界。
+        分值只增不减、期待张数随分值单调不减，收集张数不变时区间只会在分值越过该阈值后变化。
+        """
+        if not self.enable_weight_control:
+            self._rate_change_score[set_id] = float('inf')
+            return -1
+        config = self.config
+        count = self.get_set_collected_count(set_id)
+        delta = self.get_expected_cards(set_id) - count
+        pos = config.rate_position(delta)
+        if pos < len(config.rate_bounds):
+            threshold = config.score_for_expected(set_id, config.rate_bounds[pos] + count)
+            # 反函数有浮点误差，提前一点触发，届时再按正向插值复核
+            self._rate_change_score[set_id] = threshold - 1e-9 * max(1.0, abs(threshold))
+        else:
+            self._rate_change_score[set_id] = float('inf')
+        return config.rate_interval(delta)
+        
+    def _card_weight(self, card):
+        """卡牌当前的抽取权重（不考虑解锁）：开启权重调控且未收集时乘以所属 Set 当前区间的倍率。"""
+        if self.enable_weight_control and card.card_id not in self.collected_cards:
+            return card.card_prob * self.config.interval_multiplier(self._set_rate[card.cardset_from], card.star, card.is_gold)
+        return card.card_prob
+        
+    def _eligible_weight(self, card):
+        return self._card_weight(card) if card.cardset_from in self._eligible_sets else 0.0
+        
+    def _update_set_weights(self, set_id):
+        for card in self.config.cards_by_set.get(set_id, ()):
+            self._samplers[card.cat].set(card.slot, self._eligible_weight(card))
+        
+    def _refresh_set_rate(self, set_id):
+        """Set 的偏差值可能变化后（分值增加、收集到该 Set 的新卡）重新定位倍率区间，区间变了才更新该 Set 的卡牌权重。"""
+        interval = self._current_rate_interval(set_id)
+        if interval != self._set_rate[set_id]:
+            self._set_rate[set_id] = interval
+            self._update_set_weights(set_id)
+        
+    def _refresh_eligible_sets(self):
+        """解锁范围变化后，更新进出卡池的 Set 的卡牌权重与各分类的可抽卡数。"""
+        eligible = self.get_unlocked_sets()
+        for sid in eligible ^ self._eligible_sets:
+            sign = 1 if sid in eligible else -1
+            for card in self.config.cards_by_set.get(sid, ()):
+                self._eligible_counts[card.cat] += sign
+        changed = eligible ^ self._eligible_sets
+        self._eligible_sets = eligible
+        for sid in changed:
+            self._update_set_weights(sid)
+        
+    def add_score(self, score):
+        """
+        增加玩家游戏分值，并按新的期望收集张数刷新各 Set 的倍率区间。
+        输入:
+            score (float): 本次增加的分值（开包得分）。
+        """
+        self.player_score += score
+        if self.player_score < self._next_rate_change:
+            return
+        for sid in [sid for sid, threshold in self._rate_change_score.items() if self.player_score >= threshold]:
+            self._refresh_set_rate(sid)
+        self._next_rate_change = min(self._rate_change_score.values())
+        
+    def collect_card(self, card):
+        """
+        记录抽到的一张卡，并增量更新 Set 计数与解锁状态。
+        输入:
+            card (Card): 抽到的卡牌。
+        输出:
+            bool: 是否为新卡（此前未收集）。
+        """
+        if card.card_id in self.collected_cards:
+            return False
+        self.collected_cards.add(card.card_id)
+        sid = card.cardset_from
+        self.set_counts[sid] = self.set_counts.get(sid, 0) + 1
+        # 已收集的卡不再受倍率干预；Set 计数变化可能改变其余卡的倍率区间
+        if card.cardset_from in self._eligible_sets:
+            self._samplers[card.cat].set(card.slot, card.card_prob)
+        self._refresh_set_rate(sid)
+        self._next_rate_change = min(self._rate_change_score.values())
+        if self._advance_unlock():
+            self._refresh_eligible_sets()
+        return True
+        
     def _get_card_category(self, star, card_type):
-        if card_type == 1:
-            return {1: "OneStarCard", 2: "TwoStarCard", 3: "ThreeStarCard", 4: "FourStarCard", 5: "FiveStarCard", 6: "SixStarCard"}.get(star, "Unknown")
-        elif card_type == 2:
-            return {4: "FourStarGold", 5: "FiveStarGold", 6: "SixStarGold"}.get(star, "Unknown")
-        return "Unknown"
+        return _get_card_category(star, card_type)
         
     def get_unlocked_sets(self):
         # 如果关闭了动态卡池限制，则默认所有 Set 全部解锁
         if not self.enable_dynamic_unlock:
             return set(self.unlock_map.keys())
-        
-        unlocked = set()
-        unique_len = len(self.collected_cards)
-        for sid, req in self.unlock_map.items():
-            if unique_len >= req:
-                unlocked.add(sid)
-        if not unlocked:
-            unlocked.add(1) # 兜底逻辑：至少默认解锁基础的 Set 1
-        return unlocked
+        # 由 collect_card 增量维护，返回副本避免调用方改动内部状态
+        return set(self._unlocked_sets or (1,)) # 兜底逻辑：至少默认解锁基础的 Set 1
         
     def get_expected_cards(self, set_id):
         """
@@ -117,31 +549,10 @@ class AlbumSimulator:
         输出:
             float: 该玩家分值区间下线性插值计算得出的预期收集卡牌张数量。
         """
-        if set_id not in self.expect_curves: return 0.0
-        scores = self.expect_curves[set_id]
-        if self.player_score <= 0: return 0.0
-        if self.player_score >= scores[-1]: return 9.0
-        
-        # 使用二分法寻找当前分值落在哪一个张数区间
-        idx = bisect.bisect_left(scores, self.player_score)
-        if idx == 0:
-            # 处在 0 张 (score 0) 到 1 张 (score [0]) 之间
-            p0, c0 = 0, 0
-            p1, c1 = scores[0], 1
-        else:
-            p0, c0 = scores[idx-1], idx
-            p1, c1 = scores[idx], idx + 1
-            
-        # 根据当前分值做线性插值，算出一个带小数的期望张数
-        ratio = (self.player_score - p0) / (p1 - p0)
-        return c0 + ratio
+        return self.config.expected_cards(set_id, self.player_score)
 
     def get_set_collected_count(self, set_id):
-        cnt = 0
-        for c in self.cards:
-            if int(c['cardset_from']) == set_id and int(c['card_id']) in self.collected_cards:
-                cnt += 1
-        return cnt
+        return self.set_counts.get(set_id, 0)
         
     def get_multiplier(self, c_delta, star, is_gold):
         """
@@ -153,35 +564,15 @@ class AlbumSimulator:
         输出:
             float: 该张卡牌在随机抽取时权重应该乘上的干预倍率。
         """
-        for row in self.drop_rate_change:
-            if 'delta_range_min' not in row: continue
-            min_val = float(row['delta_range_min']) if row['delta_range_min'] else -9999
-            max_val = float(row['delta_range_max']) if row['delta_range_max'] else 9999
-            if min_val <= c_delta < max_val:
-                # 获取该区间对应所有星级的加成倍率 (区分普通卡和金卡)
-                list_key = 'final_change_list_gold' if is_gold else 'final_change_list'
-                # 如果没有金卡列退回查找普通卡列
-                if list_key not in row or not row[list_key]:
-                    list_key = 'final_change_list'
-                rates = [float(x) for x in row[list_key].split(',')]
-                # 注意数组索引 0 表示 1 星，索引 1 表示 2 星...
-                idx = star - 1 if 1 <= star <= 6 else 0
-                return rates[idx]
-        return 1.0
+        return self.config.interval_multiplier(self.config.rate_interval(c_delta), star, is_gold)
 
     def parse_probability_string(self, prob_str):
-        # 将 "OneStarCard,5789|TwoStarCard,2995" 这样的字符串解析为 { 分类名称: 权重数值 } 字典
-        weights = {}
-        for item in prob_str.split('|'):
-            if ',' in item:
-                k, v = item.split(',')
-                weights[k.strip()] = float(v.strip())
-        return weights
+        return parse_probability_string(prob_str)
 
     def choose_category(self, categories_weights):
         # 通用的带权重随机选择器
         total = sum(categories_weights.values())
-        r = random.uniform(0, total)
+        r = self.rng.uniform(0, total)
         for cat, w in categories_weights.items():
             r -= w
             if r <= 0: return cat
@@ -192,41 +583,24 @@ class AlbumSimulator:
         if not all_for_cat:
             return None
             
-        # 根据已解锁的 Set 进行过滤筛选
-        unlocked_sets = self.get_unlocked_sets()
-        eligible = [c for c in all_for_cat if int(c['cardset_from']) in unlocked_sets]
-        if not eligible:
+        if self._eligible_counts[cat] == 0:
             # 兼容逻辑：如果要抽的这张高星卡在所有已解锁的 Set 里都没有，则退回全局卡池，无视解锁逻辑
-            eligible = all_for_cat
-            
-        # 计算每一张候选可抽卡牌的最终权重
-        weights = []
-        for c in eligible:
-            base_w = float(c.get('card_prob', 10))
-            cid = int(c['card_id'])
-            
-            # 开启优化机制 且 该卡牌尚未被收集过，才会重新计算动态干预权重
-            if self.enable_weight_control and cid not in self.collected_cards:
-                sid = int(c['cardset_from'])
-                expected = self.get_expected_cards(sid)
-                actual = self.get_set_collected_count(sid)
-                delta = expected - actual
-                star = int(c['star'])
-                is_gold = (int(c.get('card_type', 1)) == 2)
-                mult = self.get_multiplier(delta, star, is_gold)
-            else:
-                mult = 1.0
-                
-            weights.append(base_w * mult)
+            weights = [self._card_weight(c) for c in all_for_cat]
+            total = sum(weights)
+            if total == 0: return self.rng.choice(all_for_cat)
+            r = self.rng.uniform(0, total)
+            for idx, w in enumerate(weights):
+                r -= w
+                if r <= 0: return all_for_cat[idx]
+            return all_for_cat[-1]
             
-        # 根据计算好的最终权重，进行带权重随机抽取具体卡牌
-        total = sum(weights)
-        if total == 0: return random.choice(eligible)
-        r = random.uniform(0, total)
-        for idx, w in enumerate(weights):
-            r -= w
-            if r <= 0: return eligible[idx]
-        return eligible[-1]
+        # 已解锁卡牌的权重由 FenwickSampler 增量维护（未解锁的为 0），直接按权重抽取
+        sampler = self._samplers[cat]
+        total = sampler.total
+        idx = sampler.find(self.rng.uniform(0, total)) if total > 0 else -1
+        if idx < 0:
+            return self.rng.choice([c for c in all_for_cat if c.cardset_from in self._eligible_sets])
+        return all_for_cat[idx]
 
     def open_pack(self, case_id):
         """
@@ -234,58 +608,39 @@ class AlbumSimulator:
         输入:
             case_id (int): 在 cardcase.csv 中定义的被抽取的卡包 ID（如 5 为红卡包）。
         输出:
-            list[dict]: 本次抽取到的所有独立卡牌信息数据实体的列表。
+            list[Card]: 本次抽取到的所有卡牌记录的列表。
         """
         self.stats_packs_opened += 1
-        case_info = self.cases_map[case_id]
-        
-        # 记录开包前的各个 set 进度
-        old_set_counts = {sid: self.get_set_collected_count(sid) for sid in range(1, 13)}
+        # 卡包的张数、分类、保底权重已在加载配置时编译为采样器
+        pack = self.config.pack_tables[case_id]
         
         # 增加卡包开箱带来的基础分值
-        if case_id in self.score_map:
-            self.player_score += self.score_map[case_id]
+        if pack.score is not None:
+            self.add_score(pack.score)
             
-        # 解析抽取的卡片总数量设定
-        # 例如："1,100" (抽1张，100%权重) 或 "4,25|5,50|6,25" (概率抽多张)
-        cnt_opts = self.parse_probability_string(case_info['card_count'])
-        cnt_to_draw = int(self.choose_category(cnt_opts))
-        
-        # 读取各类颜色卡的比例
-        cat_weights = self.parse_probability_string(case_info['card_type'])
-        # 根据更新的机制：保底卡池的权重直接由 min_guarantee_prob 读取
-        guarantee_weights = self.parse_probability_string(case_info.get('min_guarantee_prob', ''))
-        # 兼容兜底：如果没配，退回老规则
-        if not guarantee_weights and 'min_guarantee' in case_info:
-            guarantees = [x.strip() for x in case_info['min_guarantee'].split(',')]
-            guarantee_weights = {g: cat_weights.get(g, 0) for g in guarantees if g in cat_weights}
+        # 抽取的卡片总数量
+        cnt_to_draw = pack.count_sampler.sample(self.rng)
         
         drawn = []
         for i in range(cnt_to_draw):
             # 第1张卡必定从保底卡池里抽，其余的卡从普通库里抽
-            if i == 0 and sum(guarantee_weights.values()) > 0:
-                cat = self.choose_category(guarantee_weights)
+            if i == 0 and pack.guarantee_sampler is not None:
+                cat = pack.guarantee_sampler.sample(self.rng)
             else:
-                cat = self.choose_category(cat_weights)
+                cat = pack.category_sampler.sample(self.rng)
                 
             card = self.draw_card_by_category(cat)
             if card:
-                cid = int(card['card_id'])
-                if cid in self.collected_cards:
-                    self.stats_duplicates += 1
+                if self.collect_card(card):
+                    # 记录跨越的分值节点：开包分值在抽卡前已计入，本包内不再变化，收集时即可记下
+                    progress = self.set_progress_score.get(card.cardset_from)
+                    new_count = self.set_counts[card.cardset_from]
+                    if progress is not None and new_count < 10 and new_count not in progress:
+                        progress[new_count] = self.player_score
                 else:
-                    self.collected_cards.add(cid)
+                    self.stats_duplicates += 1
                 self.stats_cards_drawn += 1
                 drawn.append(card)
-                
-        # 记录开包后的进度，更新跨越的分值节点
-        for sid in range(1, 13):
-            new_count = self.get_set_collected_count(sid)
-            old_count = old_set_counts[sid]
-            if new_count > old_count:
-                for target_cnt in range(old_count + 1, min(new_count + 1, 10)):
-                    if target_cnt not in self.set_progress_score[sid]:
-                        self.set_progress_score[sid][target_cnt] = self.player_score
                         
         return drawn
 
@@ -298,14 +653,14 @@ class AlbumSimulator:
                 c_name = self.cases_map[cid].get('#color', f'ID:{cid}') if cid in self.cases_map else f'ID:{cid}'
                 case_summary.append(f"{c_name}x{count}")
             
-            star_counts = Counter(int(c['star']) for c in (batch_drawn_cards or []))
+            star_counts = Counter(c.star for c in (batch_drawn_cards or []))
             star_summary = []
             for star in sorted(star_counts.keys()):
                 star_summary.append(f"★{star}x{star_counts[star]}")
                 
             print(f"\n[批量开卡包] 开启 {batch_count} 包 ({' + '.join(case_summary)}) | 本次抽到: {batch_new} 张新卡, {batch_dup} 张重复卡 | 分布: {', '.join(star_summary) if star_summary else '无'}")
         elif drawn_cards:
-            drawn_names = [f"★{c['star']} {c.get('card_name', 'Unknown')}" for c in drawn_cards]
+            drawn_names = [f"★{c.star} {c.card_name}" for c in drawn_cards]
             print(f"\n[开卡包] 您开了 1 个卡包(ID: {case_id})! 抽得: {', '.join(drawn_names)}")
         
         print(f"[数据] 当前分值: {self.player_score:.2f} | 总收集: {len(self.collected_cards)}/108 | 重复卡: {self.stats_duplicates}")
@@ -324,20 +679,32 @@ class AlbumSimulator:
         print(f"最终玩家分值: {self.player_score:.2f}")
         print("=========================")
 
-def run_simulation(data_dir, pack_sequence, print_interval=0, enable_dynamic_unlock=True, enable_weight_control=True):
+def run_simulation(data_dir, pack_sequence, print_interval=0, enable_dynamic_unlock=True, enable_weight_control=True, seed=None):
     """
     单次模拟进程包裹函数。按给定的卡包序列连续模拟开启，并在各个生命周期节点收集与打印监控数据。
     输入:
-        data_dir (str): 数据表文件夹的根目录。
+        data_dir (str | AlbumConfig): 数据表文件夹的根目录，或已加载的配置。
         pack_sequence (list[int]): 按顺序执行开包操作的卡包 ID 数组 (如 [1,1,2,5]...)。
         print_interval (int): 终端打印过程日志的频率 (单位为卡包数)，0 表示纯静默运行。
         enable_dynamic_unlock (bool): 是否开启根据收集进度动态解锁 Set 的卡池控制。
         enable_weight_control (bool): 是否开启根据差异值干预概率的动态权重倍率控制。
+        seed (int | None): 随机种子，None 时不可复现。
     输出:
         dict: 模拟器生命周期内，各 Set 达到 1~9 张时的累计玩家分值的追溯字典 (self.set_progress_score)。
     """
-    sim = AlbumSimulator(data_dir, enable_dynamic_unlock=enable_dynamic_unlock, enable_weight_control=enable_weight_control)
-    
+    sim = AlbumSimulator(data_dir, enable_dynamic_unlock=enable_dynamic_unlock, enable_weight_control=enable_weight_control, seed=seed)
+    return play_sequence(sim, pack_sequence, print_interval)
+
+def play_sequence(sim, pack_sequence, print_interval=0):
+    """
+    用已有的模拟器实例（当前状态）按序列开包；run_simulation 与多进程子进程共用。
+    输入:
+        sim (AlbumSimulator): 模拟器实例，调用方负责在每轮之前 reset()。
+        pack_sequence (list[int]): 按顺序执行开包操作的卡包 ID 数组。
+        print_interval (int): 终端打印过程日志的频率，0 表示纯静默运行。
+    输出:
+        tuple: (各 Set 达到 1~9 张时的累计分值字典, 最终不重复卡张数)。
+    """
     batch_count = 0
     batch_cases = []
     batch_drawn_cards = []
@@ -379,54 +746,222 @@ def run_simulation(data_dir, pack_sequence, print_interval=0, enable_dynamic_unl
         
     return sim.set_progress_score, len(sim.collected_cards)
 
-def _simulation_worker(args):
-    data_dir, pack_sequence, enable_dynamic_unlock, enable_weight_control = args
-    return run_simulation(data_dir, pack_sequence, print_interval=0, enable_dynamic_unlock=enable_dynamic_unlock, enable_weight_control=enable_weight_control)
+class SimulationStats:
+    """
+    多轮模拟结果的定长累加器：各 Set 收集到 1~9 张时分值的次数 / 和 / 平方和，以及最终不重复卡张数的直方图。
+    大小与模拟轮数无关，子进程按批累加后只回传这一个对象，主进程逐个 merge。
+    """
+    __slots__ = ('runs', 'milestone_count', 'milestone_sum', 'milestone_sumsq', 'collected_hist')
+
+    def __init__(self, num_cards):
+        """
+        输入:
+            num_cards (int): 卡池总张数，决定不重复卡张数直方图的长度。
+        """
+        self.runs = 0
+        # set_id -> 长度 10 的列表，下标为收集张数（下标 0 不用）
+        self.milestone_count = {sid: [0] * 10 for sid in range(1, 13)}
+        self.milestone_sum = {sid: [0.0] * 10 for sid in range(1, 13)}
+        self.milestone_sumsq = {sid: [0.0] * 10 for sid in range(1, 13)}
+        self.collected_hist = [0] * (num_cards + 1)
+
+    def add(self, set_progress_score, total_collected):
+        """累加一轮 play_sequence 的结果。"""
+        self.runs += 1
+        self.collected_hist[total_collected] += 1
+        for sid, progress in set_progress_score.items():
+            count, total, sumsq = self.milestone_count[sid], self.milestone_sum[sid], self.milestone_sumsq[sid]
+            for cnt, score in progress.items():
+                count[cnt] += 1
+                total[cnt] += score
+                sumsq[cnt] += score * score
+
+    def merge(self, other):
+        """把另一个累加器（通常来自子进程）并入自身，返回自身。"""
+        self.runs += other.runs
+        for i, times in enumerate(other.collected_hist):
+            self.collected_hist[i] += times
+        for sid in self.milestone_count:
+            for cnt in range(1, 10):
+                self.milestone_count[sid][cnt] += other.milestone_count[sid][cnt]
+                self.milestone_sum[sid][cnt] += other.milestone_sum[sid][cnt]
+                self.milestone_sumsq[sid][cnt] += other.milestone_sumsq[sid][cnt]
+        return self
+
+    def collected_distribution(self):
+        """最终不重复卡张数 -> 出现次数（只含出现过的张数）。"""
+        return {cnt: times for cnt, times in enumerate(self.collected_hist) if times}
+
+    def milestone_means(self):
+        """set_id -> {张数: 达到该张数的轮次的分值均值}，与 print_summary 的入参同口径。"""
+        return {sid: {cnt: self.milestone_sum[sid][cnt] / self.milestone_count[sid][cnt] for cnt in range(1, 10) if self.milestone_count[sid][cnt]}
+                for sid in self.milestone_count}
 
-def run_multiple_simulations(data_dir, pack_sequence, num_runs=100, enable_dynamic_unlock=True, enable_weight_control=True):
+    def half_widths(self, z):
+        """
+        各统计量均值的置信区间半宽：z * 样本标准差 / sqrt(样本数)。
+        输入:
+            z (float): 正态分位数，如 95% 置信度为 1.96。
+        输出:
+            tuple: (最终不重复卡张数均值的半宽, {set_id: {张数: 分值均值的半宽}})；
+                   没有轮次达到的节点不出现，只有 1 个样本时半宽为 inf。
+        """
+        def half_width(n, total, sumsq):
+            if n < 2:
+                return math.inf
+            mean = total / n
+            variance = max((sumsq - n * mean * mean) / (n - 1), 0.0)
+            return z * math.sqrt(variance / n)
+
+        collected = half_width(self.runs,
+                               sum(cnt * times for cnt, times in enumerate(self.collected_hist)),
+                               sum(cnt * cnt * times for cnt, times in enumerate(self.collected_hist)))
+        milestones = {sid: {cnt: half_width(self.milestone_count[sid][cnt], self.milestone_sum[sid][cnt], self.milestone_sumsq[sid][cnt])
+                            for cnt in range(1, 10) if self.milestone_count[sid][cnt]}
+                      for sid in self.milestone_count}
+        return collected, milestones
+
+    def worst_relative_half_width(self, z):
+        """所有统计量中 半宽 / |均值| 的最大值（均值为 0 时取半宽本身），用于判断是否收敛。"""
+        collected_hw, milestone_hws = self.half_widths(z)
+        mean_cards = sum(cnt * times for cnt, times in enumerate(self.collected_hist)) / self.runs if self.runs else 0.0
+        pairs = [(collected_hw, mean_cards)]
+        means = self.milestone_means()
+        for sid, hws in milestone_hws.items():
+            pairs.extend((hw, means[sid][cnt]) for cnt, hw in hws.items())
+        return max(hw / abs(mean) if mean else hw for hw, mean in pairs)
+
+    def milestone_stds(self):
+        """set_id -> {张数: 分值的总体标准差}。"""
+        stds = {}
+        for sid, means in self.milestone_means().items():
+            stds[sid] = {}
+            for cnt, mean in means.items():
+                variance = self.milestone_sumsq[sid][cnt] / self.milestone_count[sid][cnt] - mean * mean
+                stds[sid][cnt] = math.sqrt(max(variance, 0.0))
+        return stds
+
+def derive_seed(master_seed, index):
+    """
+    由主种子派生第 index 个随机流的独立种子（思路同 numpy SeedSequence.spawn：对 (主种子, 序号) 做 sha256）。
+    每个随机流只取决于这两个值，与进程数、批大小和任务完成顺序无关。
+    bingo/bingo_cal.py、carrot/carrot.py 中有同名的相同实现（各脚本独立运行，不互相导入），修改时需同步。
     """
-    多进程大规模大数收敛测试入口。派发 num_runs 轮同样配置的模拟进程并聚合汇总最终节点均值。
+    digest = hashlib.sha256(f"{master_seed}:{index}".encode()).digest()
+    return int.from_bytes(digest, 'big')
+
+# 子进程内常驻的模拟器与开包序列，由 _init_worker 在进程启动时设置一次
+_worker_sim = None
+_worker_pack_sequence = None
+
+def _init_worker(data_dir, pack_sequence, enable_dynamic_unlock, enable_weight_control):
+    """进程池 initializer：每个子进程只加载一次配置、创建一次模拟器，序列也只传输一次。"""
+    global _worker_sim, _worker_pack_sequence
+    _worker_sim = AlbumSimulator(load_album_config(data_dir), enable_dynamic_unlock=enable_dynamic_unlock, enable_weight_control=enable_weight_control)
+    _worker_pack_sequence = pack_sequence
+
+def _simulation_batch(task):
+    """子进程连续模拟第 start ~ start + batch_size - 1 轮，只回传定长的 SimulationStats。"""
+    start, batch_size, master_seed = task
+    stats = SimulationStats(len(_worker_sim.config.cards))
+    for run_index in range(start, start + batch_size):
+        # 每轮只需重置玩家状态，并换用该轮自己的随机流
+        _worker_sim.reset(derive_seed(master_seed, run_index))
+        stats.add(*play_sequence(_worker_sim, _worker_pack_sequence))
+    return stats
+
+def run_multiple_simulations(data_dir, pack_sequence, num_runs=100, enable_dynamic_unlock=True, enable_weight_control=True, batch_size=None, seed=None, processes=None,
+                             ci_target=None, confidence=0.95, min_runs=200):
+    """
+    多进程大规模大数收敛测试入口。把 num_runs 轮同样配置的模拟按批派发给子进程，流式合并各批的累加器并汇总最终节点均值。
+    内存与进程间传输量只和批数有关，与每轮的原始分值无关。
+    第 i 轮的随机流由 derive_seed(seed, i) 决定，分批方式不随进程数变化且按批次顺序合并，
+    因此同一个 seed 无论单进程还是任意进程数，汇总结果逐位一致。
+    收敛模式（给定 ci_target）：num_runs 变为轮数上限，每合并一批就检查一次，
+    当最终张数均值与所有已出现的 Set 1~9 张节点均值的置信区间半宽都不超过 ci_target * |均值| 时提前停止。
     输入:
         data_dir (str): 数据表文件夹的根目录。
         pack_sequence (list[int]): 子进程每轮完整模拟需要执行的开包定死序列。
-        num_runs (int): 并发运行的模拟进程总数与迭代数 (默认 100 轮)。
+        num_runs (int): 模拟总轮数 (默认 100 轮)；收敛模式下为轮数上限。
         enable_dynamic_unlock (bool): 参数穿透，是否动态解锁。
         enable_weight_control (bool): 参数穿透，是否动态调控权重。
+        batch_size (int | None): 每个子任务连续模拟的轮数，None 时按轮数自动选取（约 64 批，单批不超过 1000 轮；收敛模式为 50 轮）。
+        seed (int | None): 主随机种子，None 时随机生成一个并打印出来，便于复现。
+        processes (int | None): 进程数，None 为 CPU 核心数；1 表示在当前进程内串行执行。
+        ci_target (float | None): 相对半宽目标，如 0.01 表示各均值的置信区间半宽不超过均值的 1%；None 为固定轮数模式。
+        confidence (float): 置信度 (默认 95%)。
+        min_runs (int): 收敛模式下至少模拟的轮数，避免样本过少时误判收敛。
     输出:
-        无直接结构体返回值，主要负责在终端计算汇总报表并排版输出均值列表。
+        SimulationStats: 全部轮次合并后的累加器；同时在终端打印汇总报表（含置信区间半宽）。
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if batch_size is None:
+        batch_size = 50 if ci_target is not None else max(1, min(1000, num_runs // 64))
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    tasks = [(start, min(batch_size, num_runs - start), seed) for start in range(0, num_runs, batch_size)]
+
+    mode = f"收敛模式：相对半宽 <= {ci_target:.2%}（{confidence:.0%} 置信度），上限 {num_runs} 轮" if ci_target is not None else f"{num_runs} 次模拟测试"
+    print(f"\n[多进程] 开始执行{mode}，每批 {batch_size} 轮，{processes} 个进程，主种子 seed={seed}")
+    init_args = (data_dir, pack_sequence, enable_dynamic_unlock, enable_weight_control)
+    stats = SimulationStats(len(load_album_config(data_dir).cards))
+
+    def merge_all(parts):
+        # 按批次顺序合并，浮点累加顺序固定；收敛判断也只依赖已合并的批次，停止点与进程数无关
+        for part in parts:
+            stats.merge(part)
+            if ci_target is None:
+                print(f"\r[多进程] 进度: {stats.runs}/{num_runs} 轮 ({stats.runs / num_runs * 100:5.1f}%)", end="", flush=True)
+                continue
+            worst = stats.worst_relative_half_width(z)
+            print(f"\r[多进程] 已模拟 {stats.runs} 轮，最大相对半宽 {worst:8.2%}", end="", flush=True)
+            if stats.runs >= min_runs and worst <= ci_target:
+                print(f"\n[多进程] 已收敛，共 {stats.runs} 轮", end="")
+                break
+        else:
+            if ci_target is not None:
+                print(f"\n[多进程] 达到轮数上限 {num_runs} 仍未收敛", end="")
+        print()
+
+    if processes == 1:
+        _init_worker(*init_args)
+        merge_all(map(_simulation_batch, tasks))
+    else:
+        # 提前收敛时退出 with 会终止进程池，尚未合并的批次直接丢弃
+        with multiprocessing.Pool(processes=processes, initializer=_init_worker, initargs=init_args) as pool:
+            merge_all(pool.imap(_simulation_batch, tasks))
+
+    print_summary(stats.runs, stats.collected_distribution(), stats.milestone_means(), stats.half_widths(z), confidence)
+    return stats
+
+def print_summary(num_runs, collected_dist, milestone_means, half_widths=None, confidence=0.95):
+    """
+    打印多轮模拟的汇总报表（多进程模拟与 population 批量模拟共用）。
+    输入:
+        num_runs (int): 模拟的玩家数 / 轮数。
+        collected_dist (dict[int, int]): 最终不重复卡张数 -> 出现次数。
+        milestone_means (dict[int, dict[int, float]]): set_id -> {收集张数: 达到该张数时的开包累计分值均值}，没有玩家达到的张数不出现。
+        half_widths (tuple | None): SimulationStats.half_widths 的返回值，给出时一并打印各均值的置信区间半宽。
+        confidence (float): half_widths 对应的置信度，仅用于显示。
     """
-    print(f"\n[多进程] 开始执行 {num_runs} 次模拟测试，正在分配给 CPU 核心...")
-    pool_args = [(data_dir, pack_sequence, enable_dynamic_unlock, enable_weight_control) for _ in range(num_runs)]
-    
-    with multiprocessing.Pool(processes=multiprocessing.cpu_count()) as pool:
-        results = pool.map(_simulation_worker, pool_args)
-        
-    aggregated = {sid: {cnt: [] for cnt in range(1, 10)} for sid in range(1, 13)}
-    final_collected_counts = []
-    
-    for res, total_collected in results:
-        final_collected_counts.append(total_collected)
-        for sid, progress in res.items():
-            for cnt, score in progress.items():
-                aggregated[sid][cnt].append(score)
-                
     import math
-    from collections import Counter
     
     print("\n" + "="*80)
     print(f">>> {num_runs} 次模拟后，【最终收集不重复卡牌张数】分布 (总卡池 108 张)")
     print("="*80)
     
-    mean_cards = sum(final_collected_counts) / len(final_collected_counts)
-    variance = sum((x - mean_cards) ** 2 for x in final_collected_counts) / len(final_collected_counts)
+    mean_cards = sum(cnt * times for cnt, times in collected_dist.items()) / num_runs
+    variance = sum(times * (cnt - mean_cards) ** 2 for cnt, times in collected_dist.items()) / num_runs
     std_dev = math.sqrt(variance)
     
-    print(f"统计指标: 均值 = {mean_cards:.2f} 张 | 最小值 = {min(final_collected_counts)} | 最大值 = {max(final_collected_counts)} | 标准差(波动率) = {std_dev:.2f}")
+    ci_str = f" ± {half_widths[0]:.2f} 张（{confidence:.0%} 置信区间）" if half_widths is not None else " 张"
+    print(f"统计指标: 均值 = {mean_cards:.2f}{ci_str} | 最小值 = {min(collected_dist)} | 最大值 = {max(collected_dist)} | 标准差(波动率) = {std_dev:.2f}")
     
     print("\n[具体落点分布]:")
-    counts_dist = Counter(final_collected_counts)
-    for cnt in sorted(counts_dist.keys()):
-        print(f"  {cnt:3d} 张 : {counts_dist[cnt]:4d} 次 ({counts_dist[cnt]/num_runs*100:5.1f}%)")
+    for cnt in sorted(collected_dist.keys()):
+        print(f"  {cnt:3d} 张 : {collected_dist[cnt]:4d} 次 ({collected_dist[cnt]/num_runs*100:5.1f}%)")
 
     print("\n" + "="*80)
     print(f">>> {num_runs} 次模拟后，各卡册收集到 1-9 张时的【开包累计分值】均值汇总")
@@ -439,14 +974,30 @@ def run_multiple_simulations(data_dir, pack_sequence, num_runs=100, enable_dynam
     for sid in range(1, 13):
         row_str = f"Set {sid:2d} |"
         for cnt in range(1, 10):
-            scores = aggregated[sid][cnt]
-            if scores:
-                avg_score = sum(scores) / len(scores)
+            avg_score = milestone_means.get(sid, {}).get(cnt)
+            if avg_score is not None:
                 row_str += f" {avg_score:6.1f} |"
             else:
                 row_str += "    --  |"
         print(row_str)
 
+    if half_widths is None:
+        return
+    print("\n" + "="*80)
+    print(f">>> 上表各均值的 {confidence:.0%} 置信区间半宽（均值 ± 半宽）")
+    print("="*80)
+    print(header)
+    print("-" * len(header))
+    for sid in range(1, 13):
+        row_str = f"Set {sid:2d} |"
+        for cnt in range(1, 10):
+            hw = half_widths[1].get(sid, {}).get(cnt)
+            if hw is not None and math.isfinite(hw):
+                row_str += f" {hw:6.2f} |"
+            else:
+                row_str += "    --  |"
+        print(row_str)
+
 
 if __name__ == '__main__':
     # 为了多进程在 Windows 上安全运行，需要这行声明（虽然 __main__ 块通常已经没问题）
@@ -466,12 +1017,20 @@ if __name__ == '__main__':
     use_dynamic_unlock = True
     use_weight_control = True
     
+    # 随机种子：填整数可复现结果（与进程数无关），None 为每次随机
+    seed = None
+    
     # # 【模式 1】：单次模拟，带详细打印
     # run_simulation(data_dir, pack_sequence, print_interval=10, 
     #                enable_dynamic_unlock=use_dynamic_unlock, 
-    #                enable_weight_control=use_weight_control)
+    #                enable_weight_control=use_weight_control, seed=seed)
     
     # 【模式 2】：多进程跑几百次，获取均值汇总分布
     run_multiple_simulations(data_dir, pack_sequence, num_runs=3000, 
                              enable_dynamic_unlock=use_dynamic_unlock, 
-                             enable_weight_control=use_weight_control)
+                             enable_weight_control=use_weight_control, seed=seed)
+    
+    # # 【模式 3】：收敛模式，直到各均值的 95% 置信区间半宽都不超过均值的 1% 为止（最多 30000 轮）
+    # run_multiple_simulations(data_dir, pack_sequence, num_runs=30000, ci_target=0.01,
+    #                          enable_dynamic_unlock=use_dynamic_unlock, 
+    #                          enable_weight_control=use_weight_control, seed=seed)
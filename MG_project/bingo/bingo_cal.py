@@ -3,9 +3,10 @@
 随机出球填上对应格，
 模拟x次，每次bingo后结束重来
 统计最终 1 bingo、2bingo、3bingo、4bingo 分别每种下，对应的盘面上总球数的 次数分布
--注：用多进程加速模拟
+-注：用多进程加速模拟；第 i 次模拟的随机种子由主种子与 i 派生，同一主种子结果与进程数无关
 """
 
+import hashlib
 import random
 import multiprocessing
 from collections import defaultdict
@@ -37,6 +38,12 @@ for li, line in enumerate(LINES):
         CELL_TO_LINES[cell].append(li)
 
 
+def derive_seed(master_seed, index):
+    """同 album/simulator.py 的 derive_seed（保持一致）：对 (主种子, 序号) 做 sha256，得到第 index 个随机流的独立种子。"""
+    digest = hashlib.sha256(f"{master_seed}:{index}".encode()).digest()
+    return int.from_bytes(digest, 'big')
+
+
 def simulate_one(seed):
     """单次模拟：随机出球填格，一旦出现 bingo 立刻停止，返回 (同时完成的线数, 已出球数)。"""
     rng = random.Random(seed)
@@ -58,33 +65,36 @@ def simulate_one(seed):
 
 
 def run_batch(args):
-    batch_size, base_seed = args
+    batch_size, start, master_seed = args
     results = []
-    for i in range(batch_size):
-        results.append(simulate_one(base_seed + i))
+    for i in range(start, start + batch_size):
+        results.append(simulate_one(derive_seed(master_seed, i)))
     return results
 
 
 def main():
     raw = input("模拟次数（默认 1000000）: ").strip()
     num_simulations = int(raw) if raw else 1_000_000
+    raw = input("随机种子（默认随机）: ").strip()
+    master_seed = int(raw) if raw else random.SystemRandom().getrandbits(64)
 
     num_workers = max(1, (os.cpu_count() or 4) - 1)
     batch_per_worker = num_simulations // num_workers
     remainder = num_simulations % num_workers
 
     tasks = []
-    seed = 0
+    start = 0
     for w in range(num_workers):
         size = batch_per_worker + (1 if w < remainder else 0)
-        tasks.append((size, seed))
-        seed += size
+        tasks.append((size, start, master_seed))
+        start += size
 
     print(f"\n=== Bingo 5x5 模拟器 ===")
     print(f"格子: {GRID_SIZE}x{GRID_SIZE}（中间不预填）")
     print(f"Bingo 线: {len(LINES)} 条（{GRID_SIZE}行 + {GRID_SIZE}列 + 2对角）")
     print(f"模拟次数: {num_simulations:,}")
     print(f"进程数: {num_workers}")
+    print(f"随机种子: {master_seed}")
     print("模拟中...\n")
 
     distributions = {n: defaultdict(int) for n in range(1, MAX_BINGO_TRACK + 1)}
@@ -3,6 +3,7 @@
 请根据下面的配置，模拟各档萝卜 各拔若干次，所需要平均拔的次数
 """
 
+import hashlib
 import random
 
 pull_carrtor_config = [
@@ -48,10 +49,17 @@ def get_weight_level(current_height, threshold1, threshold2):
         return 2  # 使用3档概率
 
 
-def simulate_single_pull(carrot_config):
+def derive_seed(master_seed, index):
+    """同 album/simulator.py 的 derive_seed（保持一致）：对 (主种子, 序号) 做 sha256，得到第 index 个随机流的独立种子。"""
+    digest = hashlib.sha256(f"{master_seed}:{index}".encode()).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def simulate_single_pull(carrot_config, rng=random):
     """
     模拟拔一个萝卜，返回拔出所需的次数
     carrot_config: [总长度, 1档区间, 2档区间, 常规上升, 大力上升, 超大力上升]
+    rng: 随机源（random.Random 实例，默认全局 random 模块）
     """
     total_length, threshold1, threshold2, normal_rise, big_rise, super_rise = carrot_config
     rise_values = [normal_rise, big_rise, super_rise, 0]  # 对应4种力气的上升值
@@ -67,7 +75,7 @@ def simulate_single_pull(carrot_config):
         weights = pull_weight_config[weight_level]
         
         # 根据概率随机选择力气类型（0:常规, 1:大力, 2:超大力, 3:不动）
-        force_type = random.choices([0, 1, 2, 3], weights=weights)[0]
+        force_type = rng.choices([0, 1, 2, 3], weights=weights)[0]
         
         # 上升相应高度
         current_height += rise_values[force_type]
@@ -75,13 +83,16 @@ def simulate_single_pull(carrot_config):
     return pull_count
 
 
-def simulate_carrot(carrot_index, carrot_config, num_simulations=10000):
+def simulate_carrot(carrot_index, carrot_config, num_simulations=10000, seed=None):
     """
     模拟某档萝卜多次，计算平均拔出次数
+    seed: 主随机种子，给定时该档使用 derive_seed(seed, carrot_index) 的独立随机流，结果可复现；
+          各档随机流互不影响，单独重跑某一档也能得到相同结果
     """
+    rng = random.Random(derive_seed(seed, carrot_index)) if seed is not None else random
     total_pulls = 0
     for _ in range(num_simulations):
-        total_pulls += simulate_single_pull(carrot_config)
+        total_pulls += simulate_single_pull(carrot_config, rng)
     
     avg_pulls = total_pulls / num_simulations
     return avg_pulls
@@ -90,9 +101,12 @@ def simulate_carrot(carrot_index, carrot_config, num_simulations=10000):
 def main():
     """主函数：模拟所有档位萝卜"""
     num_simulations = 10000  # 每档萝卜模拟次数
+    seed = None  # 随机种子，填整数可复现结果；为 None 时随机生成并打印，便于复现
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
     
     print("=" * 70)
-    print("萝卜拔出模拟结果（模拟 {} 次）".format(num_simulations))
+    print("萝卜拔出模拟结果（模拟 {} 次，随机种子 {}）".format(num_simulations, seed))
     print("=" * 70)
     print("{:>6} | {:>8} | {:>8} | {:>8} | {:>12} | {:>12}".format(
         "档位", "总长度", "1档区间", "2档区间", "平均拔次数", "配置(常/大/超)"))
@@ -100,7 +114,7 @@ def main():
     
     for i, config in enumerate(pull_carrtor_config):
         total_length, th1, th2, normal, big, super_big = config
-        avg_pulls = simulate_carrot(i, config, num_simulations)
+        avg_pulls = simulate_carrot(i, config, num_simulations, seed)
         
         print("{:>6} | {:>8} | {:>8} | {:>8} | {:>12.2f} | {:>4}/{:>4}/{:>4}".format(
             i + 1, total_length, th1, th2, avg_pulls, normal, big, super_big))
@@ -111,15 +125,16 @@ def main():
     print("\n按力气配置分组统计：")
     print("-" * 50)
     groups = [
-        ("常规5/大力10", pull_carrtor_config[0:4]),
-        ("常规4/大力8", pull_carrtor_config[4:8]),
-        ("常规3/大力6", pull_carrtor_config[8:12]),
+        ("常规5/大力10", 0),
+        ("常规4/大力8", 4),
+        ("常规3/大力6", 8),
     ]
     
-    for group_name, group_configs in groups:
+    for group_name, group_start in groups:
         print("\n【{}】".format(group_name))
-        for j, config in enumerate(group_configs):
-            avg = simulate_carrot(j, config, num_simulations)
+        for i in range(group_start, group_start + 4):
+            config = pull_carrtor_config[i]
+            avg = simulate_carrot(i, config, num_simulations, seed)
             print("  总长度{:>3}: 平均 {:.2f} 次".format(config[0], avg))
 
 
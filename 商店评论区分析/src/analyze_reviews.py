@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+使用DeepSeek API对精选评论做语义分析（map-reduce）
+按项目根 AI分析语义提示词.md 的提示词，将评论按 token 预算切块并发分析（map），
+再把各块的《设计机会点报告》逐层合并为一份（reduce）。每次调用的结果按输入内容缓存，
+重跑或新增报告时只分析变化的部分。
+
+使用方法:
+    python -m src.analyze_reviews                    交互选择一个或多个报告
+    python -m src.analyze_reviews --all              分析 output/reports 下全部报告（合并为一份）
+    python -m src.analyze_reviews 报告1.txt 报告2.txt  分析指定报告
+"""
+
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from src.translate_reviews import MODEL_NAME, PROJECT_ROOT, PRICE_INPUT, PRICE_INPUT_CACHE_HIT, PRICE_OUTPUT, create_client, load_review_records
+from src.processor.review_records import format_review_header
+from src.llm.translation_cache import TranslationCache
+from src.llm.tokens import count_tokens
+from src.llm.concurrency import AdaptiveLimiter
+from src.llm.telemetry import LLMTelemetry
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# 提示词与路径
+ANALYSIS_PROMPT_FILE = PROJECT_ROOT / "AI分析语义提示词.md"
+PROMPT_DATA_MARKER = "**待分析数据：**"  # 提示词文件中评论数据的位置，之后的占位说明会被替换
+ANALYSIS_DIR = PROJECT_ROOT / "output/analysis"
+ANALYSIS_CACHE_DB_PATH = PROJECT_ROOT / "data/cache/analysis_cache.sqlite3"
+ANALYSIS_TELEMETRY_DIR = PROJECT_ROOT / "data/telemetry"
+
+# 分析配置
+MAP_TOKENS_PER_CHUNK = 8000  # 每块评论的 token 预算（留足空间给提示词与输出）
+REDUCE_TOKENS_PER_CALL = 24000  # 每次合并的输入 token 预算（若干份部分报告）
+MAP_MAX_OUTPUT_TOKENS = 4096
+REDUCE_MAX_OUTPUT_TOKENS = 8192
+INITIAL_CONCURRENT = 8
+MAX_CONCURRENT = 32
+LATENCY_TARGET = 180  # 分析输出较长，健康延迟阈值高于翻译
+MAX_RETRIES = 3
+RETRY_DELAY = 5
+ANALYSIS_PROMPT_VERSION = "1"  # 合并提示词或切块方式变化时提升，使旧缓存失效
+
+SYSTEM_PROMPT = "你是一名资深游戏制作人，擅长从玩家评论中提炼对游戏设计有参考价值的洞察。请使用中文输出。"
+
+REDUCE_PROMPT = """以下是对同一批玩家评论分组分析后得到的 {count} 份《设计机会点报告》片段。
+请将它们合并为一份完整的《设计机会点报告》：
+1. 按原有维度归并同类发现，去掉重复，保留各片段中独有的洞察；
+2. 每个维度的【高光时刻（原文引用）】保留最有代表性的原话（不超过 6 条），引用保持原文，并保留评论编号/来源；
+3. 某个维度在所有片段中都没有发现时可省略；
+4. 保持原有格式（【维度名称】/【高光时刻（原文引用）】），不要添加与评论无关的内容。
+
+{reports}"""
+
+
+def load_analysis_prompt() -> str:
+    """读取分析提示词，去掉末尾“在此处粘贴评论内容”的占位说明"""
+    text = ANALYSIS_PROMPT_FILE.read_text(encoding='utf-8')
+    head, marker, _ = text.partition(PROMPT_DATA_MARKER)
+    return (head + marker).rstrip() if marker else text.rstrip()
+
+
+def render_review(record: Dict, source: str) -> str:
+    """单条评论在分析输入中的文本：来源报告 + 元数据行 + 正文"""
+    return f"《{source}》{format_review_header(record)}\n{record.get('content', '')}"
+
+
+def create_chunks(reports: List[Tuple[str, List[Dict]]]) -> List[str]:
+    """
+    按 token 预算把评论切成块；块不跨报告，新增报告时已有报告的块不变（缓存仍然命中）
+    reports: [(来源名, 记录列表), ...]
+    """
+    chunks = []
+    for source, records in reports:
+        current, current_tokens = [], 0
+        for record in records:
+            block = render_review(record, source)
+            tokens = count_tokens(block)
+            if current and current_tokens + tokens > MAP_TOKENS_PER_CHUNK:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(block)
+            current_tokens += tokens
+        if current:
+            chunks.append("\n\n".join(current))
+    return chunks
+
+
+def group_for_reduce(parts: List[str]) -> List[List[str]]:
+    """按 token 预算把部分报告分组，每组至少两份（保证每层都在收敛）"""
+    groups, current, current_tokens = [], [], 0
+    for part in parts:
+        tokens = count_tokens(part)
+        if len(current) >= 2 and current_tokens + tokens > REDUCE_TOKENS_PER_CALL:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(part)
+        current_tokens += tokens
+    if current:
+        # 最后一组只有一份时并入前一组，避免原样空转一层
+        if len(current) == 1 and groups:
+            groups[-1].extend(current)
+        else:
+            groups.append(current)
+    return groups
+
+
+def build_reduce_prompt(parts: List[str]) -> str:
+    reports = "\n\n".join(f"===== 片段 {i} =====\n{part}" for i, part in enumerate(parts, 1))
+    return REDUCE_PROMPT.format(count=len(parts), reports=reports)
+
+
+class Analyzer:
+    """一次分析运行：共享客户端、并发限制器、结果缓存与遥测"""
+
+    def __init__(self, client: "AsyncOpenAI", cache: TranslationCache, limiter: AdaptiveLimiter, telemetry: Optional[LLMTelemetry] = None):
+        self.client = client
+        self.cache = cache
+        self.limiter = limiter
+        self.telemetry = telemetry
+        self.cache_hits = 0
+
+    async def _call(self, prompt: str, max_tokens: int, stage: str) -> str:
+        """调用一次模型（带重试），结果按完整提示词缓存"""
+        cached = self.cache.get_many([prompt])
+        if prompt in cached:
+            self.cache_hits += 1
+            return cached[prompt]
+
+        last_error = None
+        for attempt in range(1, MAX_RETRIES + 1):
+            queued = time.monotonic()
+            await self.limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = await self.client.chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=max_tokens,
+                    stream=False
+                )
+                latency = time.monotonic() - start
+                self.limiter.on_success(latency)
+            except Exception as e:
+                self.limiter.on_error(e)
+                last_error = e
+                if self.telemetry is not None:
+                    self.telemetry.record(batch=stage, attempt=attempt, items=1, valid_items=0, status='error', error=type(e).__name__,
+                                          queue_wait=start - queued, latency=time.monotonic() - start)
+                print(f"  ✗ [{stage}] 调用失败: {e}")
+                if attempt < MAX_RETRIES:
+                    await asyncio.sleep(RETRY_DELAY)
+                continue
+            finally:
+                await self.limiter.release()
+
+            content = (response.choices[0].message.content or '').strip()
+            if self.telemetry is not None:
+                self.telemetry.record(batch=stage, attempt=attempt, items=1, valid_items=1 if content else 0,
+                                      status='ok' if content else 'partial', finish_reason=response.choices[0].finish_reason,
+                                      usage=response.usage, queue_wait=start - queued, latency=latency)
+            if content:
+                self.cache.put_many({prompt: content})
+                return content
+            print(f"  ⚠ [{stage}] 返回内容为空，重试...")
+        raise RuntimeError(f"[{stage}] 重试 {MAX_RETRIES} 次仍失败: {last_error}")
+
+    async def run(self, chunks: List[str], analysis_prompt: str) -> str:
+        """map：各块并发分析；reduce：逐层并发合并，直到只剩一份报告"""
+        print(f"map：{len(chunks)} 个评论块并发分析...")
+        parts = await asyncio.gather(*(
+            self._call(f"{analysis_prompt}\n{chunk}", MAP_MAX_OUTPUT_TOKENS, f"map {i}")
+            for i, chunk in enumerate(chunks, 1)
+        ))
+        print(f"  ✓ map 完成（缓存命中 {self.cache_hits} 块）")
+
+        level = 1
+        while len(parts) > 1:
+            groups = group_for_reduce(parts)
+            print(f"reduce 第 {level} 层：{len(parts)} 份报告 → {len(groups)} 份...")
+            parts = await asyncio.gather(*(
+                self._call(build_reduce_prompt(group), REDUCE_MAX_OUTPUT_TOKENS, f"reduce {level}-{i}")
+                for i, group in enumerate(groups, 1)
+            ))
+            level += 1
+        return parts[0]
+
+
+async def analyze_reports_async(report_files: List[Path], output_file: Path, client: "AsyncOpenAI" = None) -> str:
+    """
+    分析一个或多个报告并写出合并后的《设计机会点报告》
+    client: 可由调用方传入（如测试用的本地模拟服务），不传则创建 DeepSeek 客户端
+    返回最终报告文本
+    """
+    reports = []
+    for report_file in report_files:
+        records, _ = load_review_records(report_file)
+        reports.append((report_file.stem, records))
+        print(f"  {report_file.name}: {len(records)} 条评论")
+    total = sum(len(records) for _, records in reports)
+    if total == 0:
+        print("未找到可分析的评论")
+        return ""
+
+    chunks = create_chunks(reports)
+    print(f"\n共 {total} 条评论，切分为 {len(chunks)} 块（每块约 {MAP_TOKENS_PER_CHUNK} token）\n")
+
+    telemetry = LLMTelemetry(
+        ANALYSIS_TELEMETRY_DIR / f"analysis_{time.strftime('%Y%m%d_%H%M%S')}.jsonl",
+        prices={'input': PRICE_INPUT, 'input_cache_hit': PRICE_INPUT_CACHE_HIT, 'output': PRICE_OUTPUT},
+    )
+    limiter = AdaptiveLimiter(initial=INITIAL_CONCURRENT, maximum=MAX_CONCURRENT, latency_target=LATENCY_TARGET)
+    cache = TranslationCache(ANALYSIS_CACHE_DB_PATH, MODEL_NAME, ANALYSIS_PROMPT_VERSION)
+    start = time.time()
+    try:
+        if client is None:
+            async with create_client() as own_client:
+                report = await Analyzer(own_client, cache, limiter, telemetry).run(chunks, load_analysis_prompt())
+        else:
+            report = await Analyzer(client, cache, limiter, telemetry).run(chunks, load_analysis_prompt())
+    finally:
+        cache.close()
+        telemetry.close()
+
+    sources = "\n".join(f"- {f.name}（{len(records)} 条）" for f, (_, records) in zip(report_files, reports))
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(f"# 设计机会点报告\n\n分析来源（共 {total} 条评论）：\n{sources}\n\n---\n\n{report}\n")
+
+    print(f"\n✓ 分析完成，耗时 {time.time() - start:.1f} 秒，已保存到: {output_file}")
+    if telemetry.calls:
+        print(f"\n调用统计（明细: {telemetry.path}）:")
+        print(telemetry.format_summary())
+    return report
+
+
+def _select_reports(report_files: List[Path]) -> List[Path]:
+    """交互选择：输入编号（多个用逗号分隔），a 为全部，q 退出"""
+    for i, f in enumerate(report_files, 1):
+        print(f"  {i}. {f.name}")
+    while True:
+        try:
+            choice = input(f"\n请选择要分析的报告 (1-{len(report_files)}，多个用逗号分隔，a 全部，q 退出): ").strip().lower()
+        except (EOFError, KeyboardInterrupt):
+            print("\n已取消")
+            return []
+        if choice == 'q':
+            print("已取消")
+            return []
+        if choice == 'a':
+            return report_files
+        try:
+            indices = [int(c) - 1 for c in choice.split(',') if c.strip()]
+        except ValueError:
+            print("请输入有效的数字")
+            continue
+        if indices and all(0 <= i < len(report_files) for i in indices):
+            return [report_files[i] for i in dict.fromkeys(indices)]
+        print(f"无效选择，请输入 1-{len(report_files)} 之间的数字")
+
+
+def main():
+    """主函数"""
+    reports_dir = PROJECT_ROOT / "output/reports"
+    args = sys.argv[1:]
+
+    print("="*60)
+    print("游戏评论语义分析工具（map-reduce）")
+    print("="*60)
+
+    if args and args[0] != "--all":
+        selected = [Path(a) for a in args]
+        missing = [str(p) for p in selected if not p.exists()]
+        if missing:
+            print(f"文件不存在: {', '.join(missing)}")
+            sys.exit(1)
+    else:
+        report_files = sorted(f for f in reports_dir.glob("*.txt") if "_中文" not in f.name)
+        if not report_files:
+            print("未在 output/reports 下找到报告，请先运行采集和筛选")
+            return
+        if args:
+            selected = report_files
+        else:
+            print(f"\n找到 {len(report_files)} 个报告:\n")
+            selected = _select_reports(report_files)
+    if not selected:
+        return
+
+    name = selected[0].stem if len(selected) == 1 else f"合并{len(selected)}份"
+    output_file = ANALYSIS_DIR / f"{name}_设计机会点报告_{time.strftime('%Y%m%d_%H%M%S')}.md"
+
+    print(f"\n将分析 {len(selected)} 个报告:")
+    if os.name == 'nt':
+        try:
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        except:  # noqa: E722
+            pass
+    try:
+        asyncio.run(analyze_reports_async(selected, output_file))
+    except KeyboardInterrupt:
+        print("\n已中断。已完成的分析块已缓存，重新运行将直接复用")
+    except Exception as e:
+        print(f"执行过程中发生错误: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+翻译吞吐压测：在本地模拟服务（src/llm/mock_server.py）上运行 translate_file_async，
+对比不同并发上限 / 每批 token 预算下的耗时、评论/秒、token/秒、重试次数与输出正确性。
+不调用真实 API，不读写项目的翻译缓存与断点（均放在临时目录）。
+
+使用方法:
+    python -m src.bench_translate
+    python -m src.bench_translate --concurrency 8,32,64 --batch-tokens 1500,3000 --latency 0.5 --latency-dist lognormal
+    python -m src.bench_translate --capacity 16 --retry-after 0.5 --truncate 0.1 --misnumber 0.1
+    python -m src.bench_translate --input output/reports/某报告.txt
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from src import translate_reviews
+from src.llm.dedup import dedupe_reviews
+from src.llm.mock_server import MockConfig, MockServer, mock_translate
+from src.processor.language_id import tag_languages
+from src.processor.review_records import record_key, render_report_text, save_records
+
+# 合成评论用词（长度分布与真实精选评论相近：约 50~600 字符）
+_WORDS = (
+    "game fun level boss quest graphics update ads rewards energy event puzzle team guild "
+    "story music controls lag crash progress coins gems shop price season pass character "
+    "design balance grind daily login friends match ranking difficulty tutorial map skin"
+).split()
+
+
+# 重复评论池（多地区重复出现的通用短评）
+_SHORT_REVIEWS = ["Love this game!!", "Best game ever", "Too many ads", "Fun but pay to win", "Great game, keep it up"]
+
+
+def make_synthetic_records(count: int, seed: int = 0, dup_ratio: float = 0.0) -> List[Dict]:
+    """生成 count 条结构与 filter 输出一致的合成评论记录；dup_ratio 比例的评论取自少量通用短评（用于测去重）"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(1, count + 1):
+        if rng.random() < dup_ratio:
+            records.append({
+                'index': i, 'review_id': f"bench-{i}", 'rating': 5, 'score': 5.0, 'details': {},
+                'date': '2025-01-01', 'countries': ['us'], 'content': rng.choice(_SHORT_REVIEWS),
+            })
+            continue
+        sentences = []
+        for _ in range(rng.randint(1, 8)):
+            words = rng.choices(_WORDS, k=rng.randint(6, 16))
+            sentences.append(' '.join(words).capitalize() + '.')
+        records.append({
+            'index': i,
+            'review_id': f"bench-{i}",
+            'rating': rng.randint(1, 5),
+            'score': round(rng.uniform(5, 30), 1),
+            'details': {},
+            'date': '2025-01-01',
+            'countries': ['us'],
+            'content': f"Review {i}: " + ' '.join(sentences),
+        })
+    return records
+
+
+def _parse_list(value: str, cast):
+    return [cast(v) for v in value.split(',') if v.strip()]
+
+
+def _check_output(output_file: Path, records: List[Dict]) -> Dict[str, int]:
+    """逐条比对输出正文：correct = 对应原文的模拟译文，untranslated = 保留原文，wrong = 其他（错位/串条）"""
+    with open(output_file, 'r', encoding='utf-8') as f:
+        parsed = {r['index']: r['content'] for r in translate_reviews.parse_review_lines(f.readlines())}
+    counts = {'correct': 0, 'untranslated': 0, 'wrong': 0}
+    for record in records:
+        content = parsed.get(record['index'])
+        if content == ' '.join(mock_translate(record['content']).split()):
+            counts['correct'] += 1
+        elif content == record['content']:
+            counts['untranslated'] += 1
+        else:
+            counts['wrong'] += 1
+    return counts
+
+
+def run_scenario(records: List[Dict], mock_config: MockConfig, concurrency: int, batch_tokens: int, verbose: bool = False) -> Dict:
+    """在全新的模拟服务与临时目录中翻译一次，返回统计结果"""
+    tr = translate_reviews
+    saved = {name: getattr(tr, name) for name in
+             ('MAX_CONCURRENT', 'INITIAL_CONCURRENT', 'TARGET_TOKENS_PER_BATCH', 'CACHE_DB_PATH', 'CHECKPOINT_DIR')}
+
+    with tempfile.TemporaryDirectory() as tmp, MockServer(mock_config) as server:
+        tmp = Path(tmp)
+        input_file = tmp / "bench.txt"
+        output_file = tmp / "bench_中文.txt"
+        input_file.write_text(render_report_text(records), encoding='utf-8')
+        save_records(records, input_file.with_suffix('.jsonl'))
+
+        tr.MAX_CONCURRENT = concurrency
+        tr.INITIAL_CONCURRENT = min(saved['INITIAL_CONCURRENT'], concurrency)
+        tr.TARGET_TOKENS_PER_BATCH = batch_tokens
+        tr.CACHE_DB_PATH = tmp / "cache.sqlite3"
+        tr.CHECKPOINT_DIR = tmp / "checkpoints"
+        try:
+            tag_languages(records)
+            to_translate = [(record_key(r), r['content']) for r in records if r['lang'] not in tr.SKIP_LANGUAGES]
+            unique, _ = dedupe_reviews(to_translate, tr.DEDUP_IGNORE_WHITESPACE, tr.DEDUP_IGNORE_CASE)
+            batches = len(tr.create_language_batches(unique, {record_key(r): r['lang'] for r in records}))
+            limiter = tr.create_limiter()
+
+            async def run():
+                from openai import AsyncOpenAI
+
+                async with AsyncOpenAI(api_key="mock", base_url=server.base_url, max_retries=0) as client:
+                    await tr.translate_file_async(input_file, output_file, client=client, limiter=limiter)
+
+            log = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            start = time.perf_counter()
+            with log:
+                asyncio.run(run())
+            elapsed = time.perf_counter() - start
+        finally:
+            for name, value in saved.items():
+                setattr(tr, name, value)
+
+        stats = server.stats.snapshot()
+        result = {
+            'concurrency': concurrency,
+            'batch_tokens': batch_tokens,
+            'batches': batches,
+            'elapsed': elapsed,
+            'reviews_per_sec': len(records) / elapsed,
+            'tokens_per_sec': (stats['prompt_tokens'] + stats['completion_tokens']) / elapsed,
+            # 首次发送之外的所有请求（429/5xx 重试 + 缺失条目补发）
+            'retries': stats['requests'] - batches,
+            'peak_limit': limiter.peak_limit,
+            **stats,
+            **_check_output(output_file, records),
+        }
+    return result
+
+
+def print_results(results: List[Dict], total: int) -> None:
+    columns = [
+        ("并发上限", 'concurrency', "{}"), ("批token", 'batch_tokens', "{}"), ("批次", 'batches', "{}"),
+        ("耗时s", 'elapsed', "{:.2f}"), ("评论/s", 'reviews_per_sec', "{:.1f}"), ("token/s", 'tokens_per_sec', "{:.0f}"),
+        ("请求", 'requests', "{}"), ("重试", 'retries', "{}"), ("429", 'rate_limited', "{}"), ("5xx", 'server_errors', "{}"),
+        ("截断", 'truncated', "{}"), ("错号", 'misnumbered', "{}"), ("峰值并发", 'peak_in_flight', "{}"), ("限流器峰值", 'peak_limit', "{}"),
+        ("正确", 'correct', "{}/" + str(total)), ("原文", 'untranslated', "{}"), ("错位", 'wrong', "{}"),
+    ]
+    print('\t'.join(title for title, _, _ in columns))
+    for r in results:
+        print('\t'.join(fmt.format(r[key]) for _, key, fmt in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在本地模拟服务上压测 translate_reviews 的分批与并发")
+    parser.add_argument('--input', help="使用已有报告（同名 .jsonl 或 TXT）作为输入；默认生成合成评论")
+    parser.add_argument('--reviews', type=int, default=500, help="合成评论条数（默认 500）")
+    parser.add_argument('--dup-ratio', type=float, default=0.0, help="合成评论中重复通用短评的比例")
+    parser.add_argument('--concurrency', default="8,32,64", help="MAX_CONCURRENT 取值，逗号分隔")
+    parser.add_argument('--batch-tokens', default=str(translate_reviews.TARGET_TOKENS_PER_BATCH), help="TARGET_TOKENS_PER_BATCH 取值，逗号分隔")
+    parser.add_argument('--latency', type=float, default=0.3, help="模拟服务基础延迟（秒）")
+    parser.add_argument('--latency-dist', default="lognormal", choices=("fixed", "uniform", "exponential", "lognormal"))
+    parser.add_argument('--jitter', type=float, default=0.5, help="延迟抖动（uniform 为±比例，lognormal 为 sigma）")
+    parser.add_argument('--output-tps', type=float, default=0.0, help="模拟生成速度（输出 token/秒），0 为不按长度加延迟")
+    parser.add_argument('--capacity', type=int, default=0, help="服务端同时处理的请求上限，超出返回 429（0 不限）")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="随机 429 概率")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="429 的 Retry-After（秒）")
+    parser.add_argument('--server-error', type=float, default=0.0, help="随机 503 概率")
+    parser.add_argument('--truncate', type=float, default=0.0, help="截断响应概率")
+    parser.add_argument('--misnumber', type=float, default=0.0, help="编号错误概率")
+    parser.add_argument('--retry-delay', type=float, default=None, help="覆盖 RETRY_DELAY（秒），缩短故障场景的压测时间")
+    parser.add_argument('--seed', type=int, default=42, help="合成数据与故障注入的随机种子")
+    parser.add_argument('--verbose', action='store_true', help="显示翻译过程日志")
+    args = parser.parse_args()
+
+    if args.input:
+        records, _ = translate_reviews.load_review_records(Path(args.input))
+        for i, record in enumerate(records, 1):
+            record.setdefault('index', i)
+    else:
+        records = make_synthetic_records(args.reviews, args.seed, args.dup_ratio)
+
+    mock_config = MockConfig(
+        latency=args.latency, latency_dist=args.latency_dist, latency_jitter=args.jitter,
+        output_tps=args.output_tps, max_in_flight=args.capacity, rate_limit_rate=args.rate_limit,
+        retry_after=args.retry_after, server_error_rate=args.server_error,
+        truncate_rate=args.truncate, misnumber_rate=args.misnumber, seed=args.seed,
+    )
+    if args.retry_delay is not None:
+        translate_reviews.RETRY_DELAY = args.retry_delay
+
+    print(f"压测输入: {len(records)} 条评论；模拟服务: {mock_config}\n")
+    results = []
+    for batch_tokens in _parse_list(args.batch_tokens, int):
+        for concurrency in _parse_list(args.concurrency, int):
+            print(f"运行: 并发上限 {concurrency}，每批 {batch_tokens} token ...")
+            results.append(run_scenario(records, mock_config, concurrency, batch_tokens, args.verbose))
+
+    print()
+    print_results(results, len(records))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,25 @@
 """
 统一配置加载
 从项目根目录的 config.yaml 读取配置，供 scrape、filter、interactive 等模块使用。
+解析结果按文件 mtime 缓存（文件被修改后自动重新加载），并建立按名称 / 文件名 / playstore_id 的索引；
+save_config 先写临时文件再原子替换，并发读取的进程不会读到写了一半的文件。
 """
-import yaml
+import copy
+import os
+import stat
+import tempfile
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 _CONFIG_PATH: Optional[Path] = None
 
+# 解析缓存：(mtime_ns, size) 不变时复用
+_cache_lock = threading.Lock()
+_cache_key: Optional[Tuple[int, int]] = None
+_cache_config: Optional[dict] = None
+_cache_index: Optional["GameIndex"] = None
+
 
 def get_config_path() -> Path:
     """配置文件的绝对路径（项目根目录下的 config.yaml）"""
@@ -18,14 +30,56 @@ def get_config_path() -> Path:
     return _CONFIG_PATH
 
 
+def normalize_game_stem(name: str) -> str:
+    """游戏名转为数据文件名前缀（scrape 写文件、filter 由文件名反查游戏时共用）"""
+    return name.replace(' ', '_').replace(':', '_').replace('&', '_')
+
+
+class GameIndex:
+    """games 列表的查找索引：名称、小写文件名前缀、playstore_id 均为 O(1)"""
+
+    def __init__(self, games: list):
+        self.by_name: Dict[str, dict] = {}
+        self.by_stem: Dict[str, dict] = {}
+        self.by_playstore_id: Dict[str, dict] = {}
+        for game in games:
+            name = game.get('name')
+            if not name:
+                continue
+            # 重名时保留第一条，与原来线性查找的结果一致
+            self.by_name.setdefault(name, game)
+            self.by_stem.setdefault(normalize_game_stem(name).lower(), game)
+            playstore_id = game.get('playstore_id')
+            if playstore_id:
+                self.by_playstore_id.setdefault(playstore_id, game)
+
+
+def _stat_key(path: Path) -> Tuple[int, int]:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_cached() -> Tuple[dict, GameIndex]:
+    """返回缓存的 (配置, 索引)，文件变化时重新解析；调用方不得修改返回的对象"""
+    global _cache_key, _cache_config, _cache_index
+    path = get_config_path()
+    with _cache_lock:
+        key = _stat_key(path)  # 文件不存在时抛出 FileNotFoundError
+        if key != _cache_key or _cache_config is None:
+            import yaml  # 首次解析时才导入（normalize_game_stem 等不读配置的调用无需加载）
+            with open(path, "r", encoding="utf-8") as f:
+                config = yaml.safe_load(f) or {}
+            _cache_key, _cache_config, _cache_index = key, config, GameIndex(config.get("games", []))
+        return _cache_config, _cache_index
+
+
 def load_config() -> dict:
     """
-    加载 config.yaml，返回完整配置字典。
+    加载 config.yaml，返回完整配置字典（副本，调用方可自由修改后 save_config）。
     若文件不存在会抛出 FileNotFoundError，由调用方决定是否退出。
     """
-    path = get_config_path()
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    config, _ = _load_cached()
+    return copy.deepcopy(config)
 
 
 def get_games_list(config: Optional[dict] = None) -> list:
@@ -36,13 +90,41 @@ def get_games_list(config: Optional[dict] = None) -> list:
 
 
 def get_game_by_name(name: str, config: Optional[dict] = None) -> Optional[dict]:
-    """按游戏名称查找配置，找不到返回 None。"""
+    """按游戏名称查找配置，找不到返回 None。未传入 config 时走缓存索引。"""
+    if config is None:
+        game = _load_cached()[1].by_name.get(name)
+        return copy.deepcopy(game) if game is not None else None
     for game in get_games_list(config):
         if game.get("name") == name:
             return game
     return None
 
 
+def get_game_by_playstore_id(playstore_id: str) -> Optional[dict]:
+    """按 Google Play 应用 ID 查找配置，找不到返回 None。"""
+    game = _load_cached()[1].by_playstore_id.get(playstore_id)
+    return copy.deepcopy(game) if game is not None else None
+
+
+def find_game_for_file(file_stem: str) -> Optional[dict]:
+    """
+    由数据文件名（如 Cash_Club_android_全球_202401-202512）反查游戏配置，找不到返回 None。
+    先按 “_android_” 之前的前缀精确查索引；旧命名的文件再按名称/应用 ID 子串匹配（名称长的优先）。
+    """
+    _, index = _load_cached()
+    file_lower = file_stem.lower()
+    for marker in ("_android", "_ios"):
+        if marker in file_lower:
+            game = index.by_stem.get(file_lower.split(marker, 1)[0])
+            if game is not None:
+                return copy.deepcopy(game)
+    for stem, game in sorted(index.by_stem.items(), key=lambda item: len(item[0]), reverse=True):
+        playstore_id = (game.get('playstore_id') or '').lower()
+        if (stem and (stem in file_lower or file_lower.startswith(stem))) or (playstore_id and playstore_id in file_lower):
+            return copy.deepcopy(game)
+    return None
+
+
 def get_scraper_config(config: Optional[dict] = None) -> dict:
     """返回 scraper 配置段；若未传入 config 则先 load_config()。"""
     if config is None:
@@ -51,7 +133,24 @@ def get_scraper_config(config: Optional[dict] = None) -> dict:
 
 
 def save_config(config: dict) -> None:
-    """将配置写回 config.yaml（如添加新游戏后）。"""
+    """将配置写回 config.yaml（如添加新游戏后）：写同目录临时文件后原子替换，并刷新缓存。"""
+    global _cache_key, _cache_config, _cache_index
+    import yaml
     path = get_config_path()
-    with open(path, "w", encoding="utf-8") as f:
-        yaml.dump(config, f, allow_unicode=True, default_flow_style=False, sort_keys=False)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            if path.exists():
+                # mkstemp 创建的文件权限为 0600，替换前沿用原文件权限
+                os.chmod(tmp_path, stat.S_IMODE(path.stat().st_mode))
+            yaml.dump(config, f, allow_unicode=True, default_flow_style=False, sort_keys=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    with _cache_lock:
+        saved = copy.deepcopy(config)
+        _cache_key, _cache_config, _cache_index = _stat_key(path), saved, GameIndex(saved.get("games", []))
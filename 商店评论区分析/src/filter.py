@@ -1,17 +1,24 @@
 """
 简单筛选脚本 - 粗筛有意义的评论并输出到文档
 使用方法: python -m src.filter [游戏名称]
+
+筛选主体为 filter_reviews()，采集后可直接传入内存中的评论，无需重新读取 JSON。
 """
 import logging
 import json
 import re
-import pandas as pd
 from pathlib import Path
 from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from src.processor.review_records import render_report_text, save_records, companion_jsonl_path
+from src.processor.language_id import detect_language
+from src import metrics
+from src.config import find_game_for_file, normalize_game_stem
 
-from src.processor.data_cleaner import DataCleaner
-from src.analyzer.review_filter import ReviewFilter
-from src.config import load_config, get_games_list
+# pandas（连同 DataCleaner / ReviewFilter）导入约 0.3 秒，找不到数据文件等提前退出的情况不需要，开始筛选时再加载
+if TYPE_CHECKING:
+    import pandas as pd
 
 # 配置日志
 logging.basicConfig(
@@ -25,6 +32,11 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# 项目根目录（src 的上一级）；data/raw、output/reports 均相对于此目录，与运行时的工作目录无关
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+RAW_DATA_DIR = PROJECT_ROOT / "data/raw"
+REPORTS_DIR = PROJECT_ROOT / "output/reports"
+
 
 def main(game_name: str = None):
     """主函数
@@ -37,9 +49,9 @@ def main(game_name: str = None):
     logger.info("="*60)
     
     # 查找已采集的数据
-    data_dir = Path("data/raw")
+    data_dir = RAW_DATA_DIR
     if not data_dir.exists():
-        logger.error("数据目录不存在: data/raw")
+        logger.error(f"数据目录不存在: {data_dir}")
         logger.info("请先运行数据采集")
         return
     
@@ -47,7 +59,7 @@ def main(game_name: str = None):
     if game_name:
         # 查找包含游戏名称的文件（iOS或Android），支持不同的时间范围
         # 替换空格、冒号等特殊字符为下划线，与文件名生成逻辑保持一致
-        game_name_pattern = game_name.replace(' ', '_').replace(':', '_').replace('&', '_')
+        game_name_pattern = normalize_game_stem(game_name)
         patterns = [
             f"*{game_name_pattern}*android*.json",
             f"*{game_name_pattern}*ios*.json"
@@ -88,19 +100,11 @@ def main(game_name: str = None):
         
         # 从文件名提取游戏名称：先按 config 匹配，否则取文件名首段
         file_name = data_file.stem
-        file_lower = file_name.lower()
         game_name = None
         try:
-            config = load_config()
-            games = get_games_list(config)
-            # 按名称长度降序，优先匹配更长更具体的名称
-            for g in sorted(games, key=lambda x: len(x.get('name', '')), reverse=True):
-                name = g.get('name', '')
-                norm = name.replace(' ', '_').replace(':', '_').replace('&', '_')
-                pid = (g.get('playstore_id') or '').lower()
-                if (norm and (norm.lower() in file_lower or file_lower.startswith(norm.lower()))) or (pid and pid in file_lower):
-                    game_name = name
-                    break
+            game = find_game_for_file(file_name)
+            if game is not None:
+                game_name = game.get('name')
         except FileNotFoundError:
             pass
         if game_name is None:
@@ -116,38 +120,60 @@ def main(game_name: str = None):
     # 如果还没有加载数据，从文件加载
     if reviews is None:
         logger.info(f"\n加载数据: {data_file}")
-        with open(data_file, 'r', encoding='utf-8') as f:
+        with metrics.stage("load"), open(data_file, 'r', encoding='utf-8') as f:
             reviews = json.load(f)
     
+    filter_reviews(reviews, game_name, data_file)
+
+
+@metrics.timed("filter")
+def filter_reviews(reviews: List[Dict], game_name: str, data_file) -> Tuple[str, str]:
+    """
+    清洗、长度过滤、权重评分并输出精选评论（TXT + 同名 JSONL）。
+    reviews 可以是刚从 JSON 加载的列表，也可以是 scrape_game() 直接返回的内存数据；
+    data_file 为原始数据文件路径（可尚未写完），仅用于从文件名提取时间范围。
+    
+    Returns:
+        (TXT 路径, JSONL 路径)
+    """
+    from src.processor.data_cleaner import DataCleaner
+    from src.analyzer.review_filter import ReviewFilter
+    
     logger.info(f"原始评论数: {len(reviews)} 条")
+    metrics.count("reviews", len(reviews))
     
     # 从数据中获取游戏名称（如果数据中有）
     if reviews and 'game_name' in reviews[0]:
         game_name = reviews[0]['game_name']
         logger.info(f"游戏名称: {game_name}")
+    metrics.annotate(game=game_name)
     
     # 步骤1: 数据清洗
     logger.info("\n步骤1: 数据清洗...")
-    cleaner = DataCleaner()
-    df = cleaner.clean_reviews(reviews)
-    df = cleaner.process_dataframe(df)
+    with metrics.stage("clean"):
+        cleaner = DataCleaner()
+        df = cleaner.clean_reviews(reviews)
+        df = cleaner.process_dataframe(df)
     logger.info(f"清洗后: {len(df)} 条")
     
     # 步骤2: 第一步筛选 - 简单长度过滤
     logger.info("\n步骤2: 第一步筛选 - 长度过滤...")
     review_filter = ReviewFilter()
-    df_filtered = review_filter.filter_by_length(df, min_length=50)
+    with metrics.stage("length_filter"):
+        df_filtered = review_filter.filter_by_length(df, min_length=50)
     logger.info(f"长度过滤后: {len(df_filtered)} 条")
     
     # 步骤3: 第二步筛选 - 权重评分
     logger.info("\n步骤3: 第二步筛选 - 权重评分...")
-    df_scored = review_filter.score_reviews(df_filtered)
+    with metrics.stage("score"):
+        df_scored = review_filter.score_reviews(df_filtered)
     
     # 步骤4: 选择前500条
     logger.info("\n步骤4: 选择前500条高价值评论...")
     max_reviews = min(500, len(df_scored))
     df_sorted = df_scored.nlargest(max_reviews, 'score')
     logger.info(f"最终保留: {len(df_sorted)} 条高价值评论")
+    metrics.count("selected", len(df_sorted))
     
     # 输出评分统计
     if len(df_sorted) > 0:
@@ -176,19 +202,24 @@ def main(game_name: str = None):
             time_range = time_match.group(1)
     
     # 使用游戏名称和时间范围生成输出文件名（只生成TXT格式）
-    game_name_safe = game_name.replace(' ', '_').replace('&', '_').replace(':', '_')
+    game_name_safe = normalize_game_stem(game_name)
     if time_range:
-        output_file = f"output/reports/{game_name_safe}_{time_range}_精选评论_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        output_file = str(REPORTS_DIR / f"{game_name_safe}_{time_range}_精选评论_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
     else:
-        output_file = f"output/reports/{game_name_safe}_精选评论_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        output_file = str(REPORTS_DIR / f"{game_name_safe}_精选评论_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
     Path(output_file).parent.mkdir(parents=True, exist_ok=True)
     
-    # 生成TXT文档（纯文本，方便复制给AI）
+    # 生成TXT文档（纯文本，方便复制给AI）+ 同名 JSONL（供翻译等下游直接加载）
     logger.info(f"正在生成报告...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(generate_simple_text(df_sorted, game_name))
+    with metrics.stage("report"):
+        records = build_review_records(df_sorted)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(render_report_text(records))
+        jsonl_file = companion_jsonl_path(output_file)
+        save_records(records, jsonl_file)
     
     logger.info(f"✓ 精选评论已保存: {output_file}")
+    logger.info(f"✓ 结构化记录已保存: {jsonl_file}")
     
     # 统计信息
     logger.info("\n" + "="*60)
@@ -200,26 +231,28 @@ def main(game_name: str = None):
     logger.info(f"最终精选: {len(df_sorted)} 条")
     logger.info(f"\n输出文件:")
     logger.info(f"  - 精选评论: {output_file}")
+    logger.info(f"  - 结构化记录: {jsonl_file}")
     logger.info("\n你可以将文件内容复制给AI进行进一步分析")
     logger.info("="*60)
+    return output_file, jsonl_file
 
 
-def generate_simple_text(df: pd.DataFrame, game_name: str = "游戏") -> str:
-    """生成简化版文本，方便复制给AI"""
-    
-    text = f"""
----
+def _to_native(value):
+    """numpy 标量转为 Python 原生类型，便于 JSON 序列化"""
+    return value.item() if hasattr(value, 'item') else value
 
-精选评论列表：
-（来源：该条从哪个/哪些国家商店接口抓取；同语区多国接口常返回相同数据，标“多地区”表示无法区分评论者真实国家）
 
-"""
+def build_review_records(df: "pd.DataFrame") -> list:
+    """将评分后的 DataFrame 转为结构化评论记录（按综合分降序，index 从 1 开始）"""
+    import pandas as pd
+    
+    records = []
     
     # 按评分排序
     df_sorted = df.sort_values('score', ascending=False)
     
     for idx, (_, row) in enumerate(df_sorted.iterrows(), 1):
-        rating = row.get('rating', 'N/A')
+        rating = _to_native(row.get('rating', 'N/A'))
         content = row.get('content_cleaned', row.get('content', ''))
         
         # 处理日期：如果是Timestamp对象，先转换为字符串
@@ -235,34 +268,37 @@ def generate_simple_text(df: pd.DataFrame, game_name: str = "游戏") -> str:
             date = 'N/A'
         
         # 获取评分详情
-        score = row.get('score', 'N/A')
+        score = _to_native(row.get('score', 'N/A'))
         score_details = row.get('score_details', {})
+        details = {k: _to_native(v) for k, v in score_details.items()} if isinstance(score_details, dict) else {}
         
-        # 格式化评分详情
-        detail_parts = []
-        if isinstance(score_details, dict):
-            for key, value in score_details.items():
-                if key != 'length':  # 长度分单独显示
-                    detail_parts.append(f"{key}: {value}")
-        
-        detail_str = f" | {', '.join(detail_parts)}" if detail_parts else ""
-        # 多国接口返回同一条时只表示“从哪些商店抓到的”，无法区分评论者真实国家
+        # 来源国家：多国接口返回同一条时记录全部来源
         country_names = row.get('country_names')
-        if isinstance(country_names, list) and len(country_names) > 1:
-            country = f"多地区({'、'.join(str(c) for c in country_names)})"
-        elif isinstance(country_names, list) and country_names:
-            country = country_names[0]
+        if isinstance(country_names, list) and country_names:
+            countries = [str(c) for c in country_names]
         else:
             country = row.get('country_name') or row.get('country', '')
-        country_str = f" | 来源: {country}" if country else ""
+            countries = [str(country)] if isinstance(country, str) and country else []
         
-        text += f"\n[评论 {idx}] 评分: {rating}/5 | 综合分: {score}{detail_str} | 日期: {date}{country_str}\n"
-        text += f"{content}\n"
-        text += "-" * 80 + "\n"
+        review_id = row.get('review_id', '')
+        records.append({
+            'index': idx,
+            'review_id': review_id if isinstance(review_id, str) else '',
+            'rating': rating,
+            'score': score,
+            'details': details,
+            'date': date,
+            'countries': countries,
+            'content': content,
+            'lang': detect_language(content, countries),
+        })
     
-    text += f"\n\n总计: {len(df)} 条精选评论\n"
-    
-    return text
+    return records
+
+
+def generate_simple_text(df: "pd.DataFrame", game_name: str = "游戏") -> str:
+    """生成简化版文本，方便复制给AI"""
+    return render_report_text(build_review_records(df))
 
 
 if __name__ == "__main__":
@@ -276,7 +312,8 @@ if __name__ == "__main__":
         logger.info(f"指定游戏: {game_name}")
     
     try:
-        main(game_name=game_name)
+        with metrics.RunMetrics("filter", game=game_name):
+            main(game_name=game_name)
     except KeyboardInterrupt:
         logger.info("\n\n用户中断程序")
     except Exception as e:
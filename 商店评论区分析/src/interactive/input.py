@@ -8,8 +8,7 @@ from pathlib import Path
 # 添加当前目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.scraper.playstore_scraper import PlayStoreScraper
-from src.config import load_config, get_games_list, get_config_path, save_config
+from src.config import load_config, get_games_list, get_config_path, save_config, get_game_by_name, get_game_by_playstore_id
 
 
 def _load_config_or_exit():
@@ -220,7 +219,8 @@ def search_and_select_game(query=None):
     print()
     
     try:
-        # 创建采集器实例
+        # 创建采集器实例（只有走 Google 搜索时才导入 google-play-scraper，菜单启动不受影响）
+        from src.scraper.playstore_scraper import PlayStoreScraper
         scraper = PlayStoreScraper(delay=1.0, retry_times=1)
         
         # 搜索应用，获取更多结果以防过滤掉无效项
@@ -267,13 +267,11 @@ def search_and_select_game(query=None):
                 print()
                 
                 # 检查是否已存在于配置中：若存在则用 config 里的游戏名，保证采集/筛选文件名一致
-                config = load_config()
-                games = get_games_list(config)
-                for game in games:
-                    if game.get('playstore_id') == selected['appId'] or game.get('name') == selected['title']:
-                        print(f"✓ 此游戏已存在于配置文件中")
-                        # 统一用 config 名称，避免 Play 标题与 config 不一致导致筛选找不到文件
-                        return game.get('name', selected['title'])
+                game = get_game_by_playstore_id(selected['appId']) or get_game_by_name(selected['title'])
+                if game is not None:
+                    print(f"✓ 此游戏已存在于配置文件中")
+                    # 统一用 config 名称，避免 Play 标题与 config 不一致导致筛选找不到文件
+                    return game.get('name', selected['title'])
                 
                 # 如果不存在，询问是否要添加到配置文件
                 add_to_config = input("是否要将此游戏添加到配置文件? (y/n, 默认y): ").strip().lower()
@@ -304,14 +302,13 @@ def add_game_to_config(game_name: str, app_id: str):
             print(f"警告: 配置文件 {get_config_path()} 不存在，无法添加")
             return
         
+        if get_game_by_name(game_name) or get_game_by_playstore_id(app_id):
+            print(f"游戏 '{game_name}' 或应用ID '{app_id}' 已存在于配置中")
+            return
+        
+        # 添加新游戏（load_config 返回副本，修改后整体写回）
         config = load_config()
         games = config.get('games', [])
-        for game in games:
-            if game.get('name') == game_name or game.get('playstore_id') == app_id:
-                print(f"游戏 '{game_name}' 或应用ID '{app_id}' 已存在于配置中")
-                return
-        
-        # 添加新游戏
         new_game = {
             'name': game_name,
             'playstore_id': app_id,
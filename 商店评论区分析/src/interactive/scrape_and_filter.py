@@ -1,19 +1,54 @@
 """
 合并采集和筛选的交互式脚本
 采集完成后自动进行筛选，无需确认
+
+采集与筛选在同一进程内完成：scrape_game() 返回的评论直接交给 filter_reviews()，
+原始 JSON 由后台线程写入 data/raw（与筛选并行），不再启动第二个 Python 进程、
+也不再重新 glob 并解析刚写出的文件。
 """
+import contextvars
+import logging
 import sys
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
 # 添加当前目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from src import metrics
 from src.interactive.input import interactive_scrape_input
 
 
-def run_scrape(game_name, start_date=None, end_date=None):
-    """执行采集任务"""
+def _load_pipeline():
+    """
+    交互菜单结束后再导入 scrape / filter（菜单启动只需 config），返回两个模块。
+    同一进程内日志由先导入的 scrape 配置（scrape.log + 控制台），筛选日志另外写一份 filter.log，与单独运行时一致。
+    """
+    from src import scrape, filter as review_filter
+    filter_logger = logging.getLogger('src.filter')
+    if not any(isinstance(h, logging.FileHandler) for h in filter_logger.handlers):
+        handler = logging.FileHandler('filter.log', encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        filter_logger.addHandler(handler)
+    return scrape, review_filter
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+
+def run_pipeline(game_name, start_date=None, end_date=None):
+    """
+    采集 → 筛选一条龙（同一进程）
+    
+    Args:
+        game_name: 游戏名称（须在 config.yaml 中）
+        start_date / end_date: YYYY-MM-DD 字符串，缺省为最近一年
+    
+    Returns:
+        退出码：0 成功，1 采集失败，2 筛选失败
+    """
     print()
     print("="*60)
     print("步骤1: 开始采集评论")
@@ -26,31 +61,42 @@ def run_scrape(game_name, start_date=None, end_date=None):
     print("这可能需要一些时间，请耐心等待...")
     print()
     
-    # 构建采集命令参数
-    scrape_args = ['-m', 'src.scrape', game_name]
-    if start_date and end_date:
-        scrape_args.extend([start_date, end_date])
+    scrape, review_filter = _load_pipeline()
+    try:
+        start, end = scrape.resolve_date_range(_parse_date(start_date), _parse_date(end_date))
+    except ValueError:
+        print("日期格式错误，应为 YYYY-MM-DD，例如: 2025-09-01")
+        return 1
     
-    # 执行采集
-    exit_code = subprocess.call([sys.executable] + scrape_args)
-    return exit_code
-
-
-def run_filter(game_name):
-    """执行筛选任务"""
-    print()
-    print("="*60)
-    print("步骤2: 开始筛选评论")
-    print("="*60)
-    print(f"开始筛选: {game_name}")
-    print()
+    reviews = scrape.scrape_game(game_name, start, end)
+    if not reviews:
+        return 1
+    scrape.log_statistics(reviews)
+    raw_path = scrape.raw_output_path(game_name, start, end)
     
-    # 构建筛选命令参数
-    filter_args = ['-m', 'src.filter', game_name]
+    # 原始数据落盘放到后台线程，同时在内存中筛选（两边都只读 reviews）
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist") as executor:
+        # 复制当前上下文，后台落盘也计入本次运行的 save_raw 阶段
+        saving = executor.submit(contextvars.copy_context().run, scrape.save_raw_reviews, reviews, raw_path)
+        
+        print()
+        print("="*60)
+        print("步骤2: 开始筛选评论")
+        print("="*60)
+        print(f"开始筛选: {game_name}（{len(reviews)} 条，直接使用内存中的采集结果）")
+        print()
+        
+        try:
+            review_filter.filter_reviews(reviews, game_name, raw_path)
+            filter_ok = True
+        except Exception as e:
+            logging.getLogger('src.filter').error(f"程序执行出错: {str(e)}", exc_info=True)
+            filter_ok = False
+        
+        # 等待落盘完成；写入失败直接抛出，避免用户以为 data/raw 中已有数据
+        saving.result()
     
-    # 执行筛选
-    exit_code = subprocess.call([sys.executable] + filter_args)
-    return exit_code
+    return 0 if filter_ok else 2
 
 
 def main():
@@ -62,23 +108,21 @@ def main():
         start_date = result[1]
         end_date = result[2]
         
-        # 步骤1: 执行采集
-        scrape_exit_code = run_scrape(game_name, start_date, end_date)
+        # 采集后自动筛选
+        with metrics.RunMetrics("scrape_and_filter", game=game_name):
+            exit_code = run_pipeline(game_name, start_date, end_date)
         
-        if scrape_exit_code != 0:
+        if exit_code == 1:
             print("\n" + "="*60)
             print("采集失败，程序退出")
             print("="*60)
-            sys.exit(scrape_exit_code)
-        
-        # 步骤2: 自动执行筛选
-        filter_exit_code = run_filter(game_name)
+            sys.exit(exit_code)
         
-        if filter_exit_code != 0:
+        if exit_code != 0:
             print("\n" + "="*60)
             print("筛选失败")
             print("="*60)
-            sys.exit(filter_exit_code)
+            sys.exit(exit_code)
         
         # 完成提示
         print()
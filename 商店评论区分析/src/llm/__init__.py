@@ -0,0 +1 @@
+# LLM 调用支撑模块（缓存、分批、并发等）
@@ -0,0 +1,60 @@
+"""
+批次断点文件（JSONL，追加写）
+第一行记录输入指纹，之后每完成一个批次追加一行 {"batch": 序号, "results": {记录键: 译文}}。
+进程中断后重新运行同一输入时，读回已完成的结果，只处理剩余条目；输入变化（指纹不符）则作废重来。
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict
+
+
+class BatchCheckpoint:
+    """单个输入文件的批次断点"""
+
+    def __init__(self, path, fingerprint: str):
+        """
+        Args:
+            path: 断点文件路径
+            fingerprint: 输入指纹（内容 + 模型 + 提示词版本的哈希），用于判断断点是否仍然有效
+        """
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+
+    def load(self) -> Dict[str, str]:
+        """读取已完成的结果；文件不存在、指纹不符或首行损坏时返回空字典并丢弃旧断点"""
+        if not self.path.exists():
+            return {}
+        results = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except json.JSONDecodeError:
+            header = {}
+        if header.get('fingerprint') != self.fingerprint:
+            self.remove()
+            return {}
+        for line in lines[1:]:
+            try:
+                results.update(json.loads(line).get('results', {}))
+            except json.JSONDecodeError:
+                # 中断时最后一行可能只写了一半，忽略即可（该批次会重新翻译）
+                continue
+        return results
+
+    def append(self, batch_num: int, results: Dict[str, str]) -> None:
+        """追加一个已完成批次的结果并立即落盘"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.path.exists()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if is_new:
+                f.write(json.dumps({'fingerprint': self.fingerprint}) + '\n')
+            f.write(json.dumps({'batch': batch_num, 'results': results}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self) -> None:
+        """任务全部完成后删除断点文件"""
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,116 @@
+"""
+自适应并发控制（AIMD）
+延迟与错误率正常时逐步提高并发上限；遇到 429 / 5xx / 连接错误时上限减半，
+并按响应头 Retry-After 暂停发出新请求。用于替代固定大小的 asyncio.Semaphore。
+"""
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+def is_retryable_error(exc: Exception) -> bool:
+    """是否属于限流/服务端/网络类错误（应降低并发），而非请求本身有误"""
+    status = getattr(exc, 'status_code', None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # openai 的 APIConnectionError / APITimeoutError 没有 status_code
+    return type(exc).__name__ in ('APIConnectionError', 'APITimeoutError') or isinstance(exc, asyncio.TimeoutError)
+
+
+def get_retry_after(exc: Exception) -> Optional[float]:
+    """从异常携带的 HTTP 响应中读取 Retry-After（秒数或 HTTP 日期），没有则返回 None"""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class AdaptiveLimiter:
+    """
+    自适应并发限制器
+
+    用法:
+        await limiter.acquire()
+        try:
+            ... 发请求 ...
+            limiter.on_success(latency)
+        except Exception as e:
+            limiter.on_error(e)
+            raise
+        finally:
+            await limiter.release()
+    """
+
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 64, latency_target: float = 90.0):
+        """
+        Args:
+            initial: 初始并发上限
+            minimum: 并发上限下限
+            maximum: 并发上限上限
+            latency_target: 单次请求健康延迟（秒），超过视为服务端吃紧，不再加并发
+        """
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.peak_limit = initial
+        self.throttled = 0
+        self._healthy_streak = 0
+        self._paused_until = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        """等待空闲并发槽位；处于 Retry-After 暂停期时等到暂停结束再返回"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self) -> None:
+        """归还槽位并唤醒等待者（上限可能已变化）"""
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        """请求成功：连续一轮（= 当前上限次）健康响应后上限 +1；延迟过高则 -1"""
+        if latency > self.latency_target:
+            self._healthy_streak = 0
+            self.limit = max(self.minimum, self.limit - 1)
+            return
+        self._healthy_streak += 1
+        if self._healthy_streak >= self.limit and self.limit < self.maximum:
+            self._healthy_streak = 0
+            self.limit += 1
+            self.peak_limit = max(self.peak_limit, self.limit)
+
+    def on_error(self, exc: Exception) -> None:
+        """请求失败：限流/服务端错误时上限减半，并按 Retry-After 暂停新请求"""
+        if not is_retryable_error(exc):
+            return
+        self.throttled += 1
+        self._healthy_streak = 0
+        self.limit = max(self.minimum, self.limit // 2)
+        retry_after = get_retry_after(exc)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
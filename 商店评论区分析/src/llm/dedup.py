@@ -0,0 +1,52 @@
+"""
+待翻译文本去重
+同一份报告里常有大量相同的短评（如 "Love this game!!" 在多个地区重复出现）。
+翻译前按（可选规范化后的）原文分组，每组只发送第一条，译文再回填到组内所有评论。
+"""
+from typing import Dict, List, Tuple
+
+
+def normalize_text(text: str, ignore_whitespace: bool = True, ignore_case: bool = False) -> str:
+    """去重用的比较键：可选合并连续空白、忽略大小写"""
+    if ignore_whitespace:
+        text = ' '.join(text.split())
+    if ignore_case:
+        text = text.casefold()
+    return text
+
+
+def dedupe_reviews(reviews: List[Tuple[str, str]], ignore_whitespace: bool = True, ignore_case: bool = False
+                   ) -> Tuple[List[Tuple[str, str]], Dict[str, List[Tuple[str, str]]]]:
+    """
+    按原文分组去重
+
+    Args:
+        reviews: [(记录键, 原文), ...]
+    Returns:
+        (unique, duplicates)：unique 为每组第一条，保持原顺序；
+        duplicates 为 {代表记录键: [(重复记录键, 原文), ...]}，只包含确有重复的组
+    """
+    representative: Dict[str, str] = {}
+    unique = []
+    duplicates: Dict[str, List[Tuple[str, str]]] = {}
+    for key, text in reviews:
+        norm = normalize_text(text, ignore_whitespace, ignore_case)
+        rep_key = representative.get(norm)
+        if rep_key is None:
+            representative[norm] = key
+            unique.append((key, text))
+        else:
+            duplicates.setdefault(rep_key, []).append((key, text))
+    return unique, duplicates
+
+
+def fan_out(translation_map: Dict[str, str], duplicates: Dict[str, List[Tuple[str, str]]]) -> int:
+    """把代表条目的译文回填给组内重复条目（代表未译出则都保留原文），返回回填条数"""
+    filled = 0
+    for rep_key, dups in duplicates.items():
+        if rep_key not in translation_map:
+            continue
+        for key, _ in dups:
+            translation_map[key] = translation_map[rep_key]
+            filled += 1
+    return filled
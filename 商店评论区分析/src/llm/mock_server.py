@@ -0,0 +1,285 @@
+"""
+本地 OpenAI 兼容的模拟服务（仅用于压测与故障测试，不调用真实 API）
+实现 POST /chat/completions：从翻译提示词中取出带 id 的评论，返回确定性的“译文”（固定前缀 + 原文），
+并可按配置注入延迟分布、容量超限/随机 429（带 Retry-After）、5xx、截断响应、编号错误，返回 usage token 数。
+
+用法（单独启动，供手动测试）:
+    python -m src.llm.mock_server [端口]
+代码中:
+    with MockServer(MockConfig(latency=0.5, truncate_rate=0.1)) as server:
+        client = AsyncOpenAI(api_key="mock", base_url=server.base_url, max_retries=0)
+"""
+import json
+import math
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from src.llm.tokens import count_tokens
+
+# 模拟译文 = 前缀 + 原文，压测时据此校验输出是否对号入座
+TRANSLATION_PREFIX = "译文："
+
+# 与 translate_reviews.build_translation_prompt 中 JSON 负载前的标记一致
+_PAYLOAD_MARKER = "（JSON 数组）：\n"
+
+
+def mock_translate(text: str) -> str:
+    """模拟服务对一条原文返回的译文"""
+    return TRANSLATION_PREFIX + text
+
+
+@dataclass
+class MockConfig:
+    """模拟服务行为配置（各 *_rate 为每次请求独立触发的概率）"""
+    latency: float = 0.2                # 基础延迟（秒）；lognormal 分布下为中位数
+    latency_dist: str = "fixed"         # fixed / uniform / exponential / lognormal
+    latency_jitter: float = 0.5         # uniform：±比例；lognormal：sigma
+    output_tps: float = 0.0             # 模拟生成速度（输出 token/秒），0 表示不按输出长度加延迟
+    max_in_flight: int = 0              # 服务端容量：同时处理的请求超过该数返回 429，0 表示不限
+    rate_limit_rate: float = 0.0        # 随机返回 429 的概率
+    retry_after: float = 1.0            # 429 响应头 Retry-After（秒）
+    server_error_rate: float = 0.0      # 随机返回 503 的概率
+    truncate_rate: float = 0.0          # 响应 JSON 被截断（finish_reason=length）的概率
+    misnumber_rate: float = 0.0         # 编号错误（漏一条 / 未知 id / 重复 id）的概率
+    seed: Optional[int] = None          # 故障注入随机种子，便于复现
+
+
+class MockStats:
+    """服务端计数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.completed = 0
+            self.rate_limited = 0
+            self.server_errors = 0
+            self.truncated = 0
+            self.misnumbered = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.peak_in_flight = 0
+            self.in_flight = 0
+
+    def add(self, **counts) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def enter(self) -> int:
+        """登记一个进行中的请求，返回当前进行中的请求数"""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return self.in_flight
+
+    def leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'completed': self.completed,
+                'rate_limited': self.rate_limited,
+                'server_errors': self.server_errors,
+                'truncated': self.truncated,
+                'misnumbered': self.misnumbered,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'peak_in_flight': self.peak_in_flight,
+            }
+
+
+def extract_items(prompt: str) -> List[Dict]:
+    """从翻译提示词中取出 [{"id", "text"}, ...]；不是翻译提示词时返回空列表"""
+    _, marker, payload = prompt.partition(_PAYLOAD_MARKER)
+    if not marker:
+        return []
+    try:
+        items = json.loads(payload)
+    except json.JSONDecodeError:
+        return []
+    return [item for item in items if isinstance(item, dict) and 'id' in item and 'text' in item]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 保持连接，贴近真实客户端连接池的行为
+
+    def log_message(self, format, *args):
+        pass  # 压测时不打印每个请求
+
+    def do_POST(self):
+        server: "MockServer" = self.server.mock
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+        try:
+            request = json.loads(body or b'{}')
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        in_flight = server.stats.enter()
+        try:
+            status, payload, headers = server.handle_completion(request, in_flight)
+        finally:
+            server.stats.leave()
+        self._send_json(status, payload, headers)
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockServer:
+    """在后台线程运行的模拟服务；port=0 时自动分配空闲端口"""
+
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _sample_latency(self) -> float:
+        cfg = self.config
+        with self._rng_lock:
+            if cfg.latency_dist == "uniform":
+                return max(0.0, cfg.latency * (1 + self._rng.uniform(-cfg.latency_jitter, cfg.latency_jitter)))
+            if cfg.latency_dist == "exponential":
+                return self._rng.expovariate(1 / cfg.latency) if cfg.latency > 0 else 0.0
+            if cfg.latency_dist == "lognormal":
+                return self._rng.lognormvariate(math.log(cfg.latency), cfg.latency_jitter) if cfg.latency > 0 else 0.0
+        return cfg.latency
+
+    def handle_completion(self, request: Dict, in_flight: int):
+        """处理一次 chat.completions 请求，返回 (状态码, 响应体, 额外响应头)"""
+        cfg = self.config
+
+        # 容量超限或随机限流：立即返回 429（真实服务的限流响应通常很快）
+        if (cfg.max_in_flight and in_flight > cfg.max_in_flight) or self._random() < cfg.rate_limit_rate:
+            self.stats.add(rate_limited=1)
+            return 429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}, {"Retry-After": f"{cfg.retry_after:g}"}
+
+        messages = request.get('messages') or []
+        prompt_tokens = sum(count_tokens(str(m.get('content', ''))) for m in messages)
+        items = extract_items(str(messages[-1].get('content', ''))) if messages else []
+
+        delay = self._sample_latency()
+        if self._random() < cfg.server_error_rate:
+            time.sleep(delay)
+            self.stats.add(server_errors=1)
+            return 503, {"error": {"message": "Service unavailable", "type": "server_error"}}, {}
+
+        translations = [{"id": str(item['id']), "text": mock_translate(str(item['text']))} for item in items]
+        if translations and self._random() < cfg.misnumber_rate:
+            self._misnumber(translations, items)
+            self.stats.add(misnumbered=1)
+        content = json.dumps({"translations": translations}, ensure_ascii=False)
+
+        finish_reason = "stop"
+        if self._random() < cfg.truncate_rate:
+            # 在 30%~90% 处截断，模拟输出达到 max_tokens
+            with self._rng_lock:
+                cut = int(len(content) * self._rng.uniform(0.3, 0.9))
+            content = content[:cut]
+            finish_reason = "length"
+            self.stats.add(truncated=1)
+
+        completion_tokens = count_tokens(content)
+        if cfg.output_tps > 0:
+            delay += completion_tokens / cfg.output_tps
+        time.sleep(delay)
+
+        self.stats.add(completed=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return 200, {
+            "id": f"mock-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get('model', 'mock'),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }, {}
+
+    def _misnumber(self, translations: List[Dict], items: List[Dict]) -> None:
+        """就地制造一种编号错误：漏掉一条、改成不存在的 id，或与另一条 id 重复"""
+        with self._rng_lock:
+            mode = self._rng.choice(("drop", "unknown", "duplicate"))
+            pos = self._rng.randrange(len(translations))
+        if mode == "drop":
+            del translations[pos]
+        elif mode == "unknown":
+            translations[pos]['id'] = str(len(items) + 1000)
+        elif len(translations) > 1:
+            translations[pos]['id'] = translations[pos - 1]['id']
+
+
+def main():
+    """单独启动模拟服务，Ctrl+C 退出"""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = MockServer(port=port)
+    print(f"模拟 OpenAI 服务已启动: {server.base_url}（Ctrl+C 退出）")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n已停止，统计: {server.stats.snapshot()}")
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+LLM 调用遥测（JSONL）
+每次 API 调用追加一行 {"type": "call", ...}：排队等待、请求延迟、prompt/completion token、
+缓存命中 token、第几次尝试、有效条目数与估算费用；运行结束追加一行 {"type": "summary", ...}
+（延迟分位数、吞吐量、总费用），用于根据数据调整分批大小与并发。
+
+查看已有遥测文件的汇总:
+    python -m src.llm.telemetry data/telemetry/某次运行.jsonl
+"""
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """线性插值分位数（q 取 0~100，输入须已排序，空列表返回 0）"""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        'p50': round(percentile(values, 50), 3),
+        'p90': round(percentile(values, 90), 3),
+        'p99': round(percentile(values, 99), 3),
+        'max': round(values[-1], 3) if values else 0.0,
+    }
+
+
+def summarize(calls: List[Dict]) -> Dict:
+    """汇总调用记录：次数、重试、token、费用、延迟/排队分位数与吞吐量"""
+    ok = [c for c in calls if c.get('status') != 'error']
+    prompt_tokens = sum(c.get('prompt_tokens', 0) for c in calls)
+    completion_tokens = sum(c.get('completion_tokens', 0) for c in calls)
+    # 吞吐量按墙钟时间（第一次调用开始 ~ 最后一次调用结束）计算
+    wall = 0.0
+    if calls:
+        wall = max(c['end'] for c in calls) - min(c['end'] - c.get('queue_wait', 0) - c.get('latency', 0) for c in calls)
+    return {
+        'calls': len(calls),
+        'errors': len(calls) - len(ok),
+        'retries': sum(1 for c in calls if c.get('attempt', 1) > 1),
+        'items_sent': sum(c.get('items', 0) for c in calls),
+        'items_translated': sum(c.get('valid_items', 0) for c in calls),
+        'prompt_tokens': prompt_tokens,
+        'cache_hit_tokens': sum(c.get('cache_hit_tokens', 0) for c in calls),
+        'completion_tokens': completion_tokens,
+        'cost': round(sum(c.get('cost', 0.0) for c in calls), 6),
+        'latency': _distribution([c['latency'] for c in ok]),
+        'queue_wait': _distribution([c.get('queue_wait', 0.0) for c in calls]),
+        'wall_seconds': round(wall, 3),
+        'tokens_per_sec': round((prompt_tokens + completion_tokens) / wall, 1) if wall > 0 else 0.0,
+        'items_per_sec': round(sum(c.get('valid_items', 0) for c in calls) / wall, 2) if wall > 0 else 0.0,
+    }
+
+
+def format_summary(summary: Dict, currency: str = "元") -> str:
+    """汇总结果的可读文本（多行）"""
+    lat, wait = summary['latency'], summary['queue_wait']
+    return "\n".join([
+        f"API 调用 {summary['calls']} 次（重试 {summary['retries']} 次，失败 {summary['errors']} 次），"
+        f"有效结果 {summary['items_translated']}/{summary['items_sent']} 条次",
+        f"Token: 输入 {summary['prompt_tokens']}（缓存命中 {summary['cache_hit_tokens']}）+ 输出 {summary['completion_tokens']}，"
+        f"估算费用 {summary['cost']:.4f} {currency}",
+        f"请求延迟 p50/p90/p99/max: {lat['p50']:.2f}/{lat['p90']:.2f}/{lat['p99']:.2f}/{lat['max']:.2f} 秒；"
+        f"排队等待 p50/p90/p99: {wait['p50']:.2f}/{wait['p90']:.2f}/{wait['p99']:.2f} 秒",
+        f"吞吐: {summary['tokens_per_sec']:.0f} token/秒，{summary['items_per_sec']:.1f} 条/秒（墙钟 {summary['wall_seconds']:.1f} 秒）",
+    ])
+
+
+class LLMTelemetry:
+    """记录一次运行中的所有 LLM 调用，并写入 JSONL"""
+
+    def __init__(self, path=None, prices: Optional[Dict[str, float]] = None, currency: str = "元"):
+        """
+        Args:
+            path: JSONL 输出路径；None 时只在内存中汇总
+            prices: 每百万 token 单价 {'input': 未命中缓存输入, 'input_cache_hit': 命中缓存输入, 'output': 输出}
+            currency: 单价货币（仅用于显示）
+        """
+        self.path = Path(path) if path else None
+        self.prices = prices or {}
+        self.currency = currency
+        self.calls: List[Dict] = []
+        self._lock = threading.Lock()
+        self._file = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def estimate_cost(self, prompt_tokens: int, completion_tokens: int, cache_hit_tokens: int = 0) -> float:
+        """按单价估算一次调用的费用"""
+        return (
+            (prompt_tokens - cache_hit_tokens) * self.prices.get('input', 0.0)
+            + cache_hit_tokens * self.prices.get('input_cache_hit', self.prices.get('input', 0.0))
+            + completion_tokens * self.prices.get('output', 0.0)
+        ) / 1_000_000
+
+    def record(self, **fields) -> Dict:
+        """
+        记录一次调用。常用字段: file, batch, attempt, items, valid_items, status(ok/partial/error),
+        queue_wait, latency, usage（SDK 返回的 response.usage）, finish_reason, error
+        """
+        usage = fields.pop('usage', None)
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        # DeepSeek 在 usage 中返回 prompt_cache_hit_tokens；OpenAI 兼容服务为 prompt_tokens_details.cached_tokens
+        cache_hit_tokens = getattr(usage, 'prompt_cache_hit_tokens', None)
+        if cache_hit_tokens is None:
+            cache_hit_tokens = getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', 0)
+        cache_hit_tokens = cache_hit_tokens or 0
+
+        event = {
+            'type': 'call',
+            'end': time.time(),
+            **fields,
+            'prompt_tokens': prompt_tokens,
+            'cache_hit_tokens': cache_hit_tokens,
+            'completion_tokens': completion_tokens,
+            'cost': round(self.estimate_cost(prompt_tokens, completion_tokens, cache_hit_tokens), 8),
+        }
+        for key in ('queue_wait', 'latency'):
+            if key in event:
+                event[key] = round(event[key], 4)
+        with self._lock:
+            self.calls.append(event)
+            if self._file:
+                self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+                self._file.flush()
+        return event
+
+    def bind(self, **fields) -> "BoundTelemetry":
+        """返回自动附加固定字段（如 file）的记录器"""
+        return BoundTelemetry(self, fields)
+
+    def summary(self, **filters) -> Dict:
+        """汇总全部调用；filters 按字段精确筛选（如 file=...）"""
+        calls = [c for c in self.calls if all(c.get(k) == v for k, v in filters.items())]
+        return summarize(calls)
+
+    def format_summary(self, **filters) -> str:
+        return format_summary(self.summary(**filters), self.currency)
+
+    def close(self) -> None:
+        """写入整体汇总行并关闭文件"""
+        with self._lock:
+            if self._file:
+                self._file.write(json.dumps({'type': 'summary', **summarize(self.calls)}, ensure_ascii=False) + '\n')
+                self._file.close()
+                self._file = None
+
+
+class BoundTelemetry:
+    """LLMTelemetry.bind 的返回值：record 时合并固定字段"""
+
+    def __init__(self, telemetry: LLMTelemetry, fields: Dict):
+        self.telemetry = telemetry
+        self.fields = fields
+
+    def record(self, **fields) -> Dict:
+        return self.telemetry.record(**{**self.fields, **fields})
+
+
+def load_calls(path) -> List[Dict]:
+    """读取遥测文件中的调用记录（忽略汇总行与损坏行）"""
+    calls = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if event.get('type') == 'call':
+                calls.append(event)
+    return calls
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python -m src.llm.telemetry <遥测文件.jsonl>")
+        sys.exit(1)
+    calls = load_calls(sys.argv[1])
+    print(format_summary(summarize(calls)))
+    by_file = defaultdict(list)
+    for call in calls:
+        by_file[call.get('file', '')].append(call)
+    if len(by_file) > 1:
+        print()
+        for name, file_calls in by_file.items():
+            s = summarize(file_calls)
+            print(f"  {name}: {s['calls']} 次调用，{s['prompt_tokens'] + s['completion_tokens']} token，"
+                  f"{s['cost']:.4f} 元，延迟 p50 {s['latency']['p50']:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
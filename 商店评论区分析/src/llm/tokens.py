@@ -0,0 +1,53 @@
+"""
+Token 计数
+优先使用 tiktoken（可选依赖，BPE 分词结果与 DeepSeek 接近）；未安装或编码文件不可用时，
+按 DeepSeek 官方换算比例分字符类别估算，避免 len(text)//4 对日/韩/泰文严重低估。
+"""
+import logging
+import math
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# 估算时各类字符对应的 token 数（DeepSeek 文档：英文字符≈0.3，中文字符≈0.6）
+_ASCII_TOKENS = 0.3
+_LATIN_EXT_TOKENS = 0.5     # 带重音的拉丁字母（德/法/葡/西/意等）
+_CJK_TOKENS = 0.6           # 中日汉字
+_OTHER_TOKENS = 1.0         # 假名、韩文、泰文、emoji 等，BPE 词表覆盖差，约 1 字符 1 token
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """加载 tiktoken 编码器；不可用时返回 None（只尝试一次）"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:  # 未安装，或首次使用需下载编码文件但网络不可用
+        logger.debug(f"tiktoken 不可用，使用字符类别估算: {e}")
+        return None
+
+
+def _estimate_char_tokens(text: str) -> int:
+    """按字符类别估算 token 数"""
+    total = 0.0
+    for ch in text:
+        code = ord(ch)
+        if code < 0x80:
+            total += _ASCII_TOKENS
+        elif code < 0x0250:
+            total += _LATIN_EXT_TOKENS
+        elif 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+            total += _CJK_TOKENS
+        else:
+            total += _OTHER_TOKENS
+    return math.ceil(total)
+
+
+def count_tokens(text: str) -> int:
+    """文本的 token 数（tiktoken 精确计数，否则估算）"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return _estimate_char_tokens(text)
@@ -0,0 +1,90 @@
+"""
+翻译结果持久化缓存（SQLite）
+键 = sha256(原文) + 模型名 + 提示词版本：同一原文在不同报告间重复出现时直接命中，不再调用 API；
+换模型或改提示词（提升 PROMPT_VERSION）后自动失效。
+"""
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable
+
+# SQLite 单条语句的参数上限（旧版本为 999），批量查询时按此分段
+_QUERY_CHUNK = 500
+
+
+def text_hash(text: str) -> str:
+    """原文内容哈希（UTF-8 编码后的 sha256）"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """按 (原文哈希, 模型, 提示词版本) 存取译文的 SQLite 缓存"""
+
+    def __init__(self, db_path, model: str, prompt_version: str):
+        """
+        Args:
+            db_path: SQLite 文件路径（目录不存在会自动创建）
+            model: 模型名称，如 deepseek-chat
+            prompt_version: 提示词版本号，提示词变更时应同步提升
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.prompt_version = str(prompt_version)
+        self.conn = sqlite3.connect(str(self.db_path))
+        # WAL 模式：多个翻译进程可同时读写同一缓存
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                text_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (text_hash, model, prompt_version)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get_many(self, texts: Iterable[str]) -> Dict[str, str]:
+        """批量查询，返回命中的 {原文: 译文}"""
+        by_hash = {}
+        for text in texts:
+            by_hash.setdefault(text_hash(text), text)
+
+        hashes = list(by_hash)
+        found = {}
+        for start in range(0, len(hashes), _QUERY_CHUNK):
+            chunk = hashes[start:start + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT text_hash, translation FROM translations "
+                f"WHERE model = ? AND prompt_version = ? AND text_hash IN ({placeholders})",
+                [self.model, self.prompt_version, *chunk],
+            )
+            for h, translation in rows:
+                found[by_hash[h]] = translation
+        return found
+
+    def put_many(self, pairs: Dict[str, str]) -> None:
+        """批量写入 {原文: 译文}，已存在的键覆盖"""
+        if not pairs:
+            return
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+            [(text_hash(src), self.model, self.prompt_version, dst, now) for src, dst in pairs.items()],
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
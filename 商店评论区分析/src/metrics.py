@@ -0,0 +1,347 @@
+"""
+阶段级性能指标（JSONL）
+每次运行 scrape / filter / translate / pipeline 等入口时写一个 data/metrics/{入口}_{时间戳}_{编号}.jsonl：
+每个阶段结束追加一行 {"type": "stage", ...}（耗时、计数器、进程峰值内存），运行结束追加一行 {"type": "run", ...}。
+计数器如 pages（采集请求页数）、reviews、retries、cache_hits 由各模块在阶段内调用 count() 累加。
+
+库函数用 @timed("阶段名") 或 with stage("阶段名") 声明阶段，没有活动的 RunMetrics 时全部为空操作，
+因此在测试脚本或被其他模块调用时不会产生文件。当前运行/阶段保存在 contextvars 中，
+asyncio 任务与 asyncio.to_thread 会自动继承。
+
+对比历次运行、找出变慢的阶段:
+    python -m src.metrics                          各入口最近 10 次运行
+    python -m src.metrics --entry scrape --last 30
+    python -m src.metrics --threshold 2            最近一次比此前中位数慢 2 倍以上才提示
+"""
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource  # POSIX
+except ImportError:
+    resource = None
+
+# 项目根目录（src 的上一级）
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+METRICS_DIR = PROJECT_ROOT / "data/metrics"
+
+REGRESSION_THRESHOLD = 1.5  # 最近一次耗时超过此前中位数的倍数
+REGRESSION_MIN_SECONDS = 1.0  # 低于此耗时的阶段不判断回归（避免毫秒级抖动）
+
+# 本模块被 scrape / filter 等入口在启动时导入，只用轻量标准库；argparse / statistics 在报告命令中才导入
+_CO_COROUTINE = 0x80  # async def 函数的 code flag（等价于 inspect.iscoroutinefunction，免去导入 inspect）
+
+_current_run: contextvars.ContextVar = contextvars.ContextVar("metrics_run", default=None)
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("metrics_stage", default=None)
+
+
+def _windows_peak_rss() -> Optional[int]:
+    """Windows 下通过 psapi 读取进程峰值工作集（字节）"""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    handle = ctypes.windll.kernel32.GetCurrentProcess()
+    if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+        return counters.PeakWorkingSetSize
+    return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程启动以来的峰值常驻内存（MB）；无法获取时返回 None"""
+    try:
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux 单位为 KB，macOS 为字节
+            return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+        if sys.platform == "win32":
+            peak = _windows_peak_rss()
+            return round(peak / (1024 * 1024), 1) if peak else None
+    except (OSError, AttributeError, ValueError):
+        pass
+    return None
+
+
+class StageMetrics:
+    """一个阶段的计时、计数器与附加字段"""
+
+    def __init__(self, name: str, parent: Optional["StageMetrics"], fields: Dict):
+        self.name = name
+        self.parent = parent
+        self.fields = dict(fields)
+        self.counters: Dict[str, float] = defaultdict(int)
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+
+class RunMetrics:
+    """一次运行的指标记录；作为上下文管理器使用时在退出时写入汇总行"""
+
+    def __init__(self, entry: str, path=None, **fields):
+        """
+        Args:
+            entry: 入口名（scrape / filter / translate / pipeline ...），报告按入口分组对比
+            path: JSONL 输出路径；默认 data/metrics/{entry}_{时间戳}_{编号}.jsonl
+            fields: 附加到汇总行的字段（如 game）
+        """
+        self.entry = entry
+        self.run_id = os.urandom(6).hex()
+        self.fields = fields
+        self.path = Path(path) if path else METRICS_DIR / f"{entry}_{time.strftime('%Y%m%d_%H%M%S')}_{self.run_id[:4]}.jsonl"
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.counters: Dict[str, float] = defaultdict(int)  # 全部阶段计数器之和
+        self.stage_seconds: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        self._token = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _write(self, event: Dict) -> None:
+        with self._lock:
+            if self._file:
+                self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    @contextmanager
+    def stage(self, name: str, **fields):
+        """记录一个阶段；可嵌套（子阶段记录 parent），阶段内 count() 计入最内层阶段"""
+        parent = _current_stage.get()
+        current = StageMetrics(name, parent, fields)
+        token = _current_stage.set(current)
+        status = "ok"
+        try:
+            yield current
+        except KeyboardInterrupt:
+            status = "interrupted"
+            raise
+        except BaseException as e:
+            status = f"error:{type(e).__name__}"
+            raise
+        finally:
+            _current_stage.reset(token)
+            seconds = time.perf_counter() - current.start
+            counters = dict(current.counters)
+            with self._lock:
+                for key, value in counters.items():
+                    self.counters[key] += value
+                self.stage_seconds[name] += seconds
+            self._write({
+                "type": "stage", "run": self.run_id, "entry": self.entry, "stage": name,
+                "parent": parent.name if parent else None, "status": status,
+                "started_at": current.started_at.isoformat(timespec="seconds"), "seconds": round(seconds, 3),
+                "counters": counters, "peak_rss_mb": peak_rss_mb(), **current.fields,
+            })
+
+    def close(self, status: str = "ok") -> None:
+        """写入汇总行并关闭文件"""
+        seconds = time.perf_counter() - self.start
+        self._write({
+            "type": "run", "run": self.run_id, "entry": self.entry, "status": status,
+            "started_at": self.started_at.isoformat(timespec="seconds"), "seconds": round(seconds, 3),
+            "stages": {k: round(v, 3) for k, v in self.stage_seconds.items()},
+            "counters": dict(self.counters), "peak_rss_mb": peak_rss_mb(), **self.fields,
+        })
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "RunMetrics":
+        self._token = _current_run.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_run.reset(self._token)
+        if exc_type is None or issubclass(exc_type, SystemExit) and not exc.code:
+            status = "ok"
+        elif issubclass(exc_type, KeyboardInterrupt):
+            status = "interrupted"
+        else:
+            status = f"error:{exc_type.__name__}"
+        self.close(status)
+        stages = "，".join(f"{k} {v:.1f}s" for k, v in self.stage_seconds.items())
+        rss = peak_rss_mb()
+        print(f"\n阶段耗时: {stages or '无'}；峰值内存 {rss if rss is not None else '-'} MB（明细: {self.path}）")
+
+
+def current_run() -> Optional[RunMetrics]:
+    return _current_run.get()
+
+
+@contextmanager
+def stage(name: str, **fields):
+    """在当前运行中记录一个阶段；没有活动的运行时为空操作"""
+    run = _current_run.get()
+    if run is None:
+        yield None
+        return
+    with run.stage(name, **fields) as current:
+        yield current
+
+
+def timed(name: str):
+    """装饰器：把整个函数调用记录为一个阶段（支持 async 函数）"""
+    def decorator(func):
+        if func.__code__.co_flags & _CO_COROUTINE:
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, n: float = 1) -> None:
+    """累加当前阶段的计数器（没有阶段时计入运行级；没有运行时忽略）"""
+    current = _current_stage.get()
+    if current is not None:
+        current.count(name, n)
+        return
+    run = _current_run.get()
+    if run is not None:
+        with run._lock:
+            run.counters[name] += n
+
+
+def annotate(**fields) -> None:
+    """为当前阶段附加字段（如 game、file），写入该阶段的记录"""
+    current = _current_stage.get()
+    if current is not None:
+        current.fields.update(fields)
+
+
+# ---------- 历次运行对比 ----------
+
+def load_runs(directory=METRICS_DIR) -> List[Dict]:
+    """读取指标目录下的全部运行；缺少汇总行（崩溃/被强制结束）的按阶段行补全，状态记为 incomplete"""
+    runs = []
+    for path in sorted(Path(directory).glob("*.jsonl")):
+        run, stages = None, []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if event.get("type") == "run":
+                    run = event
+                elif event.get("type") == "stage":
+                    stages.append(event)
+        if run is None:
+            if not stages:
+                continue
+            seconds, counters = defaultdict(float), defaultdict(int)
+            for s in stages:
+                seconds[s["stage"]] += s.get("seconds", 0.0)
+                for key, value in s.get("counters", {}).items():
+                    counters[key] += value
+            run = {
+                "entry": stages[0].get("entry", path.stem.split("_")[0]), "status": "incomplete",
+                "started_at": stages[0].get("started_at", ""), "seconds": None, "stages": dict(seconds),
+                "counters": dict(counters), "peak_rss_mb": max((s.get("peak_rss_mb") or 0) for s in stages) or None,
+            }
+        run["file"] = str(path)
+        runs.append(run)
+    runs.sort(key=lambda r: r.get("started_at", ""))
+    return runs
+
+
+def find_regressions(runs: List[Dict], threshold: float = REGRESSION_THRESHOLD,
+                     min_seconds: float = REGRESSION_MIN_SECONDS) -> List[str]:
+    """最近一次运行中，总耗时 / 各阶段耗时超过此前各次中位数 threshold 倍的项"""
+    import statistics
+    if len(runs) < 2:
+        return []
+    latest, previous = runs[-1], runs[:-1]
+    series = {"(总计)": (latest.get("seconds"), [r.get("seconds") for r in previous])}
+    for name, seconds in latest.get("stages", {}).items():
+        series[name] = (seconds, [r.get("stages", {}).get(name) for r in previous])
+    findings = []
+    for name, (value, history) in series.items():
+        history = [h for h in history if h]
+        if not value or not history or value < min_seconds:
+            continue
+        median = statistics.median(history)
+        if median > 0 and value > threshold * median:
+            findings.append(f"{name}: {value:.1f}s，此前中位数 {median:.1f}s（×{value / median:.1f}）")
+    return findings
+
+
+def _format_counters(counters: Dict, keys=("reviews", "pages", "retries", "api_calls", "cache_hits")) -> str:
+    return " ".join(f"{k}={int(counters[k])}" for k in keys if counters.get(k))
+
+
+def print_report(runs: List[Dict], last: int = 10, threshold: float = REGRESSION_THRESHOLD) -> None:
+    by_entry = defaultdict(list)
+    for run in runs:
+        by_entry[run["entry"]].append(run)
+    for entry, entry_runs in by_entry.items():
+        entry_runs = entry_runs[-last:]
+        stage_names = list(dict.fromkeys(name for r in entry_runs for name in r.get("stages", {})))
+        print(f"\n=== {entry}（最近 {len(entry_runs)} 次）")
+        print("\t".join(["开始时间", "状态", "总耗时(s)", *[f"{n}(s)" for n in stage_names], "峰值(MB)", "计数"]))
+        for r in entry_runs:
+            stages = r.get("stages", {})
+            print("\t".join([
+                r.get("started_at", "").replace("T", " "), r.get("status", ""),
+                f"{r['seconds']:.1f}" if r.get("seconds") is not None else "-",
+                *[f"{stages[n]:.1f}" if n in stages else "-" for n in stage_names],
+                str(r.get("peak_rss_mb") or "-"), _format_counters(r.get("counters", {})),
+            ]))
+        for finding in find_regressions(entry_runs, threshold):
+            print(f"  ⚠ 变慢 {finding}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="对比历次运行的阶段耗时、计数器与峰值内存，提示变慢的阶段")
+    parser.add_argument("--dir", default=str(METRICS_DIR), help="指标目录（默认 data/metrics）")
+    parser.add_argument("--entry", help="只看某个入口（scrape / filter / translate / pipeline ...）")
+    parser.add_argument("--last", type=int, default=10, help="每个入口显示最近 N 次（默认 10）")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"最近一次超过此前中位数多少倍视为变慢（默认 {REGRESSION_THRESHOLD}）")
+    args = parser.parse_args()
+
+    runs = load_runs(args.dir)
+    if args.entry:
+        runs = [r for r in runs if r["entry"] == args.entry]
+    if not runs:
+        print(f"没有找到指标记录（{args.dir}）")
+        return
+    print_report(runs, args.last, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+增量流水线：按游戏执行 scrape → filter → translate
+每个阶段记录输入指纹（上游产物的内容哈希 + 影响结果的配置与版本号），指纹与上次成功时相同且产物仍在则跳过；
+多款游戏并发执行（采集/筛选在线程中运行，翻译共用一个客户端与自适应并发限制器）；
+某阶段失败后重新运行，已完成且输入未变的阶段直接跳过，从失败处继续。
+阶段状态保存在 data/pipeline/{游戏}.json。
+
+filter 一个阶段内完成清洗 → 长度过滤 → 评分 → 输出报告（filter_reviews 在内存中串联，中间结果不落盘）。
+采集的截止日期不早于今天时（默认最近一年），指纹包含当天日期：同一天内重复运行直接跳过，第二天重新采集；
+重新采集的数据与上次完全相同时，后续阶段仍会跳过。
+
+使用方法:
+    python -m src.pipeline "Carnival Tycoon" "Top Tycoon"          指定游戏
+    python -m src.pipeline --all                                  config 中所有配置了 playstore_id 的游戏
+    python -m src.pipeline --all --start 2025-01-01 --end 2025-12-31
+    python -m src.pipeline --all --until filter                   只到筛选（不调用翻译 API）
+    python -m src.pipeline "Cash Club" --resume                   沿用上次的时间范围，从失败的阶段继续
+    python -m src.pipeline "Cash Club" --force filter             忽略指纹强制重跑 filter
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src import metrics
+from src.config import get_config_path, get_game_by_name, get_games_list, get_scraper_config, load_config, normalize_game_stem
+
+# 项目根目录（src 的上一级）；本模块的状态与中文报告目录，以及 scrape / filter 写出的 data/raw、output/reports 均锚定于此
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+STATE_DIR = PROJECT_ROOT / "data/pipeline"
+CHS_REPORTS_DIR = PROJECT_ROOT / "output/reports_chs"
+
+STAGES = ("scrape", "filter", "translate")
+# 阶段实现版本：修改某阶段的处理逻辑（如筛选条数、评分规则）后提升，使旧指纹失效
+STAGE_VERSIONS = {"scrape": "1", "filter": "1", "translate": "1"}
+
+MAX_PARALLEL_GAMES = 3  # 同时进行采集/筛选的游戏数（翻译另由自适应并发限制器控制）
+
+
+class StageError(Exception):
+    """阶段执行失败（无数据、配置缺失等），记录到状态文件后停止该游戏的后续阶段"""
+
+
+def file_sha256(path) -> str:
+    """文件内容哈希"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(*parts) -> str:
+    """阶段输入指纹：各部分 JSON 序列化（键排序）后取哈希"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def state_path(game_name: str) -> Path:
+    return STATE_DIR / f"{normalize_game_stem(game_name)}.json"
+
+
+def load_state(game_name: str) -> Dict:
+    path = state_path(game_name)
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pass  # 状态文件损坏时当作首次运行
+    return {'game': game_name, 'stages': {}}
+
+
+def save_state(state: Dict) -> None:
+    """写临时文件后原子替换，中途崩溃不会留下写了一半的状态"""
+    path = state_path(state['game'])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class SharedTranslator:
+    """各游戏的翻译阶段共用一个客户端、并发限制器与遥测文件；第一次需要翻译时才创建（全部跳过则不需要 API Key）"""
+
+    def __init__(self):
+        self.client = None
+        self.limiter = None
+        self.telemetry = None
+        self._lock = asyncio.Lock()
+
+    async def translate(self, input_file: Path, output_file: Path, label: str) -> int:
+        """翻译一个报告，返回未译出的条数"""
+        from src import translate_reviews
+        async with self._lock:
+            if self.client is None:
+                self.client = translate_reviews.create_client()
+                self.limiter = translate_reviews.create_limiter()
+                self.telemetry = translate_reviews.create_telemetry("pipeline")
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        return await translate_reviews.translate_file_async(input_file, output_file, client=self.client, limiter=self.limiter,
+                                                            label=label, telemetry=self.telemetry)
+
+    async def close(self) -> None:
+        if self.client is None:
+            return
+        await self.client.close()
+        self.telemetry.close()
+        print(f"\n翻译调用统计（明细: {self.telemetry.path}）:")
+        print(self.telemetry.format_summary())
+
+
+class GamePipeline:
+    """单款游戏的阶段执行与状态记录"""
+
+    def __init__(self, game_name: str, start_date: datetime, end_date: datetime, until: str = "translate", force=()):
+        self.game_name = game_name
+        self.start_date = start_date
+        self.end_date = end_date
+        self.stages = STAGES[:STAGES.index(until) + 1]
+        self.force = set(force)
+        self.state = load_state(game_name)
+        self.state['start'] = start_date.strftime('%Y-%m-%d')
+        self.state['end'] = end_date.strftime('%Y-%m-%d')
+        self.results: Dict[str, str] = {}  # 阶段 -> 跳过/完成/失败（本次运行）
+        self._reviews = None  # 本次刚采集的评论，直接交给 filter，无需重新解析 JSON
+
+    # ---------- 各阶段的输入指纹 ----------
+
+    def _scrape_fingerprint(self) -> str:
+        game = get_game_by_name(self.game_name) or {}
+        scraper_config = get_scraper_config(load_config())
+        window_open = self.end_date.date() >= datetime.now().date()
+        return fingerprint(
+            STAGE_VERSIONS['scrape'], game.get('playstore_id'), scraper_config.get('regions'),
+            scraper_config.get('max_reviews_per_game'), self.state['start'], self.state['end'],
+            datetime.now().strftime('%Y-%m-%d') if window_open else None,
+        )
+
+    def _upstream(self, stage: str) -> Dict:
+        return self.state['stages'].get(STAGES[STAGES.index(stage) - 1], {})
+
+    def _filter_fingerprint(self) -> str:
+        upstream = self._upstream('filter')
+        return fingerprint(STAGE_VERSIONS['filter'], self.game_name, upstream.get('outputs'), upstream.get('output_hashes'))
+
+    def _translate_fingerprint(self) -> str:
+        from src.translate_reviews import MODEL_NAME, PROMPT_VERSION
+        upstream = self._upstream('translate')
+        return fingerprint(STAGE_VERSIONS['translate'], MODEL_NAME, PROMPT_VERSION, upstream.get('outputs'), upstream.get('output_hashes'))
+
+    # ---------- 各阶段的执行（返回产物路径列表） ----------
+
+    def _run_scrape(self) -> List[str]:
+        from src import scrape
+        reviews = scrape.scrape_game(self.game_name, self.start_date, self.end_date)
+        if not reviews:
+            raise StageError("没有采集到数据（或游戏配置缺失）")
+        scrape.log_statistics(reviews)
+        raw_path = scrape.save_raw_reviews(reviews, scrape.raw_output_path(self.game_name, self.start_date, self.end_date))
+        self._reviews = reviews
+        return [raw_path]
+
+    def _run_filter(self) -> List[str]:
+        from src import filter as review_filter
+        raw_path = self._upstream('filter')['outputs'][0]
+        reviews = self._reviews
+        if reviews is None:
+            with open(raw_path, 'r', encoding='utf-8') as f:
+                reviews = json.load(f)
+        self._reviews = None
+        return [str(path) for path in review_filter.filter_reviews(reviews, self.game_name, raw_path)]
+
+    async def _run_translate(self, translator: SharedTranslator) -> List[str]:
+        report = Path(self._upstream('translate')['outputs'][0])
+        output_file = CHS_REPORTS_DIR / f"{report.stem}_中文.txt"
+        untranslated = await translator.translate(report, output_file, label=self.game_name)
+        if untranslated:
+            # 译文已写出（缺的保留原文），但不记为完成：重新运行时已译部分走缓存，只重试缺的
+            raise StageError(f"{untranslated} 条评论未译出")
+        return [str(output_file)]
+
+    # ---------- 调度 ----------
+
+    def _is_current(self, stage: str, stage_fingerprint: str) -> bool:
+        record = self.state['stages'].get(stage)
+        return (
+            stage not in self.force
+            and record is not None
+            and record.get('status') == 'done'
+            and record.get('fingerprint') == stage_fingerprint
+            and all(Path(p).exists() for p in record.get('outputs', []))
+        )
+
+    async def run(self, translator: SharedTranslator, slots: asyncio.Semaphore) -> bool:
+        """依次执行各阶段，返回是否全部成功"""
+        for stage in self.stages:
+            stage_fingerprint = getattr(self, f"_{stage}_fingerprint")()
+            if self._is_current(stage, stage_fingerprint):
+                self.results[stage] = "跳过"
+                print(f"[{self.game_name}] {stage}: 输入未变化，跳过")
+                continue
+
+            print(f"[{self.game_name}] {stage}: 开始")
+            started = time.time()
+            try:
+                if stage == "translate":
+                    outputs = await self._run_translate(translator)
+                else:
+                    async with slots:
+                        outputs = await asyncio.to_thread(getattr(self, f"_run_{stage}"))
+            except Exception as e:
+                self.state['stages'][stage] = {
+                    'status': 'failed', 'fingerprint': stage_fingerprint, 'error': f"{type(e).__name__}: {e}",
+                    'finished_at': datetime.now().isoformat(timespec='seconds'),
+                }
+                save_state(self.state)
+                self.results[stage] = "失败"
+                print(f"[{self.game_name}] ✗ {stage} 失败: {e}（重新运行将从此阶段继续）")
+                return False
+
+            self.state['stages'][stage] = {
+                'status': 'done',
+                'fingerprint': stage_fingerprint,
+                'outputs': outputs,
+                'output_hashes': [file_sha256(p) for p in outputs],
+                'seconds': round(time.time() - started, 2),
+                'finished_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            save_state(self.state)
+            self.results[stage] = "完成"
+            print(f"[{self.game_name}] ✓ {stage} 完成（{time.time() - started:.1f} 秒）")
+        return True
+
+
+async def run_pipelines(pipelines: List[GamePipeline], max_parallel: int = MAX_PARALLEL_GAMES) -> int:
+    """并发执行多款游戏的流水线，返回失败的游戏数"""
+    slots = asyncio.Semaphore(max_parallel)
+    translator = SharedTranslator()
+    try:
+        results = await asyncio.gather(*(p.run(translator, slots) for p in pipelines), return_exceptions=True)
+    finally:
+        await translator.close()
+
+    print("\n" + "="*60)
+    print("流水线汇总")
+    print("="*60)
+    failed = 0
+    for pipeline, ok in zip(pipelines, results):
+        if isinstance(ok, BaseException):
+            print(f"  {pipeline.game_name}: 异常 {ok}")
+            failed += 1
+            continue
+        stages = "  ".join(f"{stage}={pipeline.results.get(stage, '未执行')}" for stage in pipeline.stages)
+        print(f"  {pipeline.game_name}: {stages}")
+        failed += 0 if ok else 1
+    return failed
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量执行 scrape → filter → translate，输入未变化的阶段自动跳过")
+    parser.add_argument('games', nargs='*', help="游戏名称（须在 config.yaml 中）")
+    parser.add_argument('--all', action='store_true', help="config 中所有配置了 playstore_id 的游戏")
+    parser.add_argument('--start', help="开始日期 YYYY-MM-DD（默认截止日期前一年）")
+    parser.add_argument('--end', help="结束日期 YYYY-MM-DD（默认今天）")
+    parser.add_argument('--until', default="translate", choices=STAGES, help="执行到哪个阶段为止（默认 translate）")
+    parser.add_argument('--force', action='append', default=[], choices=STAGES, help="忽略指纹强制重跑的阶段，可重复")
+    parser.add_argument('--resume', action='store_true', help="未指定日期时沿用上次运行的时间范围")
+    parser.add_argument('--jobs', type=int, default=MAX_PARALLEL_GAMES, help=f"同时采集/筛选的游戏数（默认 {MAX_PARALLEL_GAMES}）")
+    args = parser.parse_args()
+
+    if not get_config_path().exists():
+        print(f"错误: 配置文件 {get_config_path()} 不存在！")
+        sys.exit(1)
+    games = [g['name'] for g in get_games_list() if g.get('playstore_id')] if args.all else args.games
+    if not games:
+        parser.print_usage()
+        print("请指定游戏名称或使用 --all")
+        sys.exit(1)
+    unknown = [name for name in games if get_game_by_name(name) is None]
+    if unknown:
+        print(f"错误: config.yaml 中没有这些游戏: {', '.join(unknown)}")
+        sys.exit(1)
+
+    # 导入 scrape 以使用其日志配置（scrape.log + 控制台）
+    from src import scrape
+
+    pipelines = []
+    for name in games:
+        try:
+            start, end = _parse_date(args.start), _parse_date(args.end)
+        except ValueError:
+            print("日期格式错误，应为 YYYY-MM-DD，例如: 2025-09-01")
+            sys.exit(1)
+        if args.resume and not (start or end):
+            previous = load_state(name)
+            if previous.get('start') and previous.get('end'):
+                start, end = _parse_date(previous['start']), _parse_date(previous['end'])
+        start, end = scrape.resolve_date_range(start, end)
+        pipelines.append(GamePipeline(name, start, end, until=args.until, force=args.force))
+
+    print(f"流水线: {len(pipelines)} 款游戏，阶段 {' → '.join(pipelines[0].stages)}，并行 {args.jobs}")
+    if os.name == 'nt':
+        try:
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        except:  # noqa: E722
+            pass
+    try:
+        with metrics.RunMetrics("pipeline", games=games, until=args.until):
+            failed = asyncio.run(run_pipelines(pipelines, args.jobs))
+    except KeyboardInterrupt:
+        print("\n用户中断（已完成的阶段已记录，重新运行将从中断处继续）")
+        sys.exit(1)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+评论语言识别（本地、无依赖）
+先按文字系统判断（汉字/假名/韩文/泰文/西里尔/阿拉伯），拉丁字母文本再按各语种高频虚词与特征字母打分。
+覆盖 scrape 采集的地区语言：en/de/fr/ja/ko/pt/es/it/id/th，以及 zh（目标语言，翻译时跳过）。
+filter 写 JSONL 时为每条评论记录 lang 字段，下游直接读取，不再重复识别。
+"""
+import re
+from typing import Dict, Iterable, List
+
+LANG_NONE = "none"      # 没有文字（纯 emoji、数字、标点），无需翻译
+LANG_UNKNOWN = "und"    # 有文字但无法判断具体语种（拉丁字母无特征、纯汉字且无地区线索）
+
+# 语言代码 -> 中文名（翻译提示词中使用）
+LANGUAGE_NAMES: Dict[str, str] = {
+    "en": "英文", "de": "德文", "fr": "法文", "es": "西班牙文", "pt": "葡萄牙文", "it": "意大利文",
+    "id": "印尼文", "ja": "日文", "ko": "韩文", "th": "泰文", "ru": "俄文", "ar": "阿拉伯文", "zh": "中文",
+}
+
+# 纯汉字（无假名）评论按来源地区区分中文/日文；同时接受 config 中地区的 country 代码与 name（filter 记录的是 name）
+_HAN_REGION_LANGS = {
+    "jp": "ja", "日本": "ja",
+    "cn": "zh", "中国": "zh", "tw": "zh", "台湾": "zh", "中国台湾": "zh",
+    "hk": "zh", "香港": "zh", "中国香港": "zh", "mo": "zh", "澳门": "zh", "中国澳门": "zh",
+}
+
+# 各语种的高频虚词/常用评论词（只用两个字母以上的词，避免 a/e/o 等跨语种的单字母词）
+_STOPWORDS = {
+    "en": "the and is it this to of for but not with my you are have was that be so very just can it's don't i'm game fun love great good play",
+    "de": "der die das und ist nicht ich es sehr spiel mit zu auf ein eine aber macht spaß für auch den mir man noch wenn gut toll",
+    "fr": "les et est je pas du un une des très jeu pour mais que qui il c'est avec sur plus trop j'adore jeux vraiment beaucoup",
+    "es": "el los las es que muy juego pero no me por con para una un lo se más mas bueno buen encanta está esta juegos "
+          "mucho sin hay todo tiene cuando porque del al te excelente divertido anuncios publicidad",
+    "pt": "os as é que muito jogo não mas com para um uma eu do da bom mais está gosto você jogar legal",
+    "it": "il lo di che molto gioco non ma con per un una mi del della bello più sono questo tutto giocare",
+    "id": "yang dan ini itu tidak saya game bagus sangat untuk dengan ada bisa aku main karena sudah tapi sekali banget gak nya juga mau "
+          "tak dapat seru asik mantap keren banyak bikin",
+}
+_STOPWORD_SETS = {lang: frozenset(words.split()) for lang, words in _STOPWORDS.items()}
+
+# 具有区分度的字母：出现即给对应语种加分
+_MARKERS = {
+    "de": "äöüß",
+    "fr": "èêëœùûÿ",
+    "es": "ñ¿¡",
+    "pt": "ãõ",
+    "it": "ì",
+}
+
+_WORD_PATTERN = re.compile(r"[a-zà-ÿœß']{2,}")
+
+
+def _script_counts(text: str) -> Dict[str, int]:
+    """统计各文字系统的字符数"""
+    counts = {"han": 0, "kana": 0, "hangul": 0, "thai": 0, "cyrillic": 0, "arabic": 0, "latin": 0}
+    for ch in text:
+        code = ord(ch)
+        if code < 0x80:
+            if ch.isalpha():
+                counts["latin"] += 1
+        elif 0x00C0 <= code <= 0x024F:
+            if ch.isalpha():
+                counts["latin"] += 1
+        elif 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+            counts["han"] += 1
+        elif 0x3040 <= code <= 0x30FF:
+            counts["kana"] += 1
+        elif 0xAC00 <= code <= 0xD7AF or 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F:
+            counts["hangul"] += 1
+        elif 0x0E00 <= code <= 0x0E7F:
+            counts["thai"] += 1
+        elif 0x0400 <= code <= 0x04FF:
+            counts["cyrillic"] += 1
+        elif 0x0600 <= code <= 0x06FF:
+            counts["arabic"] += 1
+    return counts
+
+
+def _detect_latin(text: str) -> str:
+    """拉丁字母文本：按虚词命中数与特征字母打分；最高分并列（如只有 un/non 这类共用词）时视为无法判断"""
+    lowered = text.lower()
+    words = _WORD_PATTERN.findall(lowered)
+    scores = {lang: sum(1 for w in words if w in stopwords) for lang, stopwords in _STOPWORD_SETS.items()}
+    for lang, markers in _MARKERS.items():
+        scores[lang] += 2 * sum(lowered.count(ch) for ch in markers)
+    ranked = sorted(scores.values(), reverse=True)
+    if ranked[0] == 0 or ranked[0] == ranked[1]:
+        return LANG_UNKNOWN
+    return max(scores, key=scores.get)
+
+
+def _detect_han(countries: Iterable[str]) -> str:
+    """无假名的汉字文本：短日文评论（如“最高”“神作”）与中文无法靠字形区分，只在来源地区一致时采用地区语言"""
+    langs = {_HAN_REGION_LANGS.get(str(c).lower()) for c in countries}
+    if len(langs) == 1 and None not in langs:
+        return langs.pop()
+    return LANG_UNKNOWN
+
+
+def detect_language(text: str, countries: Iterable[str] = ()) -> str:
+    """
+    识别评论语言，返回语言代码（en/de/fr/es/pt/it/id/ja/ko/zh/th/ru/ar），
+    无文字返回 LANG_NONE，拉丁字母或纯汉字无法判断返回 LANG_UNKNOWN
+    countries: 评论来源地区（如 ["日本"] 或 ["jp"]），用于区分无假名的中文/日文
+    """
+    if not text:
+        return LANG_NONE
+    counts = _script_counts(text)
+    # 一个汉字/假名/韩文字符的信息量约等于 3 个拉丁字母，夹杂英文游戏名的中文评论仍判为中文
+    weighted = {script: n * (1 if script == "latin" else 3) for script, n in counts.items()}
+    script = max(weighted, key=weighted.get)
+    if weighted[script] == 0:
+        return LANG_NONE
+    if script in ("han", "kana"):
+        # 中文不使用假名，出现假名即判为日文（如“面白い”）
+        return "ja" if counts["kana"] else _detect_han(countries)
+    if script == "latin":
+        return _detect_latin(text)
+    return {"hangul": "ko", "thai": "th", "cyrillic": "ru", "arabic": "ar"}[script]
+
+
+def tag_languages(records: List[Dict]) -> int:
+    """为缺少 lang 字段的评论记录补充语言标签（就地修改），返回新识别的条数"""
+    tagged = 0
+    for record in records:
+        if not record.get('lang'):
+            record['lang'] = detect_language(record.get('content', ''), record.get('countries', ()))
+            tagged += 1
+    return tagged
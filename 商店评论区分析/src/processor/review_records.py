@@ -0,0 +1,92 @@
+"""
+精选评论结构化记录（JSONL）
+filter 在写出 TXT 报告的同时写出同名 .jsonl，每行一条评论记录；
+翻译等下游阶段直接加载 JSONL，无需再正则解析 TXT，并可按 ID 回填结果。
+"""
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 报告头部说明（与 TXT 报告保持一致）
+REPORT_HEADER = """
+---
+
+精选评论列表：
+（来源：该条从哪个/哪些国家商店接口抓取；同语区多国接口常返回相同数据，标“多地区”表示无法区分评论者真实国家）
+
+"""
+
+REVIEW_SEPARATOR = "-" * 80
+
+
+def companion_jsonl_path(report_path) -> Path:
+    """TXT 报告对应的 JSONL 路径（同目录同名，扩展名 .jsonl）"""
+    return Path(report_path).with_suffix('.jsonl')
+
+
+def record_key(record: Dict) -> str:
+    """记录的唯一键：优先 review_id，旧报告没有 ID 时退回评论序号"""
+    return record.get('review_id') or f"#{record['index']}"
+
+
+def format_review_header(record: Dict) -> str:
+    """生成 [评论 N] 元数据行（不含换行）"""
+    details = record.get('details') or {}
+    # 长度分单独统计，不在元数据行展示
+    detail_parts = [f"{key}: {value}" for key, value in details.items() if key != 'length']
+    detail_str = f" | {', '.join(detail_parts)}" if detail_parts else ""
+
+    # 多国接口返回同一条时只表示“从哪些商店抓到的”，无法区分评论者真实国家
+    countries = record.get('countries') or []
+    if len(countries) > 1:
+        country = f"多地区({'、'.join(str(c) for c in countries)})"
+    elif countries:
+        country = countries[0]
+    else:
+        country = ''
+    country_str = f" | 来源: {country}" if country else ""
+
+    return (
+        f"[评论 {record['index']}] 评分: {record.get('rating', 'N/A')}/5 | 综合分: {record.get('score', 'N/A')}"
+        f"{detail_str} | 日期: {record.get('date', 'N/A')}{country_str}"
+    )
+
+
+def render_report_text(records: List[Dict], translations: Optional[Dict[str, str]] = None) -> str:
+    """
+    由评论记录生成 TXT 报告文本
+
+    Args:
+        records: 评论记录列表（已按输出顺序排列）
+        translations: 可选，record_key -> 替换正文（如中文译文）；缺失的保留原文
+    """
+    translations = translations or {}
+    text = REPORT_HEADER
+    for record in records:
+        content = translations.get(record_key(record), record.get('content', ''))
+        text += f"\n{format_review_header(record)}\n"
+        text += f"{content}\n"
+        text += REVIEW_SEPARATOR + "\n"
+
+    text += f"\n\n总计: {len(records)} 条精选评论\n"
+    return text
+
+
+def save_records(records: List[Dict], path) -> None:
+    """将评论记录写为 JSONL（每行一条，UTF-8）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def load_records(path) -> List[Dict]:
+    """读取 JSONL 评论记录，跳过空行"""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
@@ -2,15 +2,18 @@
 通用评论采集脚本
 使用方法: python -m src.scrape <游戏名称> [开始日期] [结束日期]
 示例: python -m src.scrape "TopTycoon" 2025-09-01 2025-12-31
+
+其他模块可直接调用 scrape_game() 在内存中拿到评论（见 interactive/scrape_and_filter.py）。
 """
 import logging
 import json
 import sys
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-from src.scraper.playstore_scraper import PlayStoreScraper
-from src.config import load_config, get_game_by_name, get_scraper_config, get_config_path
+from src import metrics
+from src.config import load_config, get_game_by_name, get_scraper_config, get_config_path, normalize_game_stem
 
 # 配置日志
 logging.basicConfig(
@@ -24,41 +27,54 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# 项目根目录（src 的上一级）；原始评论写入其下的 data/raw，与运行时的工作目录无关
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
-def main():
-    """主函数"""
-    # 解析命令行参数
-    if len(sys.argv) < 2:
-        logger.error("使用方法: python -m src.scrape <游戏名称> [开始日期] [结束日期]")
-        logger.error("示例: python -m src.scrape \"TopTycoon\" 2025-09-01 2025-12-31")
-        logger.error("示例: python -m src.scrape \"Sunday City: Life RolePlay\"")
-        return
-    
-    game_name = sys.argv[1]
-    
-    # 解析日期参数（可选）
-    start_date = None
-    end_date = None
-    if len(sys.argv) >= 3:
-        try:
-            start_date = datetime.strptime(sys.argv[2], '%Y-%m-%d')
-        except ValueError:
-            logger.error(f"开始日期格式错误，应为 YYYY-MM-DD，例如: 2025-09-01")
-            return
-    
-    if len(sys.argv) >= 4:
-        try:
-            end_date = datetime.strptime(sys.argv[3], '%Y-%m-%d')
-        except ValueError:
-            logger.error(f"结束日期格式错误，应为 YYYY-MM-DD，例如: 2025-12-31")
-            return
-    
-    # 默认时间范围：最近一年
+
+def resolve_date_range(start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """补全时间范围：默认截止到今天，开始日期默认为截止日期前一年"""
     if not end_date:
         end_date = datetime.now()
     if not start_date:
         start_date = datetime(end_date.year - 1, end_date.month, end_date.day)
+    return start_date, end_date
+
+
+def raw_output_path(game_name: str, start_date: datetime, end_date: datetime, early: bool = False) -> str:
+    """原始评论文件路径（全球统一一个文件），filter 从文件名中提取时间范围"""
+    # 保存数据（处理游戏名称中的特殊字符）
+    game_name_safe = normalize_game_stem(game_name)
+    
+    if start_date.year == end_date.year and start_date.month == end_date.month:
+        date_str = start_date.strftime('%Y%m')
+    else:
+        date_str = f"{start_date.strftime('%Y%m')}-{end_date.strftime('%Y%m')}"
     
+    filename_suffix = ""
+    if early or (start_date.year == 2024 and start_date.month == 1 and end_date.month == 11):
+        filename_suffix = "_early"
+    
+    return str(PROJECT_ROOT / "data/raw" / f"{game_name_safe}_android_全球{filename_suffix}_{date_str}.json")
+
+
+@metrics.timed("save_raw")
+def save_raw_reviews(reviews: List[Dict], output_path: str) -> str:
+    """保存原始评论 JSON（data/raw 下原始评论文件的唯一写入处，filter 按此格式读取），返回路径"""
+    output_file = Path(output_path)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(reviews, f, ensure_ascii=False, indent=2)
+    logger.info(f"评论已保存到: {output_file}")
+    return output_path
+
+
+@metrics.timed("scrape")
+def scrape_game(game_name: str, start_date: datetime, end_date: datetime) -> Optional[List[Dict]]:
+    """
+    采集单款游戏在各地区的评论，按 review_id 去重合并来源国家。
+    只在内存中返回评论列表，不写文件；配置缺失或没有采集到数据时返回 None。
+    """
+    metrics.annotate(game=game_name)
     logger.info("="*60)
     logger.info(f"开始采集: {game_name}")
     logger.info("="*60)
@@ -66,10 +82,10 @@ def main():
     # 加载配置
     if not get_config_path().exists():
         logger.error(f"配置文件 {get_config_path()} 不存在！")
-        return
+        return None
     
     config = load_config()
-    game_config = get_game_by_name(game_name, config)
+    game_config = get_game_by_name(game_name)
     
     if not game_config:
         logger.error(f"未找到游戏 '{game_name}' 的配置！")
@@ -77,14 +93,14 @@ def main():
         logger.info("可用游戏列表:")
         for game in config.get('games', []):
             logger.info(f"  - {game['name']}")
-        return
+        return None
     
     app_id = game_config.get('playstore_id', '')
     
     if not app_id:
         logger.error(f"{game_name} 的 Google Play ID 未配置！")
         logger.info("请在 config.yaml 中填写 playstore_id")
-        return
+        return None
     
     logger.info(f"✓ 找到配置：{game_name}")
     logger.info(f"  Google Play ID: {app_id}")
@@ -97,11 +113,13 @@ def main():
     scraper_config = get_scraper_config(config)
     regions = scraper_config.get('regions', [{'lang': 'en', 'country': 'us', 'name': '美国'}])
     logger.info(f"地区数: {len(regions)}（全球多地区）")
+    metrics.count("regions", len(regions))
     for r in regions:
         logger.info(f"  - {r['name']} ({r['lang']}, {r['country']})")
     logger.info("")
     
-    # 创建采集器
+    # 创建采集器（google-play-scraper / requests 到这里才导入，配置错误时不必加载）
+    from src.scraper.playstore_scraper import PlayStoreScraper
     scraper = PlayStoreScraper(
         delay=scraper_config['delay_between_requests'],
         retry_times=scraper_config['retry_times']
@@ -161,37 +179,67 @@ def main():
     
     if not reviews:
         logger.error("没有采集到任何数据！")
-        return
+        return None
     
     logger.info(f"\n✓ 全球采集完成！共获取 {len(reviews)} 条评论（已按 review_id 去重）")
+    metrics.count("reviews", len(reviews))
+    return reviews
+
+
+def log_statistics(reviews: List[Dict]) -> None:
+    """输出评分统计"""
+    ratings = [r.get('rating', 0) for r in reviews if r.get('rating')]
+    if ratings:
+        avg_rating = sum(ratings) / len(ratings)
+        logger.info(f"\n统计信息:")
+        logger.info(f"  平均评分: {avg_rating:.2f}")
+        rating_dist = {}
+        for r in set(ratings):
+            rating_dist[int(r)] = ratings.count(r)
+        logger.info(f"  评分分布: {rating_dist}")
+
+
+def main():
+    """主函数"""
+    # 解析命令行参数
+    if len(sys.argv) < 2:
+        logger.error("使用方法: python -m src.scrape <游戏名称> [开始日期] [结束日期]")
+        logger.error("示例: python -m src.scrape \"TopTycoon\" 2025-09-01 2025-12-31")
+        logger.error("示例: python -m src.scrape \"Sunday City: Life RolePlay\"")
+        return
     
-    # 保存数据（处理游戏名称中的特殊字符）
-    game_name_safe = game_name.replace(' ', '_').replace(':', '_').replace('&', '_')
+    game_name = sys.argv[1]
     
-    # 生成文件名（全球统一一个文件）
-    if start_date.year == end_date.year and start_date.month == end_date.month:
-        date_str = start_date.strftime('%Y%m')
-    else:
-        date_str = f"{start_date.strftime('%Y%m')}-{end_date.strftime('%Y%m')}"
+    # 解析日期参数（可选）
+    start_date = None
+    end_date = None
+    if len(sys.argv) >= 3:
+        try:
+            start_date = datetime.strptime(sys.argv[2], '%Y-%m-%d')
+        except ValueError:
+            logger.error(f"开始日期格式错误，应为 YYYY-MM-DD，例如: 2025-09-01")
+            return
     
-    filename_suffix = ""
-    if "early" in sys.argv or (start_date.year == 2024 and start_date.month == 1 and end_date.month == 11):
-        filename_suffix = "_early"
+    if len(sys.argv) >= 4:
+        try:
+            end_date = datetime.strptime(sys.argv[3], '%Y-%m-%d')
+        except ValueError:
+            logger.error(f"结束日期格式错误，应为 YYYY-MM-DD，例如: 2025-12-31")
+            return
     
-    output_path = f"data/raw/{game_name_safe}_android_全球{filename_suffix}_{date_str}.json"
-    scraper.save_reviews(reviews, output_path)
+    # 默认时间范围：最近一年
+    start_date, end_date = resolve_date_range(start_date, end_date)
+    
+    with metrics.RunMetrics("scrape", game=game_name):
+        reviews = scrape_game(game_name, start_date, end_date)
+        if not reviews:
+            return
+        
+        output_path = raw_output_path(game_name, start_date, end_date, early="early" in sys.argv)
+        save_raw_reviews(reviews, output_path)
     
     # 统计信息
-    if reviews:
-        ratings = [r.get('rating', 0) for r in reviews if r.get('rating')]
-        if ratings:
-            avg_rating = sum(ratings) / len(ratings)
-            logger.info(f"\n统计信息:")
-            logger.info(f"  平均评分: {avg_rating:.2f}")
-            rating_dist = {}
-            for r in set(ratings):
-                rating_dist[int(r)] = ratings.count(r)
-            logger.info(f"  评分分布: {rating_dist}")
+    log_statistics(reviews)
     
     logger.info("\n" + "="*60)
     logger.info("采集完成！")
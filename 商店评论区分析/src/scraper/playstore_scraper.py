@@ -1,15 +1,14 @@
 """
 Google Play Store 评论采集模块
 """
-import json
 import time
 import logging
 import urllib.parse
 import re
-import requests
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-from pathlib import Path
+
+from src import metrics
 
 try:
     from google_play_scraper import app, reviews, Sort, search
@@ -58,6 +57,7 @@ class PlayStoreScraper:
         返回找到的App ID列表
         """
         try:
+            import requests  # 只有官方搜索失败时才用到
             encoded_query = urllib.parse.quote(query)
             url = f"https://play.google.com/store/search?q={encoded_query}&c=apps&hl=en&gl=us"
             
@@ -295,6 +295,7 @@ class PlayStoreScraper:
                         count=200,  # 每次最多200条
                         continuation_token=continuation_token
                     )
+                    metrics.count("pages")
                     
                     if not result:
                         break
@@ -364,12 +365,14 @@ class PlayStoreScraper:
                     # 延迟避免请求过快
                     logger.info(f"等待 {self.delay} 秒后继续...")
                     time.sleep(self.delay)
+                    metrics.count("sleep_seconds", self.delay)
                     
                 except Exception as e:
                     logger.error(f"采集批次时出错: {str(e)}")
                     # 重试
                     for i in range(self.retry_times - 1):
                         try:
+                            metrics.count("retries")
                             time.sleep(self.delay * (i + 1))
                             result, continuation_token = reviews(
                                 app_id,
@@ -396,16 +399,6 @@ class PlayStoreScraper:
             logger.error(f"采集 {app_name} Google Play 评论时出错: {str(e)}")
         
         return all_reviews
-    
-    def save_reviews(self, reviews: List[Dict], output_path: str):
-        """保存评论到文件"""
-        output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(reviews, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"评论已保存到: {output_file}")
 
 
 if __name__ == "__main__":
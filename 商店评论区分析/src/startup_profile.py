@@ -0,0 +1,121 @@
+"""
+入口启动耗时分析：对每个命令行入口运行 `python -X importtime -c "import 模块"`，
+汇总模块导入耗时、进程总耗时，以及导入阶段就已加载的重依赖（pandas / openai 等）。
+重依赖应在首次使用时才导入，交互菜单与短命令不应为用不到的库付出启动时间。
+
+使用方法:
+    python -m src.startup_profile                         分析全部入口
+    python -m src.startup_profile src.filter --top 15     只分析指定入口，并列出最慢的 15 个模块
+    python -m src.startup_profile --runs 5                每个入口取 5 次中的最小值
+"""
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# 项目根目录（src 的上一级），子进程在此目录下运行
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = [
+    "src.interactive.input",
+    "src.interactive.scrape_and_filter",
+    "src.scrape",
+    "src.filter",
+    "src.translate_reviews",
+    "src.analyze_reviews",
+    "src.pipeline",
+    "src.bench_translate",
+    "src.llm.telemetry",
+    "src.metrics",
+]
+
+# 导入阶段出现即说明没有延迟加载的第三方库
+HEAVY_MODULES = ("pandas", "numpy", "openai", "httpx", "google_play_scraper", "requests", "yaml", "dotenv", "tiktoken")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """解析 -X importtime 输出，返回 [(模块, 嵌套层级, 自身微秒, 累计微秒)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头行
+        raw_name = parts[2][1:]  # '|' 后固定一个空格，其后每层缩进两个空格
+        depth = (len(raw_name) - len(raw_name.lstrip(" "))) // 2
+        rows.append((raw_name.strip(), depth, int(parts[0]), int(parts[1])))
+    return rows
+
+
+def profile_entry(module: str, runs: int = 3) -> Dict:
+    """多次冷启动导入 module，取进程总耗时最短的一次"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, encoding="utf-8", errors="replace",
+        )
+        wall = time.perf_counter() - start
+        rows = parse_importtime(proc.stderr)
+        result = {
+            'module': module,
+            'ok': proc.returncode == 0,
+            'error': proc.stderr.strip().splitlines()[-1] if proc.returncode != 0 and proc.stderr.strip() else "",
+            'wall_ms': wall * 1000,
+            'import_ms': next((cum for name, _, _, cum in rows if name == module), 0) / 1000,
+            'heavy': sorted({name for name, _, _, _ in rows if name in HEAVY_MODULES}),
+            'rows': rows,
+        }
+        if best is None or result['wall_ms'] < best['wall_ms']:
+            best = result
+    return best
+
+
+def slowest_modules(rows: List[Tuple[str, int, int, int]], top: int, entry: str = "") -> List[Tuple[str, int]]:
+    """按累计耗时列出最慢的顶层包 / 项目模块（子模块计入所属顶层包，不重复列出；不含入口自身）"""
+    firsts = {}
+    for name, depth, _, cumulative in rows:
+        root = name.split(".")[0]
+        key = name if root == "src" else root
+        if key == name and name != entry and (key not in firsts or firsts[key][0] > depth):
+            firsts[key] = (depth, cumulative)
+    ranked = sorted(((name, cum) for name, (_, cum) in firsts.items()), key=lambda item: item[1], reverse=True)
+    return ranked[:top]
+
+
+def print_results(results: List[Dict], top: int) -> None:
+    print("\t".join(["入口", "导入(ms)", "进程总耗时(ms)", "已加载的重依赖"]))
+    for r in results:
+        if not r['ok']:
+            print("\t".join([r['module'], "-", f"{r['wall_ms']:.0f}", f"导入失败: {r['error']}"]))
+            continue
+        print("\t".join([r['module'], f"{r['import_ms']:.1f}", f"{r['wall_ms']:.0f}", ", ".join(r['heavy']) or "无"]))
+    if top:
+        for r in results:
+            if not r['ok']:
+                continue
+            print(f"\n{r['module']} 最慢的 {top} 个模块（累计 ms）:")
+            for name, cumulative in slowest_modules(r['rows'], top, r['module']):
+                print(f"  {cumulative / 1000:8.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用 -X importtime 测量各入口的启动耗时")
+    parser.add_argument('modules', nargs='*', help="要分析的模块（默认全部入口）")
+    parser.add_argument('--runs', type=int, default=3, help="每个入口冷启动次数，取最快一次（默认 3）")
+    parser.add_argument('--top', type=int, default=0, help="列出每个入口最慢的 N 个模块")
+    args = parser.parse_args()
+
+    # 解释器自身的启动开销，作为对照
+    baseline = profile_entry("sys", args.runs)
+    print(f"空解释器启动: {baseline['wall_ms']:.0f} ms\n")
+    results = [profile_entry(module, args.runs) for module in (args.modules or ENTRY_POINTS)]
+    print_results(results, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,347 +7,567 @@
 
 import os
 import re
+import sys
+import json
+import time
+import hashlib
 import asyncio
 from pathlib import Path
-from openai import AsyncOpenAI
-from typing import List, Tuple
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 
-load_dotenv()
+from src.processor.review_records import companion_jsonl_path, load_records, record_key, render_report_text, save_records
+from src.processor.language_id import LANG_NONE, LANG_UNKNOWN, LANGUAGE_NAMES, tag_languages
+from src.llm.translation_cache import TranslationCache
+from src.llm.tokens import count_tokens
+from src.llm.concurrency import AdaptiveLimiter
+from src.llm.checkpoint import BatchCheckpoint
+from src.llm.dedup import dedupe_reviews, fan_out
+from src.llm.telemetry import LLMTelemetry
+from src import metrics
+
+# openai 导入约 0.5 秒，只在真正创建客户端时加载（列出/选择文件时不需要）
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 # API配置
-DEEPSEEK_API_KEY = os.environ.get('DEEPSEEK_API_KEY')
+MODEL_NAME = "deepseek-chat"
+
+# 项目根目录（src 的上一级）
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
 # 翻译配置
-MAX_TOKENS_PER_REQUEST = 25000  # 每次请求的最大token数（保守估计，留出安全余量）
-TARGET_TOKENS_PER_BATCH = 5000  # 目标token数（降低以创建更多批次，提高并发）
-MAX_CONCURRENT = 10  # 最大并发数（建议5-10个并发）
+TARGET_TOKENS_PER_BATCH = 3000  # 每批原文token预算（译文长度相近，需小于 MAX_OUTPUT_TOKENS）
+ITEM_OVERHEAD_TOKENS = 12  # 每条评论的 JSON 包装（id/text 字段）额外token数
+INITIAL_CONCURRENT = 8  # 初始并发数（运行中根据延迟与错误率自适应调整）
+MAX_CONCURRENT = 64  # 自适应并发上限
+LATENCY_TARGET = 90  # 单次请求健康延迟（秒），超过则不再提升并发
 MAX_RETRIES = 3  # 最大重试次数
 RETRY_DELAY = 2  # 重试延迟（秒）
+MAX_OUTPUT_TOKENS = 8192  # 单次响应的最大输出token数（deepseek-chat 上限）
 
+# 翻译缓存配置
+PROMPT_VERSION = "3"  # 提示词版本（修改翻译提示词后需提升，使旧缓存失效）
+CACHE_DB_PATH = PROJECT_ROOT / "data/cache/translation_cache.sqlite3"
+CHECKPOINT_DIR = PROJECT_ROOT / "data/cache/checkpoints"  # 断点文件目录（翻译完成后自动删除）
 
-def estimate_tokens(text: str) -> int:
-    """
-    估算文本的token数量
-    英文：1 token ≈ 4个字符
-    这里使用保守估算
-    """
-    return len(text) // 4
+# 遥测配置：每次 API 调用的延迟、token、费用写入 JSONL，运行结束打印汇总
+TELEMETRY_DIR = PROJECT_ROOT / "data/telemetry"
+# deepseek-chat 单价（元/百万 token，按官方价目表，调价时同步修改）
+PRICE_INPUT = 2.0  # 输入（未命中缓存）
+PRICE_INPUT_CACHE_HIT = 0.2  # 输入（命中缓存）
+PRICE_OUTPUT = 3.0  # 输出
+
+# 语言路由：已是中文或没有文字（纯 emoji/数字）的评论不翻译；其余按源语言分批，提示词写明源语言
+SKIP_LANGUAGES = {"zh", LANG_NONE}
+MIN_LANGUAGE_BATCH = 5  # 某语言评论少于该数时并入混合语言批次，避免产生大量小批次
+
+# 去重配置：原文相同的评论只翻译一次
+DEDUP_IGNORE_WHITESPACE = True  # 忽略空白差异（首尾空格、连续空格、换行）
+DEDUP_IGNORE_CASE = False  # 忽略大小写（全大写往往带情绪，默认区分）
 
 
 def create_batches(reviews: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
     """
-    根据token数量动态创建批次
-    优化策略：优先用满并发，创建足够多的批次，单批次内容量较小以提高响应速度
+    按真实 token 数分批：每批输入不超过 TARGET_TOKENS_PER_BATCH（译文与原文长度相近，同时保证输出不超限）
+    批次数随输入规模变化，并发度由 AdaptiveLimiter 在运行时决定
     """
-    if not reviews:
-        return []
-    
-    # 系统提示和用户提示的基础token数（估算）
-    base_tokens = 200
-    
-    # 计算总token数和总评论数
-    total_tokens = sum(estimate_tokens(review[1]) for review in reviews)
-    total_reviews = len(reviews)
-    
-    # 优先用满并发：固定创建MAX_CONCURRENT个批次
-    target_batch_count = MAX_CONCURRENT
-    
-    # 计算理想的单批次token数（确保能创建10个批次）
-    ideal_batch_tokens = max(2000, total_tokens // target_batch_count)
-    ideal_batch_tokens = min(ideal_batch_tokens, TARGET_TOKENS_PER_BATCH)
-    
     batches = []
     current_batch = []
     current_tokens = 0
     
     for review in reviews:
-        metadata, content = review
-        content_tokens = estimate_tokens(content)
-        
-        # 检查是否超过硬限制
-        if current_tokens + content_tokens + base_tokens > MAX_TOKENS_PER_REQUEST:
-            if current_batch:
-                batches.append(current_batch)
-                current_batch = []
-                current_tokens = 0
+        item_tokens = count_tokens(review[1]) + ITEM_OVERHEAD_TOKENS
         
-        # 优先策略：达到理想批次大小就创建新批次（用满并发）
-        # 如果当前批次已经有内容，且加上这条会超过理想大小，就创建新批次
-        if current_batch and current_tokens + content_tokens + base_tokens > ideal_batch_tokens:
+        # 当前批次已有内容且放不下这条时，另起一批（单条超长评论独占一批）
+        if current_batch and current_tokens + item_tokens > TARGET_TOKENS_PER_BATCH:
             batches.append(current_batch)
             current_batch = []
             current_tokens = 0
         
         current_batch.append(review)
-        current_tokens += content_tokens
+        current_tokens += item_tokens
     
     # 添加最后一批
     if current_batch:
         batches.append(current_batch)
     
-    # 如果创建的批次不是10个，强制重新分配为正好10个批次
-    if len(batches) != MAX_CONCURRENT and total_reviews >= MAX_CONCURRENT:
-        # 重新分配，确保正好有MAX_CONCURRENT个批次
-        reviews_per_batch = total_reviews // MAX_CONCURRENT
-        remainder = total_reviews % MAX_CONCURRENT
-        batches = []
-        start_idx = 0
-        for i in range(MAX_CONCURRENT):
-            # 前remainder个批次多分配1条评论
-            batch_size = reviews_per_batch + (1 if i < remainder else 0)
-            batch = reviews[start_idx:start_idx + batch_size]
-            if batch:
-                batches.append(batch)
-            start_idx += batch_size
-    
     return batches
 
 
-def parse_review_file(file_path):
+def create_language_batches(reviews: List[Tuple[str, str]], languages: Dict[str, str]) -> List[Tuple[str, List[Tuple[str, str]]]]:
     """
-    解析评论文件，提取评论内容
-    返回格式: [(metadata_line, review_content), ...]
+    先按源语言分组再按 token 分批，同一批次只含一种语言（提示词中写明源语言）
+    languages: 记录键 -> 语言代码；评论数少于 MIN_LANGUAGE_BATCH 的语言并入混合批次（LANG_UNKNOWN）
+    返回 [(语言代码, 批次), ...]
     """
-    reviews = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
+    groups: Dict[str, List[Tuple[str, str]]] = {}
+    for review in reviews:
+        groups.setdefault(languages.get(review[0], LANG_UNKNOWN), []).append(review)
+    for lang in [lang for lang, group in groups.items() if len(group) < MIN_LANGUAGE_BATCH and lang != LANG_UNKNOWN]:
+        groups.setdefault(LANG_UNKNOWN, []).extend(groups.pop(lang))
+    return [(lang, batch) for lang, group in groups.items() for batch in create_batches(group)]
+
+
+def parse_review_lines(lines: List[str]) -> List[Dict]:
+    """
+    从旧版 TXT 报告的行中解析评论（无 JSONL 时的兼容路径）
+    返回记录列表: [{'index', 'header', 'content', 'line_no'}, ...]，line_no 为正文所在行号
+    """
+    records = []
     i = 0
     while i < len(lines):
         line = lines[i].strip()
         
         # 检查是否是评论元数据行
-        if re.match(r'\[评论 \d+\]', line):
-            metadata = line
+        match = re.match(r'\[评论 (\d+)\]', line)
+        if match:
             i += 1
             
             # 下一行应该是评论内容
             if i < len(lines) and lines[i].strip() and not lines[i].startswith('---'):
-                review_content = lines[i].strip()
-                reviews.append((metadata, review_content))
-                i += 1
-            else:
-                i += 1
+                records.append({
+                    'index': int(match.group(1)),
+                    'header': line,
+                    'content': lines[i].strip(),
+                    'line_no': i,
+                })
+            i += 1
         else:
             i += 1
     
-    return reviews
+    return records
 
 
-async def translate_text_batch(client: AsyncOpenAI, texts: List[str], batch_num: int = 1, semaphore: asyncio.Semaphore = None) -> List[str]:
+def parse_review_file(file_path):
     """
-    异步批量翻译文本列表（支持并发和重试）
-    client: OpenAI异步客户端
-    texts: 要翻译的文本列表
-    semaphore: 并发控制信号量
+    解析评论文件，提取评论内容
+    返回格式: [(metadata_line, review_content), ...]
     """
-    if not texts:
-        return []
-    
-    # 构建翻译提示
-    texts_list = []
-    for i, text in enumerate(texts, 1):
-        texts_list.append(f"{i}. {text}")
-    
-    texts_str = "\n\n".join(texts_list)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    return [(r['header'], r['content']) for r in parse_review_lines(lines)]
+
+
+def load_review_records(input_file) -> Tuple[List[Dict], Optional[List[str]]]:
+    """
+    加载待翻译评论：优先读 filter 写出的同名 JSONL；没有时退回解析 TXT
+    返回 (记录列表, TXT 原始行)；走 JSONL 时原始行为 None，输出由记录重新生成
+    """
+    jsonl_file = companion_jsonl_path(input_file)
+    if jsonl_file.exists():
+        return load_records(jsonl_file), None
     
-    prompt = f"""请将以下{len(texts)}条英文游戏评论逐条翻译成中文。要求：
+    with open(input_file, 'r', encoding='utf-8') as f:
+        original_lines = f.readlines()
+    return parse_review_lines(original_lines), original_lines
+
+
+SYSTEM_PROMPT_TEMPLATE = "你是一个专业的游戏评论翻译助手，擅长将{source}游戏评论准确翻译成中文。请严格按照要求的 JSON 格式返回翻译结果。"
+
+# 截断响应时逐条抢救已完整返回的 {"id": ..., "text": ...} 项
+_ITEM_PATTERN = re.compile(r'\{\s*"id"\s*:\s*"?([^",}\s]+)"?\s*,\s*"text"\s*:\s*("(?:[^"\\]|\\.)*")\s*\}')
+
+
+def _source_name(source_lang: str) -> str:
+    """提示词中的源语言名称；无法判断或混合语言时为“外文”"""
+    return LANGUAGE_NAMES.get(source_lang, "外文")
+
+
+def build_system_prompt(source_lang: str = "en") -> str:
+    return SYSTEM_PROMPT_TEMPLATE.format(source=_source_name(source_lang))
+
+
+def build_translation_prompt(items: List[Tuple[str, str]], source_lang: str = "en") -> str:
+    """
+    构建 ID 标记的翻译提示词
+    items: [(id, 原文), ...]，译文需按 id 原样返回
+    source_lang: 本批评论的源语言代码（LANG_UNKNOWN 表示混合或无法判断）
+    """
+    payload = json.dumps([{"id": item_id, "text": text} for item_id, text in items], ensure_ascii=False, indent=0)
+    source = _source_name(source_lang)
+    mixed_note = "（可能包含多种语言）" if source_lang not in LANGUAGE_NAMES else ""
+    return f"""请将以下{len(items)}条{source}游戏评论{mixed_note}逐条翻译成中文。要求：
 1. 保持原文的语气和风格
 2. 准确翻译，不要遗漏信息
 3. 游戏术语保持原样或使用常见中文译名
-4. 只返回翻译结果，每条一行，按顺序排列，不要添加编号或其他标记
+4. 以 JSON 对象返回，格式为 {{"translations": [{{"id": "原 id", "text": "中文译文"}}, ...]}}，每个 id 恰好出现一次，不要合并或拆分评论，不要添加其他内容
+
+{source}评论（JSON 数组）：
+{payload}"""
+
+
+def parse_translation_response(content: str, expected_ids) -> Dict[str, str]:
+    """
+    解析并逐条校验模型返回的 JSON 译文
+    只保留 id 属于本次请求、text 为非空字符串的项；同一 id 出现多次时无法判断哪条对应原文，整体丢弃（补发）；
+    整体 JSON 无法解析（如输出被截断）时逐项抢救
+    返回 {id: 译文}
+    """
+    expected_ids = set(expected_ids)
+    content = content.strip()
+    # 兼容 ```json ... ``` 包裹
+    if content.startswith('```'):
+        content = re.sub(r'^```(?:json)?\s*|\s*```$', '', content)
+
+    try:
+        data = json.loads(content)
+        items = data.get('translations', []) if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            items = []
+    except json.JSONDecodeError:
+        items = []
+        for match in _ITEM_PATTERN.finditer(content):
+            try:
+                items.append({"id": match.group(1), "text": json.loads(match.group(2))})
+            except json.JSONDecodeError:
+                continue
 
-英文评论：
-{texts_str}
+    results = {}
+    duplicated = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        item_id = str(item.get('id', '')).strip()
+        text = item.get('text')
+        if item_id in expected_ids and isinstance(text, str) and text.strip():
+            if item_id in results:
+                duplicated.add(item_id)
+            # 译文写回 TXT 时每条占一行
+            results[item_id] = ' '.join(text.split())
+    for item_id in duplicated:
+        del results[item_id]
+    return results
 
-请直接返回{len(texts)}行中文翻译，每行一条："""
+
+async def _request_translation(client: "AsyncOpenAI", prompt: str, limiter: AdaptiveLimiter = None, timing: Dict = None,
+                               system_prompt: Optional[str] = None):
+    """
+    发送一次翻译请求（有限制器时占用一个并发槽位，并把延迟/错误反馈给限制器）
+    timing: 可选，写入 queue_wait（等待并发槽位/限流暂停的秒数）与 latency（请求耗时，失败时为出错前耗时）
+    system_prompt: 系统提示词，缺省为英文源语言的 build_system_prompt()
+    """
+    timing = {} if timing is None else timing
+    system_prompt = build_system_prompt() if system_prompt is None else system_prompt
+    async def _create():
+        return await client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=MAX_OUTPUT_TOKENS,
+            response_format={"type": "json_object"},
+            stream=False
+        )
+
+    queued = time.monotonic()
+    if limiter is not None:
+        await limiter.acquire()
+    start = time.monotonic()
+    timing['queue_wait'] = start - queued
+    try:
+        response = await _create()
+        timing['latency'] = time.monotonic() - start
+        if limiter is not None:
+            limiter.on_success(timing['latency'])
+        return response
+    except Exception as e:
+        timing['latency'] = time.monotonic() - start
+        if limiter is not None:
+            limiter.on_error(e)
+        raise
+    finally:
+        if limiter is not None:
+            await limiter.release()
+
+
+async def translate_text_batch(client: "AsyncOpenAI", texts: List[str], batch_num: Union[int, str] = 1, limiter: AdaptiveLimiter = None,
+                               telemetry=None, source_lang: str = "en") -> List[Optional[str]]:
+    """
+    异步批量翻译文本列表（支持并发和重试）
+    client: OpenAI异步客户端
+    texts: 要翻译的文本列表
+    limiter: 自适应并发限制器
+    telemetry: 可选，LLMTelemetry（或 bind 后的记录器），每次调用记录一行遥测
+    source_lang: 源语言代码，决定提示词中的源语言
+    返回与 texts 等长的译文列表；每条按 ID 校验，缺失或格式不符的条目单独组成更小的批次补发，
+    重试耗尽仍未译出的条目为 None（由调用方回退原文）
+    """
+    results: List[Optional[str]] = [None] * len(texts)
+    if not texts:
+        return results
+    
+    # 本批次内的 ID 为从 1 开始的序号
+    pending = list(range(len(texts)))
     
-    # 重试机制
     for attempt in range(MAX_RETRIES):
+        items = [(str(i + 1), texts[i]) for i in pending]
+        if attempt == 0:
+            print(f"  [批次 {batch_num}] 开始翻译，共 {len(items)} 条评论...")
+        else:
+            print(f"    [批次 {batch_num}] 重试第 {attempt} 次，补发 {len(items)} 条...")
+        
+        timing = {}
+        metrics.count("api_calls")
+        if attempt > 0:
+            metrics.count("retries")
         try:
-            # 使用信号量控制并发
-            if semaphore:
-                async with semaphore:
-                    print(f"  [批次 {batch_num}] 开始翻译，共 {len(texts)} 条评论...")
-                    if attempt > 0:
-                        print(f"    [批次 {batch_num}] 重试第 {attempt} 次...")
-                    
-                    response = await client.chat.completions.create(
-                        model="deepseek-chat",
-                        messages=[
-                            {"role": "system", "content": "你是一个专业的游戏评论翻译助手，擅长将英文游戏评论准确翻译成中文。请严格按照要求格式返回翻译结果。"},
-                            {"role": "user", "content": prompt}
-                        ],
-                        temperature=0.3,
-                        stream=False
-                    )
-            else:
-                print(f"  [批次 {batch_num}] 开始翻译，共 {len(texts)} 条评论...")
-                if attempt > 0:
-                    print(f"    [批次 {batch_num}] 重试第 {attempt} 次...")
-                
-                response = await client.chat.completions.create(
-                    model="deepseek-chat",
-                    messages=[
-                        {"role": "system", "content": "你是一个专业的游戏评论翻译助手，擅长将英文游戏评论准确翻译成中文。请严格按照要求格式返回翻译结果。"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    stream=False
-                )
-            
-            translated_text = response.choices[0].message.content.strip()
-            
-            # 解析翻译结果
-            lines = [line.strip() for line in translated_text.split('\n') if line.strip()]
-            
-            # 过滤掉明显的标记行
-            filtered_lines = []
-            for line in lines:
-                if not re.match(r'^[0-9]+[\.\)、]', line) and not re.match(r'^\[.*\]', line):
-                    filtered_lines.append(line)
-                elif len(line) > 20:
-                    filtered_lines.append(line)
-            
-            # 如果过滤后数量不对，使用原始结果
-            if len(filtered_lines) != len(texts):
-                filtered_lines = lines[:len(texts)]
-            
-            # 确保数量匹配
-            if len(filtered_lines) < len(texts):
-                filtered_lines.extend(texts[len(filtered_lines):])
-            elif len(filtered_lines) > len(texts):
-                filtered_lines = filtered_lines[:len(texts)]
-            
-            print(f"  ✓ [批次 {batch_num}] 翻译完成，获得 {len(filtered_lines)} 条结果")
-            return filtered_lines
-            
+            response = await _request_translation(client, build_translation_prompt(items, source_lang), limiter, timing,
+                                                  build_system_prompt(source_lang))
+            parsed = parse_translation_response(response.choices[0].message.content or '', [item_id for item_id, _ in items])
         except Exception as e:
-            error_msg = str(e)
+            if telemetry is not None:
+                telemetry.record(batch=str(batch_num), attempt=attempt + 1, items=len(items), valid_items=0, status='error',
+                                 error=type(e).__name__, **timing)
+            print(f"  ✗ [批次 {batch_num}] 翻译失败: {e}")
             if attempt < MAX_RETRIES - 1:
-                print(f"  ✗ [批次 {batch_num}] 翻译失败: {error_msg}")
+                # 限流时由限制器按 Retry-After 统一暂停，这里只做固定间隔
                 print(f"    [批次 {batch_num}] 等待 {RETRY_DELAY} 秒后重试...")
                 await asyncio.sleep(RETRY_DELAY)
-            else:
-                print(f"  ✗ [批次 {batch_num}] 翻译失败（已重试 {MAX_RETRIES} 次）: {error_msg}")
-                # 失败时返回原文
-                return texts
+            continue
+        
+        if telemetry is not None:
+            telemetry.record(batch=str(batch_num), attempt=attempt + 1, items=len(items), valid_items=len(parsed),
+                             status='ok' if len(parsed) == len(items) else 'partial',
+                             finish_reason=response.choices[0].finish_reason, usage=response.usage, **timing)
+        
+        for item_id, translated in parsed.items():
+            results[int(item_id) - 1] = translated
+        pending = [i for i in pending if results[i] is None]
+        
+        if not pending:
+            print(f"  ✓ [批次 {batch_num}] 翻译完成，获得 {len(texts)} 条结果")
+            return results
+        print(f"  ⚠ [批次 {batch_num}] {len(pending)} 条缺失或格式不符")
     
-    return texts  # 最终失败返回原文
+    print(f"  ✗ [批次 {batch_num}] 已重试 {MAX_RETRIES} 次，仍有 {len(pending)} 条未译出，保留原文")
+    return results
+
+
+def create_client() -> "AsyncOpenAI":
+    """创建 DeepSeek 异步客户端（关闭 SDK 内置重试，由本模块统一重试并感知限流）"""
+    from dotenv import load_dotenv
+    from openai import AsyncOpenAI
 
+    load_dotenv()
+    return AsyncOpenAI(api_key=os.environ.get('DEEPSEEK_API_KEY'), base_url="https://api.deepseek.com", max_retries=0)
 
-async def translate_file_async(input_file, output_file):
+
+def create_limiter() -> AdaptiveLimiter:
+    """自适应并发：健康时逐步加并发，429/5xx 时减半并遵守 Retry-After"""
+    return AdaptiveLimiter(initial=INITIAL_CONCURRENT, maximum=MAX_CONCURRENT, latency_target=LATENCY_TARGET)
+
+
+def create_telemetry(name: str) -> LLMTelemetry:
+    """每次运行一个遥测文件：data/telemetry/{名称}_{时间戳}.jsonl"""
+    path = TELEMETRY_DIR / f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"
+    prices = {'input': PRICE_INPUT, 'input_cache_hit': PRICE_INPUT_CACHE_HIT, 'output': PRICE_OUTPUT}
+    return LLMTelemetry(path, prices=prices)
+
+
+def _print_telemetry_summary(telemetry: LLMTelemetry) -> None:
+    print(f"\n调用统计（明细: {telemetry.path}）:")
+    print(telemetry.format_summary())
+
+
+def _print_limiter_stats(limiter: AdaptiveLimiter) -> None:
+    print(f"\n并发上限: 初始 {INITIAL_CONCURRENT} → 峰值 {limiter.peak_limit} → 结束 {limiter.limit}（限流/服务端错误 {limiter.throttled} 次）")
+
+
+async def _translate_batches(client: "AsyncOpenAI", limiter: AdaptiveLimiter, batches: List[Tuple[str, List[Tuple[str, str]]]], translation_map: Dict[str, str],
+                             cache: TranslationCache, checkpoint: BatchCheckpoint, label: str = "", telemetry=None):
+    """
+    并发翻译所有批次，按完成顺序逐批处理：成功的译文写入 translation_map（记录键 -> 译文），
+    并立即写入缓存与断点文件，中断时已完成的批次不会丢失
+    batches: [(源语言代码, 批次), ...]，由 create_language_batches 生成
+    label: 批量模式下的文件编号，用于区分不同文件的批次日志
+    """
+    total_batches = len(batches)
+    
+    async def run_batch(batch_idx, source_lang, batch_reviews):
+        review_texts = [review[1] for review in batch_reviews]
+        batch_num = f"{label}-{batch_idx}" if label else batch_idx
+        try:
+            translations = await translate_text_batch(client, review_texts, batch_num=batch_num, limiter=limiter, telemetry=telemetry,
+                                                      source_lang=source_lang)
+        except Exception as e:
+            print(f"  ✗ [批次 {batch_num}] 发生异常: {e}")
+            translations = [None] * len(batch_reviews)
+        return batch_idx, batch_reviews, translations
+    
+    tasks = [asyncio.ensure_future(run_batch(batch_idx, source_lang, batch_reviews))
+             for batch_idx, (source_lang, batch_reviews) in enumerate(batches, 1)]
+    prefix = f"[文件 {label}] " if label else ""
+    print(f"{prefix}开始并发翻译...\n")
+    
+    try:
+        # 按完成顺序处理，每完成一批就落盘
+        for done_count, future in enumerate(asyncio.as_completed(tasks), 1):
+            batch_idx, batch_reviews, translations = await future
+            
+            # 存储翻译结果：未译出的条目不写入（输出时保留原文），也不写缓存/断点（下次运行会重试）
+            translated = {}
+            by_key = {}
+            for (key, original), translation in zip(batch_reviews, translations):
+                if translation is not None:
+                    translation_map[key] = translation
+                    translated[original] = translation
+                    by_key[key] = translation
+            cache.put_many(translated)
+            if by_key:
+                checkpoint.append(batch_idx, by_key)
+            print(f"  {prefix}进度: {done_count}/{total_batches} 个批次已完成并保存")
+    finally:
+        # 中断或异常时取消尚未完成的批次
+        for task in tasks:
+            task.cancel()
+
+
+def _input_fingerprint(reviews: List[Tuple[str, str]]) -> str:
+    """输入指纹：评论键与原文 + 模型 + 提示词版本，任何一项变化都会使断点失效"""
+    digest = hashlib.sha256(f"{MODEL_NAME}|{PROMPT_VERSION}".encode('utf-8'))
+    for key, text in reviews:
+        digest.update(f"\n{key}\t{text}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+@metrics.timed("translate")
+async def translate_file_async(input_file, output_file, client: "AsyncOpenAI" = None, limiter: AdaptiveLimiter = None, label: str = "",
+                               telemetry: LLMTelemetry = None):
     """
     异步翻译整个文件（并发版本）
+    client / limiter: 批量模式下由调用方传入共享的客户端（连接池）与全局并发限制器；不传则本文件单独创建
+    telemetry: 批量模式下共享的遥测记录（按文件名区分）；不传且单独创建客户端时本文件单独记录
+    label: 批量模式下的文件编号（用于日志）
+    返回仍未译出（保留原文）的评论条数
     """
     print(f"\n{'='*60}")
     print(f"开始处理文件: {input_file.name if hasattr(input_file, 'name') else input_file}")
     print(f"输出文件: {output_file.name if hasattr(output_file, 'name') else output_file}")
     print(f"{'='*60}")
     
-    # 解析文件
-    reviews = parse_review_file(input_file)
+    metrics.annotate(file=Path(input_file).name)
+    # 加载评论（优先 JSONL，单次读取）
+    records, original_lines = load_review_records(input_file)
+    
+    # 语言标签：filter 已写入 JSONL 的直接使用；旧 JSONL 补识别一次并写回，旧 TXT 每次现算（很快）
+    if tag_languages(records) and original_lines is None:
+        save_records(records, companion_jsonl_path(input_file))
+    languages = {record_key(r): r['lang'] for r in records}
+    lang_counts: Dict[str, int] = {}
+    for lang in languages.values():
+        lang_counts[lang] = lang_counts.get(lang, 0) + 1
+    print("语言分布: " + "，".join(f"{lang} {n}" for lang, n in sorted(lang_counts.items(), key=lambda x: -x[1])))
+    
+    # 已是中文或没有文字的评论保留原文，不发给模型
+    reviews = [(record_key(r), r['content']) for r in records if r['lang'] not in SKIP_LANGUAGES]
     total_reviews = len(reviews)
+    skipped = len(records) - total_reviews
     
-    print(f"共找到 {total_reviews} 条评论需要翻译\n")
+    print(f"共找到 {total_reviews} 条评论需要翻译" + (f"（跳过中文/无文字评论 {skipped} 条）" if skipped else "") + "\n")
     
-    if total_reviews == 0:
+    if not records:
         print("未找到需要翻译的评论")
-        return
-    
-    # 读取原文件的所有行（用于保持格式）
-    with open(input_file, 'r', encoding='utf-8') as f:
-        original_lines = f.readlines()
-    
-    # 创建翻译映射
-    translation_map = {}
-    
-    # 动态创建批次（根据token数量）
-    batches = create_batches(reviews)
+        return 0
+    
+    # 去重：相同原文只保留第一条参与翻译，完成后回填给重复条目
+    unique_reviews, duplicates = dedupe_reviews(reviews, DEDUP_IGNORE_WHITESPACE, DEDUP_IGNORE_CASE)
+    
+    # 断点续译：读回上次中断前已完成的批次结果（输入不变时有效）
+    checkpoint = BatchCheckpoint(CHECKPOINT_DIR / f"{Path(input_file).stem}.jsonl", _input_fingerprint(reviews))
+    translation_map = checkpoint.load()  # 记录键 -> 译文
+    if translation_map:
+        print(f"从断点恢复 {len(translation_map)} 条已完成的翻译")
+    
+    # 再查持久化缓存，只有未命中的评论才需要调用 API
+    cache = TranslationCache(CACHE_DB_PATH, MODEL_NAME, PROMPT_VERSION)
+    remaining = [(key, text) for key, text in unique_reviews if key not in translation_map]
+    cached = cache.get_many(text for _, text in remaining)
+    pending_reviews = []
+    for key, text in remaining:
+        if text in cached:
+            translation_map[key] = cached[text]
+        else:
+            pending_reviews.append((key, text))
+    print(f"缓存命中 {len(remaining) - len(pending_reviews)} 条，需调用 API 翻译 {len(pending_reviews)} 条\n")
+    metrics.count("reviews", total_reviews)
+    metrics.count("duplicates", total_reviews - len(unique_reviews))
+    metrics.count("checkpoint_hits", len(unique_reviews) - len(remaining))
+    metrics.count("cache_hits", len(remaining) - len(pending_reviews))
+    
+    if duplicates:
+        # 只统计本次本该发给 API 的重复条目（缓存/断点已覆盖的不算）
+        saved_tokens = sum(
+            count_tokens(text) + ITEM_OVERHEAD_TOKENS
+            for key, _ in pending_reviews
+            for _, text in duplicates.get(key, ())
+        )
+        print(f"去重：{total_reviews - len(unique_reviews)} 条评论与前文重复，只翻译一次（本次节省约 {saved_tokens} 输入 token）\n")
+    
+    # 动态创建批次（按源语言分组，再根据token数量分批）
+    batches = create_language_batches(pending_reviews, languages)
     total_batches = len(batches)
+    metrics.count("batches", total_batches)
     
-    print(f"已创建 {total_batches} 个批次（优先用满并发，单批次内容量较小）")
-    print(f"使用并发翻译，最大并发数: {MAX_CONCURRENT}")
+    print(f"已创建 {total_batches} 个批次（每批约 {TARGET_TOKENS_PER_BATCH} token）")
+    if client is None:
+        print(f"使用自适应并发翻译，初始并发数: {INITIAL_CONCURRENT}，上限: {MAX_CONCURRENT}")
     if total_batches > 0:
-        avg_reviews = sum(len(batch) for batch in batches) // total_batches
+        avg_reviews = sum(len(batch) for _, batch in batches) // total_batches
         print(f"平均每批次约 {avg_reviews} 条评论\n")
     else:
         print()
     
-    # 创建信号量控制并发
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
-    
-    # 使用上下文管理器创建客户端
-    async with AsyncOpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com") as client:
-        # 创建所有翻译任务
-        tasks = []
-        for batch_idx, batch_reviews in enumerate(batches, 1):
-            review_texts = [review[1] for review in batch_reviews]
-            task = translate_text_batch(client, review_texts, batch_num=batch_idx, semaphore=semaphore)
-            tasks.append((batch_idx, batch_reviews, task))
-        
-        # 并发执行所有翻译任务
-        print("开始并发翻译...\n")
-        results = await asyncio.gather(*[task for _, _, task in tasks], return_exceptions=True)
-    
-    # 处理翻译结果
-    for (batch_idx, batch_reviews, _), translations in zip(tasks, results):
-        if isinstance(translations, Exception):
-            print(f"  ✗ [批次 {batch_idx}] 发生异常: {translations}")
-            # 失败时使用原文
-            translations = [review[1] for review in batch_reviews]
-        
-        # 存储翻译结果
-        for i, (metadata, original) in enumerate(batch_reviews):
-            if i < len(translations):
-                translation_map[original] = translations[i]
-            else:
-                translation_map[original] = original
+    with metrics.stage("api"):
+        try:
+            if batches and client is not None:
+                file_telemetry = telemetry.bind(file=Path(input_file).name) if telemetry is not None else None
+                await _translate_batches(client, limiter, batches, translation_map, cache, checkpoint, label, file_telemetry)
+            elif batches:
+                limiter = create_limiter()
+                telemetry = create_telemetry(Path(input_file).stem)
+                try:
+                    async with create_client() as client:
+                        await _translate_batches(client, limiter, batches, translation_map, cache, checkpoint, label,
+                                                 telemetry.bind(file=Path(input_file).name))
+                finally:
+                    telemetry.close()
+                _print_limiter_stats(limiter)
+                _print_telemetry_summary(telemetry)
+        finally:
+            cache.close()
+    
+    fan_out(translation_map, duplicates)
     
     # 生成翻译后的文件
     print(f"\n正在生成翻译文件...")
-    output_lines = []
-    i = 0
-    
-    while i < len(original_lines):
-        line = original_lines[i]
-        
-        # 检查是否是评论元数据行
-        if re.match(r'\[评论 \d+\]', line.strip()):
-            output_lines.append(line)  # 保留元数据行
-            i += 1
-            
-            # 检查下一行是否是评论内容
-            if i < len(original_lines):
-                review_line = original_lines[i]
-                if review_line.strip() and not review_line.startswith('---'):
-                    original_content = review_line.strip()
-                    # 替换为翻译内容
-                    if original_content in translation_map:
-                        translated = translation_map[original_content]
-                        output_lines.append(translated + '\n')
-                    else:
-                        output_lines.append(review_line)  # 如果找不到翻译，保留原文
-                    i += 1
-                else:
-                    output_lines.append(review_line)
-                    i += 1
-            else:
-                i += 1
-        else:
-            output_lines.append(line)
-            i += 1
+    if original_lines is None:
+        # JSONL：按记录重新生成报告，译文按 ID 回填
+        output_lines = [render_report_text(records, translation_map)]
+    else:
+        # 旧 TXT：按正文所在行号替换，其余行原样保留
+        output_lines = list(original_lines)
+        for record in records:
+            key = record_key(record)
+            if key in translation_map:
+                output_lines[record['line_no']] = translation_map[key] + '\n'
     
     # 写入输出文件
     with open(output_file, 'w', encoding='utf-8') as f:
         f.writelines(output_lines)
     
+    # 输出已完整写出，断点不再需要
+    checkpoint.remove()
+    
     print(f"✓ 翻译完成！已保存到: {output_file}")
-    print(f"  共翻译 {len(translation_map)} 条评论\n")
+    print(f"  共翻译 {len(translation_map)}/{total_reviews} 条评论\n")
     
     # 确保所有异步操作完成
     await asyncio.sleep(0.1)  # 给一点时间让所有任务完成
+    untranslated = total_reviews - len(translation_map)
+    metrics.count("untranslated", untranslated)
+    return untranslated
 
 
 def translate_file(input_file, output_file):
@@ -363,28 +583,104 @@ def translate_file(input_file, output_file):
             
     try:
         asyncio.run(translate_file_async(input_file, output_file))
+    except KeyboardInterrupt:
+        print("\n已中断。已完成的批次已保存到断点文件，重新翻译同一文件时将从断点继续")
     except Exception as e:
         print(f"执行过程中发生错误: {e}")
 
 
-def main():
-    """主函数"""
-    # 项目根目录（src 的上一级）
-    project_root = Path(__file__).resolve().parent.parent
-    reports_dir = project_root / "output/reports"
-    chs_reports_dir = project_root / "output/reports_chs"
-    
-    # 获取所有 txt，排除已在 reports_chs 中有对应 _中文.txt 的（即已翻译过的）
-    all_files = list(reports_dir.glob("*.txt"))
-    txt_files = [
-        f for f in all_files
+async def translate_files_async(jobs: List[Tuple[Path, Path]]):
+    """
+    批量翻译多个文件：所有文件的批次共用一个客户端（连接池）与一个全局自适应并发限制器，
+    在同一事件循环中并发执行；每个文件的批次全部完成后立即写出其 _中文.txt
+    jobs: [(输入文件, 输出文件), ...]
+    返回失败的输入文件列表
+    """
+    limiter = create_limiter()
+    telemetry = create_telemetry("batch")
+    print(f"批量翻译 {len(jobs)} 个文件，全局自适应并发：初始 {INITIAL_CONCURRENT}，上限 {MAX_CONCURRENT}")
+    
+    try:
+        async with create_client() as client:
+            results = await asyncio.gather(
+                *(translate_file_async(input_file, output_file, client=client, limiter=limiter, label=str(i), telemetry=telemetry)
+                  for i, (input_file, output_file) in enumerate(jobs, 1)),
+                return_exceptions=True
+            )
+    finally:
+        telemetry.close()
+    
+    _print_limiter_stats(limiter)
+    _print_telemetry_summary(telemetry)
+    for input_file, _ in jobs:
+        s = telemetry.summary(file=input_file.name)
+        if s['calls']:
+            print(f"  {input_file.name}: {s['calls']} 次调用，{s['prompt_tokens'] + s['completion_tokens']} token，"
+                  f"{s['cost']:.4f} 元，延迟 p50 {s['latency']['p50']:.2f} 秒")
+    failed = []
+    for (input_file, _), result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            print(f"  ✗ {input_file.name} 翻译失败: {result}")
+            failed.append(input_file)
+    return failed
+
+
+def find_untranslated_reports(reports_dir: Path, chs_reports_dir: Path) -> List[Path]:
+    """获取所有 txt，排除已在 reports_chs 中有对应 _中文.txt 的（即已翻译过的）"""
+    return [
+        f for f in sorted(reports_dir.glob("*.txt"))
         if "_中文" not in f.name and not (chs_reports_dir / f"{f.stem}_中文.txt").exists()
     ]
+
+
+def run_batch_mode(txt_files: List[Path], chs_reports_dir: Path) -> int:
+    """无人值守批量模式：翻译全部待翻译文件，返回失败文件数"""
+    chs_reports_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(f, chs_reports_dir / f"{f.stem}_中文.txt") for f in txt_files]
+    for i, (input_file, _) in enumerate(jobs, 1):
+        print(f"  {i}. {input_file.name}")
+    
+    if os.name == 'nt':
+        try:
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        except:  # noqa: E722
+            pass
+    
+    start = time.time()
+    try:
+        failed = asyncio.run(translate_files_async(jobs))
+    except KeyboardInterrupt:
+        print("\n已中断。已完成的批次已保存到断点文件，重新运行将从断点继续")
+        return len(jobs)
+    
+    print(f"\n批量翻译结束：成功 {len(jobs) - len(failed)} 个，失败 {len(failed)} 个，耗时 {time.time() - start:.1f} 秒")
+    return len(failed)
+
+
+def main():
+    """
+    主函数
+    用法: python -m src.translate_reviews          交互选择一个文件翻译
+          python -m src.translate_reviews --all    无人值守，翻译全部未翻译的报告
+    """
+    reports_dir = PROJECT_ROOT / "output/reports"
+    chs_reports_dir = PROJECT_ROOT / "output/reports_chs"
+    
+    txt_files = find_untranslated_reports(reports_dir, chs_reports_dir)
     
     if not txt_files:
         print("未找到需要翻译的文件（或已全部翻译）")
         return
     
+    if "--all" in sys.argv[1:]:
+        print("="*60)
+        print("游戏评论翻译工具（批量模式）")
+        print("="*60)
+        print(f"\n找到 {len(txt_files)} 个待翻译文件（已翻译的已跳过）:\n")
+        with metrics.RunMetrics("translate", mode="batch"):
+            failed = run_batch_mode(txt_files, chs_reports_dir)
+        sys.exit(1 if failed else 0)
+    
     print("="*60)
     print("游戏评论翻译工具（并发版）")
     print("="*60)
@@ -414,7 +710,7 @@ def main():
             return
     
     # 生成输出文件名（保存到reports_chs目录）
-    chs_reports_dir.mkdir(exist_ok=True)
+    chs_reports_dir.mkdir(parents=True, exist_ok=True)
     output_file = chs_reports_dir / f"{selected_file.stem}_中文.txt"
     
     # 确认翻译
@@ -434,7 +730,8 @@ def main():
         return
     
     # 开始翻译
-    translate_file(selected_file, output_file)
+    with metrics.RunMetrics("translate", mode="single"):
+        translate_file(selected_file, output_file)
     
     print("\n翻译完成！")
 
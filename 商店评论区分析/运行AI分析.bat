@@ -0,0 +1,38 @@
+@echo off
+chcp 65001 >nul
+echo ========================================
+echo 游戏评论AI语义分析工具（DeepSeek map-reduce）
+echo ========================================
+echo.
+
+REM 检查Python版本
+python3 --version >nul 2>&1
+if %errorlevel% == 0 (
+    set PYTHON_CMD=python3
+) else (
+    python --version >nul 2>&1
+    if %errorlevel% == 0 (
+        set PYTHON_CMD=python
+    ) else (
+        echo 错误: 未找到Python，请先安装Python 3.8或更高版本
+        pause
+        exit /b 1
+    )
+)
+
+echo 使用: %PYTHON_CMD%
+echo.
+echo 将从 output/reports/ 选择一个或多个精选评论报告进行分析
+echo 分析结果保存到 output/analysis/
+echo.
+
+%PYTHON_CMD% -m src.analyze_reviews
+
+echo.
+echo ========================================
+echo 分析流程结束
+echo ========================================
+echo.
+echo 分析报告位置:output/analysis
+echo.
+pause
@@ -0,0 +1,39 @@
+@echo off
+chcp 65001 >nul
+echo ========================================
+echo 批量更新：采集 → 筛选 → 翻译（只重做有变化的部分）
+echo ========================================
+echo.
+
+REM 检查Python版本
+python3 --version >nul 2>&1
+if %errorlevel% == 0 (
+    set PYTHON_CMD=python3
+) else (
+    python --version >nul 2>&1
+    if %errorlevel% == 0 (
+        set PYTHON_CMD=python
+    ) else (
+        echo 错误: 未找到Python，请先安装Python 3.8或更高版本
+        pause
+        exit /b 1
+    )
+)
+
+echo 使用: %PYTHON_CMD%
+echo.
+echo 将对 config.yaml 中的全部游戏执行 采集 → 筛选 → 翻译（最近一年）
+echo 输入没有变化的步骤会自动跳过；中途失败再次运行会从失败的步骤继续
+echo.
+
+%PYTHON_CMD% -m src.pipeline --all %*
+
+echo.
+echo ========================================
+echo 批量更新结束
+echo ========================================
+echo.
+echo 精选评论位置:output/reports
+echo 中文版位置:output/reports_chs
+echo.
+pause